@@ -5,45 +5,749 @@ Módulo para calcular estadísticas descriptivas de datos en un archivo.
 
 Autor: Fernando Maytorena"""
 
-import sys
+import argparse
+import copy
+import hashlib
+import json
+import math
+import mmap
+import os
+import random
 import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import chain, repeat
 from tabulate import tabulate
 
-def read_data(file_path):
-    """Lee datos numéricos de un archivo y devuelve una lista de flotantes."""
-    data = []
+# Tamaño aproximado, en bytes, de cada bloque que parsea el lector masivo.
+BULK_CHUNK_SIZE = 1 << 22
+# Número de líneas inválidas que se listan en el reporte resumido.
+MAX_REPORTED_ERRORS = 10
+# Error de rango predeterminado de los percentiles aproximados (±1 %).
+DEFAULT_QUANTILE_ERROR = 0.01
+# Tamaño de archivo, en bytes, a partir del cual el modo 'auto' usa percentiles aproximados.
+APPROX_THRESHOLD = 256 * 1024 * 1024
+# Parámetros del KLLSketch: capacidad predeterminada, mínima y decaimiento por nivel.
+DEFAULT_SKETCH_K = 200
+MIN_SKETCH_K = 8
+SKETCH_DECAY = 2 / 3
+# Valores que se agrupan antes de pasarlos al sketch.
+SKETCH_BATCH_SIZE = 4096
+# Contadores del resumen Misra-Gries que estima la moda en modo aproximado.
+MODE_COUNTERS = 1024
+# Sufijo y versión del archivo lateral donde se guarda el resumen de cada archivo.
+CACHE_SUFFIX = '.stats.json'
+CACHE_VERSION = 1
+# Campos que debe tener el caché para poder reutilizarlo.
+CACHE_FIELDS = {'version', 'offset', 'hash', 'lines', 'malformed', 'summary'}
+
+def iter_data(file_path):
+    """
+    Lee datos numéricos de un archivo de forma perezosa, produciendo un flotante por línea.
+
+    Permite alimentar el cálculo de estadísticas sin construir la lista completa en memoria.
+
+    :param file_path: Ruta del archivo de datos.
+    :return: Generador de flotantes; las líneas inválidas se reportan y se saltan.
+    """
     try:
         with open(file_path, 'r', encoding='utf-8') as file:
             for line in file:
                 try:
-                    data.append(float(line.strip()))
+                    yield float(line.strip())
                 except ValueError:
                     print(f"""Error: No se pudo convertir a flotante:
                           '{line.strip()}'. Se salta línea.""")
-        return data
     except FileNotFoundError as e:
         print(f"Error al leer el archivo: {e}")
-        return []
 
-def calculate_statistics(data):
+def read_data(file_path):
+    """Lee datos numéricos de un archivo y devuelve una lista de flotantes."""
+    return list(iter_data(file_path))
+
+class ParseReport:
     """
-    Calcula las estadísticas descriptivas de una lista de números y las retorna en un diccionario.
-    
-    :param data: Lista de números (flotantes o enteros).
-    :return: Diccionario con la media, mediana, moda, varianza y desviación estándar.
+    Resumen de las líneas que no se pudieron convertir a flotante.
+
+    Guarda el total de líneas inválidas y solo las primeras `max_offenders`,
+    para reportarlas en un único mensaje en lugar de una línea por error.
+    """
+
+    def __init__(self, max_offenders=MAX_REPORTED_ERRORS):
+        """Inicializa un reporte vacío."""
+        self.max_offenders = max_offenders
+        self.count = 0
+        self.offenders = []
+
+    def add(self, line_number, text):
+        """
+        Registra una línea inválida.
+
+        :param line_number: Número de línea (empezando en 1) dentro del archivo.
+        :param text: Contenido de la línea.
+        """
+        self.count += 1
+        if len(self.offenders) < self.max_offenders:
+            self.offenders.append((line_number, text))
+
+    def summary(self, file_path):
+        """
+        Crea el mensaje resumido del reporte.
+
+        :param file_path: Ruta del archivo al que pertenece el reporte.
+        :return: String con el conteo y las primeras líneas inválidas, o vacío si no hubo errores.
+        """
+        if not self.count:
+            return ""
+        lines = [f"Error: {self.count} líneas de {file_path} no se pudieron convertir "
+                 f"a flotante y se saltaron. Primeras {len(self.offenders)}:"]
+        lines.extend(f"  línea {line_number}: '{text}'" for line_number, text in self.offenders)
+        return "\n".join(lines)
+
+def _parse_lines(lines, first_line_number, report):
+    """
+    Convierte un bloque de líneas en bytes a un arreglo compacto de flotantes.
+
+    Intenta primero la conversión masiva del bloque completo y solo si falla
+    recorre línea por línea para registrar las inválidas en el reporte.
+    """
+    try:
+        return array('d', map(float, lines))
+    except ValueError:
+        values = array('d')
+        for offset, line in enumerate(lines):
+            try:
+                values.append(float(line))
+            except ValueError:
+                report.add(first_line_number + offset, line.strip().decode('utf-8', 'replace'))
+        return values
+
+def _iter_mapped_chunks(mapped, start, end, report,  # pylint: disable=too-many-arguments
+                        first_line=1, chunk_size=BULK_CHUNK_SIZE):
+    """
+    Parsea el rango [start, end) de un archivo mapeado por bloques de líneas completas.
+
+    :return: Generador de tuplas (array('d') del bloque, número de líneas del bloque).
+    """
+    line_number = first_line
+    while start < end:
+        newline = mapped.find(b'\n', start + chunk_size, end) if start + chunk_size < end else -1
+        stop = end if newline == -1 else newline + 1
+        chunk = mapped[start:stop]
+        lines = chunk.split(b'\n')
+        if chunk.endswith(b'\n'):
+            lines.pop()
+        yield _parse_lines(lines, line_number, report), len(lines)
+        line_number += len(lines)
+        start = stop
+
+def iter_data_chunks(file_path, report, chunk_size=BULK_CHUNK_SIZE):
+    """
+    Mapea el archivo en memoria y lo parsea por bloques de líneas completas.
+
+    :param file_path: Ruta del archivo de datos.
+    :param report: ParseReport donde se acumulan las líneas inválidas.
+    :param chunk_size: Tamaño aproximado de cada bloque en bytes.
+    :return: Generador de arreglos array('d'), uno por bloque.
+    """
+    with open(file_path, 'rb') as file:
+        size = os.fstat(file.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for values, _ in _iter_mapped_chunks(mapped, 0, size, report, chunk_size=chunk_size):
+                yield values
+
+def iter_data_bulk(file_path, chunk_size=BULK_CHUNK_SIZE, max_errors=MAX_REPORTED_ERRORS):
+    """
+    Lee datos numéricos de un archivo grande como una secuencia de arreglos array('d').
+
+    El archivo se mapea en memoria y se parsea por bloques; las líneas inválidas
+    se resumen en un solo mensaje, al terminar, con su conteo y las primeras `max_errors`.
+
+    :param file_path: Ruta del archivo de datos.
+    :param chunk_size: Tamaño aproximado de cada bloque en bytes.
+    :param max_errors: Número máximo de líneas inválidas que se listan.
+    :return: Generador de arreglos array('d'), uno por bloque.
+    """
+    report = ParseReport(max_errors)
+    try:
+        yield from iter_data_chunks(file_path, report, chunk_size)
+    except FileNotFoundError as e:
+        print(f"Error al leer el archivo: {e}")
+    if report.count:
+        print(report.summary(file_path))
+
+def read_data_bulk(file_path, chunk_size=BULK_CHUNK_SIZE, max_errors=MAX_REPORTED_ERRORS):
+    """
+    Lee datos numéricos de un archivo grande a un arreglo compacto array('d').
+
+    :param file_path: Ruta del archivo de datos.
+    :param chunk_size: Tamaño aproximado de cada bloque en bytes.
+    :param max_errors: Número máximo de líneas inválidas que se listan.
+    :return: Arreglo array('d') con los datos leídos.
+    """
+    data = array('d')
+    for chunk in iter_data_bulk(file_path, chunk_size, max_errors):
+        data.extend(chunk)
+    return data
+
+class KLLSketch:
+    """
+    Sketch de cuantiles KLL (Karnin, Lang y Liberty) con memoria acotada.
+
+    Guarda una pila de compactadores; cuando se llenan, cada nivel ordena sus valores
+    y promueve la mitad de ellos (elegida al azar) al siguiente nivel, donde cada valor
+    pesa el doble. El tamaño total queda acotado por aproximadamente 3 * k valores y el
+    error de rango es del orden de 1 / k, sin importar cuántos datos se agreguen.
+    """
+
+    def __init__(self, k=DEFAULT_SKETCH_K, seed=None):
+        """
+        Inicializa un sketch vacío.
+
+        :param k: Capacidad del compactador superior; controla memoria y precisión.
+        :param seed: Semilla opcional del generador aleatorio, para resultados reproducibles.
+        """
+        self.k = k
+        self.compactors = [[]]
+        self.size = 0
+        self.max_size = 0
+        self._random = random.Random(seed)
+        self._update_max_size()
+
+    @classmethod
+    def for_error(cls, error, seed=None):
+        """
+        Crea un sketch dimensionado para un error de rango relativo dado.
+
+        :param error: Error de rango aceptable (por ejemplo 0.01 para ±1 %).
+        :param seed: Semilla opcional del generador aleatorio.
+        :return: KLLSketch con k = ceil(2 / error).
+        """
+        return cls(max(MIN_SKETCH_K, math.ceil(2 / error)), seed)
+
+    def _capacity(self, height):
+        """Capacidad del compactador del nivel `height`; decrece hacia los niveles bajos."""
+        depth = len(self.compactors) - height - 1
+        return max(2, math.ceil(self.k * SKETCH_DECAY ** depth))
+
+    def _update_max_size(self):
+        """Recalcula el número de valores que caben en el sketch antes de compactar."""
+        self.max_size = sum(self._capacity(height) for height in range(len(self.compactors)))
+
+    def update(self, values):
+        """
+        Agrega todos los valores de un iterable al sketch.
+
+        :param values: Iterable de números.
+        """
+        level0 = self.compactors[0]
+        size, max_size = self.size, self.max_size
+        for value in values:
+            level0.append(value)
+            size += 1
+            if size >= max_size:
+                self.size = size
+                self._compress()
+                size, max_size = self.size, self.max_size
+        self.size = size
+
+    def _compress(self):
+        """Compacta los niveles llenos hasta que el sketch vuelve a su capacidad."""
+        height = 0
+        while height < len(self.compactors):
+            items = self.compactors[height]
+            if len(items) >= self._capacity(height):
+                if height + 1 == len(self.compactors):
+                    self.compactors.append([])
+                    self._update_max_size()
+                items.sort()
+                keep = len(items) % 2
+                offset = self._random.getrandbits(1)
+                self.compactors[height + 1].extend(items[keep + offset::2])
+                del items[keep:]
+                self.size = sum(len(level) for level in self.compactors)
+                if self.size < self.max_size:
+                    return
+            height += 1
+
+    def merge(self, other):
+        """
+        Combina otro sketch en este, como si hubiera recibido también sus datos.
+
+        :param other: KLLSketch a combinar.
+        """
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        self._update_max_size()
+        for height, items in enumerate(other.compactors):
+            self.compactors[height].extend(items)
+        self.size = sum(len(level) for level in self.compactors)
+        while self.size >= self.max_size:
+            self._compress()
+
+    def to_dict(self):
+        """Convierte el sketch en un diccionario serializable a JSON."""
+        return {'k': self.k, 'compactors': self.compactors}
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Reconstruye un sketch a partir de `to_dict`.
+
+        :param data: Diccionario con 'k' y 'compactors'.
+        :return: KLLSketch equivalente al guardado.
+        """
+        sketch = cls(data['k'])
+        sketch.compactors = [list(items) for items in data['compactors']] or [[]]
+        sketch.size = sum(len(items) for items in sketch.compactors)
+        sketch._update_max_size()
+        return sketch
+
+    def quantiles(self, fractions):
+        """
+        Estima varios cuantiles con una sola pasada sobre el sketch.
+
+        :param fractions: Fracciones entre 0 y 1 (por ejemplo 0.5 para la mediana).
+        :return: Lista con el valor estimado para cada fracción, o None si el sketch está vacío.
+        """
+        weighted = sorted((value, 1 << height)
+                          for height, items in enumerate(self.compactors) for value in items)
+        if not weighted:
+            return [None] * len(fractions)
+        total_weight = sum(weight for _, weight in weighted)
+        return _values_at_ranks(weighted, total_weight, fractions)
+
+def _values_at_ranks(weighted, total, fractions):
+    """
+    Busca el valor de rango más cercano para cada fracción en una lista ordenada de pares.
+
+    :param weighted: Pares (valor, peso) ordenados por valor.
+    :param total: Suma de los pesos.
+    :param fractions: Fracciones entre 0 y 1.
+    :return: Lista con el primer valor cuyo peso acumulado alcanza ceil(fracción * total).
+    """
+    targets = sorted((max(1, math.ceil(fraction * total)), index)
+                     for index, fraction in enumerate(fractions))
+    found = [None] * len(fractions)
+    seen = 0
+    position = 0
+    for value, weight in weighted:
+        seen += weight
+        while position < len(targets) and seen >= targets[position][0]:
+            found[targets[position][1]] = value
+            position += 1
+        if position == len(targets):
+            break
+    return found
+
+class ValueDistribution:
     """
-    if not data:
+    Distribución de los valores acumulados, de la que salen la moda, la mediana y los percentiles.
+
+    En modo exacto es una tabla hash de conteos por valor, por lo que la memoria depende
+    del número de valores distintos y no del número de datos. En modo aproximado la
+    memoria es fija: los percentiles salen de un KLLSketch y la moda de un resumen
+    Misra-Gries con `MODE_COUNTERS` contadores.
+    """
+
+    def __init__(self, approximate=False, error=DEFAULT_QUANTILE_ERROR):
+        """
+        Inicializa una distribución vacía.
+
+        :param approximate: Si es True, usa estructuras de memoria fija.
+        :param error: Error de rango del sketch de percentiles en modo aproximado.
+        """
+        self.counts = {}
+        self.approximate = approximate
+        self.error = error
+        self.sketch = KLLSketch.for_error(error) if approximate else None
+
+    def make_approximate(self):
+        """Pasa una distribución exacta a modo aproximado, cargando sus conteos al sketch."""
+        self.sketch = KLLSketch.for_error(self.error)
+        for value, count in self.counts.items():
+            self.sketch.update(repeat(value, count))
+        self.approximate = True
+        _trim_mode_counters(self.counts)
+
+    def merge(self, other):
+        """
+        Combina otra distribución en esta; si alguna es aproximada, el resultado también.
+
+        :param other: ValueDistribution a combinar; no se modifica.
+        """
+        if other.approximate and not self.approximate:
+            self.make_approximate()
+        for value, count in other.counts.items():
+            self.counts[value] = self.counts.get(value, 0) + count
+        if self.approximate:
+            if other.approximate:
+                self.sketch.merge(other.sketch)
+            else:
+                for value, count in other.counts.items():
+                    self.sketch.update(repeat(value, count))
+            _trim_mode_counters(self.counts)
+
+    def quantiles(self, fractions, n):
+        """
+        Calcula varios cuantiles de la distribución.
+
+        :param fractions: Fracciones entre 0 y 1 (por ejemplo 0.9 para el percentil 90).
+        :param n: Número de valores acumulados.
+        :return: Lista con el valor de rango más cercano para cada fracción.
+        """
+        if self.approximate:
+            return self.sketch.quantiles(fractions)
+        weighted = [(value, self.counts[value]) for value in sorted(self.counts)]
+        return _values_at_ranks(weighted, n, fractions)
+
+    def median(self, n):
+        """Calcula la mediana de `n` valores: exacta desde los conteos o estimada con el sketch."""
+        if self.approximate:
+            return self.sketch.quantiles([0.5])[0]
+        lower_rank = (n - 1) // 2
+        upper_rank = n // 2
+        lower = None
+        seen = 0
+        for value in sorted(self.counts):
+            seen += self.counts[value]
+            if lower is None and seen > lower_rank:
+                lower = value
+            if seen > upper_rank:
+                return (lower + value) / 2 if lower != value else value
         return None
-    data.sort()
-    stats = {
-        'n': len(data),
-        'mean': sum(data) / len(data),
-        'median': data[len(data) // 2] if len(data) % 2 != 0 else (data[len(data) // 2 - 1]
-                                                                   + data[len(data) // 2]) / 2,
-        'mode': max(set(data), key=data.count),
-        'variance': sum((x - sum(data) / len(data)) ** 2 for x in data) / len(data),
-        'std_dev': (sum((x - sum(data) / len(data)) ** 2 for x in data) / len(data)) ** 0.5
-    }
+
+    def mode(self):
+        """Devuelve el valor más frecuente; en empate, el primero que apareció."""
+        if not self.counts:
+            return None
+        return max(self.counts, key=self.counts.get)
+
+class RunningStatistics:
+    """
+    Acumulador de estadísticas descriptivas en una sola pasada.
+
+    La varianza se actualiza con el método de Welford; la moda, la mediana y los
+    percentiles salen de una ValueDistribution, exacta o de memoria fija.
+    """
+
+    def __init__(self, approximate=False, error=DEFAULT_QUANTILE_ERROR):
+        """
+        Inicializa un acumulador vacío.
+
+        :param approximate: Si es True, usa estructuras de memoria fija para percentiles y moda.
+        :param error: Error de rango del sketch de percentiles en modo aproximado.
+        """
+        self.n = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.distribution = ValueDistribution(approximate, error)
+
+    @property
+    def approximate(self):
+        """Indica si la moda, la mediana y los percentiles son estimaciones."""
+        return self.distribution.approximate
+
+    def add(self, value):
+        """
+        Agrega un valor al acumulador.
+
+        :param value: Número a agregar.
+        """
+        self.update((value,))
+
+    def update(self, values):
+        """
+        Agrega todos los valores de un iterable al acumulador.
+
+        :param values: Cualquier iterable de números (lista, generador, arreglo).
+        """
+        if self.approximate:
+            self._update_approximate(values)
+            return
+        n, total, mean, m2 = self.n, self.total, self.mean, self.m2
+        counts = self.distribution.counts
+        for value in values:
+            n += 1
+            total += value
+            delta = value - mean
+            mean += delta / n
+            m2 += delta * (value - mean)
+            counts[value] = counts.get(value, 0) + 1
+        self.n, self.total, self.mean, self.m2 = n, total, mean, m2
+
+    def _update_approximate(self, values):
+        """Versión de `update` con memoria fija: Welford, Misra-Gries y KLLSketch."""
+        n, total, mean, m2 = self.n, self.total, self.mean, self.m2
+        counts, sketch = self.distribution.counts, self.distribution.sketch
+        sketch_values = []
+        for value in values:
+            n += 1
+            total += value
+            delta = value - mean
+            mean += delta / n
+            m2 += delta * (value - mean)
+            if value in counts:
+                counts[value] += 1
+            elif len(counts) < MODE_COUNTERS:
+                counts[value] = 1
+            else:
+                for key in list(counts):
+                    counts[key] -= 1
+                    if not counts[key]:
+                        del counts[key]
+            sketch_values.append(value)
+            if len(sketch_values) >= SKETCH_BATCH_SIZE:
+                sketch.update(sketch_values)
+                sketch_values.clear()
+        sketch.update(sketch_values)
+        self.n, self.total, self.mean, self.m2 = n, total, mean, m2
+
+    def merge(self, other):
+        """
+        Combina otro acumulador en este, como si hubiera recibido también sus datos.
+
+        Los momentos se combinan con la fórmula de Chan et al. Si alguno de los dos
+        es aproximado, el resultado también lo es.
+
+        :param other: RunningStatistics a combinar; no se modifica.
+        """
+        if other.n:
+            n = self.n + other.n
+            delta = other.mean - self.mean
+            self.mean += delta * other.n / n
+            self.m2 += other.m2 + delta * delta * self.n * other.n / n
+            self.total += other.total
+            self.n = n
+        self.distribution.merge(other.distribution)
+
+    def to_dict(self):
+        """Convierte el acumulador en un diccionario serializable a JSON."""
+        distribution = self.distribution
+        return {
+            'n': self.n,
+            'total': self.total,
+            'mean': self.mean,
+            'm2': self.m2,
+            'counts': list(distribution.counts.items()),
+            'approximate': distribution.approximate,
+            'error': distribution.error,
+            'sketch': distribution.sketch.to_dict() if distribution.approximate else None
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Reconstruye un acumulador a partir de `to_dict`.
+
+        :param data: Diccionario generado por `to_dict`.
+        :return: RunningStatistics equivalente al guardado.
+        """
+        stats = cls(data['approximate'], data['error'])
+        stats.n = data['n']
+        stats.total = data['total']
+        stats.mean = data['mean']
+        stats.m2 = data['m2']
+        stats.distribution.counts = dict((value, count) for value, count in data['counts'])
+        if stats.approximate:
+            stats.distribution.sketch = KLLSketch.from_dict(data['sketch'])
+        return stats
+
+    def quantiles(self, fractions):
+        """
+        Calcula varios cuantiles de los datos acumulados.
+
+        :param fractions: Fracciones entre 0 y 1 (por ejemplo 0.9 para el percentil 90).
+        :return: Lista con el valor de rango más cercano para cada fracción.
+        """
+        return self.distribution.quantiles(fractions, self.n)
+
+    def median(self):
+        """Calcula la mediana: exacta desde la tabla de conteos o estimada con el sketch."""
+        return self.distribution.median(self.n)
+
+    def mode(self):
+        """Devuelve el valor más frecuente; en empate, el primero que apareció."""
+        return self.distribution.mode()
+
+    def result(self):
+        """
+        Construye el diccionario de estadísticas del acumulador.
+
+        :return: Diccionario con n, media, mediana, moda, varianza, desviación estándar y
+        percentiles 90, 95 y 99, o None si no se agregó ningún valor.
+        """
+        if self.n == 0:
+            return None
+        variance = self.m2 / self.n
+        p90, p95, p99 = self.quantiles([0.90, 0.95, 0.99])
+        return {
+            'n': self.n,
+            'mean': self.total / self.n,
+            'median': self.median(),
+            'mode': self.mode(),
+            'variance': variance,
+            'std_dev': variance ** 0.5,
+            'p90': p90,
+            'p95': p95,
+            'p99': p99,
+            'approximate': self.approximate
+        }
+
+def _trim_mode_counters(counts):
+    """
+    Reduce un resumen Misra-Gries a `MODE_COUNTERS` contadores tras una combinación.
+
+    Resta a todos el conteo del primer contador que sobra y elimina los que quedan en cero,
+    lo que conserva la garantía de error del resumen.
+    """
+    if len(counts) <= MODE_COUNTERS:
+        return
+    cutoff = sorted(counts.values(), reverse=True)[MODE_COUNTERS]
+    for value in list(counts):
+        counts[value] -= cutoff
+        if counts[value] <= 0:
+            del counts[value]
+
+def calculate_statistics(data, approximate=False, error=DEFAULT_QUANTILE_ERROR):
+    """
+    Calcula las estadísticas descriptivas de una secuencia de números y las retorna en
+    un diccionario.
+
+    Recorre los datos una sola vez, por lo que acepta cualquier iterable,
+    incluido el generador de `iter_data`.
+
+    :param data: Iterable de números (flotantes o enteros).
+    :param approximate: Si es True, estima mediana, percentiles y moda en memoria fija.
+    :param error: Error de rango de los percentiles aproximados.
+    :return: Diccionario con la media, mediana, moda, varianza, desviación estándar y percentiles.
+    """
+    stats = RunningStatistics(approximate, error)
+    stats.update(data)
+    return stats.result()
+
+def summary_cache_path(file_path):
+    """Devuelve la ruta del archivo lateral con el resumen en caché de `file_path`."""
+    return file_path + CACHE_SUFFIX
+
+def _load_summary_cache(file_path, approximate, error):
+    """
+    Carga el resumen en caché de un archivo si es compatible con el modo pedido.
+
+    :return: Diccionario del caché, o None si no existe, está dañado o usa otro modo.
+    """
+    try:
+        with open(summary_cache_path(file_path), 'r', encoding='utf-8') as file:
+            cached = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(cached, dict) or not CACHE_FIELDS <= cached.keys():
+        return None
+    summary = cached['summary']
+    if (cached['version'] != CACHE_VERSION or not isinstance(summary, dict)
+            or summary.get('approximate') != approximate
+            or (approximate and summary.get('error') != error)):
+        return None
+    return cached
+
+def _save_summary_cache(file_path, cached):
+    """Escribe el resumen en caché de forma atómica (archivo temporal y reemplazo)."""
+    path = summary_cache_path(file_path)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        json.dump(cached, file)
+    os.replace(temp_path, path)
+
+def _hash_range(hasher, mapped, start, end):
+    """Agrega al hash el rango [start, end) del archivo mapeado, por bloques."""
+    for block_start in range(start, end, BULK_CHUNK_SIZE):
+        hasher.update(mapped[block_start:min(block_start + BULK_CHUNK_SIZE, end)])
+
+def _resume_from_cache(file_path, mapped, size, stats):
+    """
+    Recupera el resumen en caché de un archivo si el prefijo que cubre no cambió.
+
+    :param file_path: Ruta del archivo de datos.
+    :param mapped: Archivo mapeado en memoria.
+    :param size: Tamaño actual del archivo en bytes.
+    :param stats: RunningStatistics vacío que se usa si el caché no sirve.
+    :return: Tupla (RunningStatistics, hash del prefijo procesado,
+    (desplazamiento, líneas, líneas dañadas) del prefijo).
+    """
+    hasher = hashlib.blake2b()
+    cached = _load_summary_cache(file_path, stats.approximate, stats.distribution.error)
+    if cached is None or cached['offset'] > size:
+        return stats, hasher, (0, 0, 0)
+    _hash_range(hasher, mapped, 0, cached['offset'])
+    if hasher.hexdigest() != cached['hash']:
+        return stats, hashlib.blake2b(), (0, 0, 0)
+    return (RunningStatistics.from_dict(cached['summary']), hasher,
+            (cached['offset'], cached['lines'], cached['malformed']))
+
+def _update_mapped_summary(file_path, mapped, size, stats, report):
+    """
+    Procesa un archivo mapeado a partir de su caché y guarda el caché actualizado.
+
+    :param file_path: Ruta del archivo de datos.
+    :param mapped: Archivo mapeado en memoria.
+    :param size: Tamaño del archivo en bytes.
+    :param stats: RunningStatistics vacío que se usa si el caché no sirve.
+    :param report: ParseReport donde se registran las líneas dañadas.
+    :return: RunningStatistics con todos los datos del archivo.
+    """
+    stats, hasher, (offset, lines, malformed) = _resume_from_cache(file_path, mapped, size, stats)
+    complete_end = mapped.rfind(b'\n', offset, size) + 1 or offset
+    for values, count in _iter_mapped_chunks(mapped, offset, complete_end, report, lines + 1):
+        stats.update(values)
+        lines += count
+    _hash_range(hasher, mapped, offset, complete_end)
+    _save_summary_cache(file_path, {
+        'version': CACHE_VERSION,
+        'offset': complete_end,
+        'hash': hasher.hexdigest(),
+        'lines': lines,
+        'malformed': malformed + report.count,
+        'summary': stats.to_dict()
+    })
+    if complete_end < size:
+        stats = copy.deepcopy(stats)
+        for values, _ in _iter_mapped_chunks(mapped, complete_end, size, report, lines + 1):
+            stats.update(values)
+    return stats
+
+def update_cached_summary(file_path, approximate=False, error=DEFAULT_QUANTILE_ERROR):
+    """
+    Calcula el resumen de un archivo reutilizando el caché lateral de la corrida anterior.
+
+    El caché guarda el resumen mergeable de las líneas completas ya procesadas, junto
+    con el desplazamiento en bytes y el hash BLAKE2 de ese prefijo. Si el prefijo del
+    archivo no cambió, solo se parsean los bytes agregados al final y se combinan con
+    el resumen guardado; si cambió, el archivo se procesa completo. Una última línea sin
+    salto de línea se incluye en el resultado pero no en el caché, porque todavía puede
+    estar escribiéndose.
+
+    :param file_path: Ruta del archivo de datos.
+    :param approximate: Si es True, usa estructuras de memoria fija.
+    :param error: Error de rango de los percentiles aproximados.
+    :return: RunningStatistics con todos los datos del archivo.
+    """
+    stats = RunningStatistics(approximate, error)
+    report = ParseReport()
+    try:
+        with open(file_path, 'rb') as file:
+            size = os.fstat(file.fileno()).st_size
+            if size == 0:
+                return stats
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                stats = _update_mapped_summary(file_path, mapped, size, stats, report)
+    except FileNotFoundError as e:
+        print(f"Error al leer el archivo: {e}")
+    if report.count:
+        print(report.summary(file_path))
     return stats
 
 def create_results_str(results, elapsed_time):
@@ -51,17 +755,21 @@ def create_results_str(results, elapsed_time):
     Crea una cadena de texto con las estadísticas descriptivas y el tiempo transcurrido.
     
     :param results: Una tupla con estadísticas descriptivas calculadas.
-    :param elapsed_time: Tiempo transcurrido durante la ejecución y cálculos.
+    :param elapsed_time: Tiempo de CPU usado en la lectura y los cálculos.
     :return: String formateado con los resultados.
     """
+    estimate = " (aproximado)" if results['approximate'] else ""
     return f"""Estadísticas Descriptivas:
 Conteo: {results['n']}
 Media: {results['mean']}
-Mediana: {results['median']}
-Moda: {results['mode']}
+Mediana{estimate}: {results['median']}
+Moda{estimate}: {results['mode']}
 Deviación Estándar: {results['std_dev']}
 Variancia: {results['variance']}
-Tiempo transcurrido: {elapsed_time:.4f} segundos
+Percentil 90{estimate}: {results['p90']}
+Percentil 95{estimate}: {results['p95']}
+Percentil 99{estimate}: {results['p99']}
+Tiempo de CPU: {elapsed_time:.4f} segundos
 """
 
 def print_and_save_results(results, elapsed_time, file_name='StatisticsResults.txt'):
@@ -85,25 +793,114 @@ def print_and_save_results(results, elapsed_time, file_name='StatisticsResults.t
     with open(file_name, 'w', encoding='utf-8') as file:
         file.write(results_str)
 
-def main(file_paths):
+def use_approximate(file_path, quantiles='auto', approx_threshold=APPROX_THRESHOLD):
     """
-    Función principal que procesa múltiples archivos de datos, 
-    calcula estadísticas y las imprime en una tabla comparativa.
-    
-    :param file_paths: Lista de rutas de archivos de datos a procesar.
+    Decide si un archivo se procesa con percentiles aproximados.
+
+    :param file_path: Ruta del archivo de datos.
+    :param quantiles: 'exact', 'approx' o 'auto' (aproximado solo para archivos grandes).
+    :param approx_threshold: Tamaño en bytes a partir del cual 'auto' elige el modo aproximado.
+    :return: True si se deben usar estructuras de memoria fija.
+    """
+    if quantiles != 'auto':
+        return quantiles == 'approx'
+    try:
+        return os.path.getsize(file_path) > approx_threshold
+    except OSError:
+        return False
+
+def process_file(file_path, bulk=False,  # pylint: disable=too-many-arguments
+                 quantiles='auto', error=DEFAULT_QUANTILE_ERROR,
+                 approx_threshold=APPROX_THRESHOLD, cache=False, keep_summary=False):
+    """
+    Lee un archivo y calcula sus estadísticas, midiendo el tiempo de CPU usado.
+
+    Solo devuelve el diccionario de resultados, no los datos, para que sea barato
+    enviarlo de regreso desde un proceso de trabajo.
+
+    :param file_path: Ruta del archivo de datos.
+    :param bulk: Si es True, usa el lector masivo con mapeo en memoria (`read_data_bulk`).
+    :param quantiles: 'exact', 'approx' o 'auto'; ver `use_approximate`.
+    :param error: Error de rango de los percentiles aproximados.
+    :param approx_threshold: Tamaño en bytes a partir del cual 'auto' elige el modo aproximado.
+    :param cache: Si es True, reutiliza y actualiza el resumen en caché del archivo
+    (ver `update_cached_summary`).
+    :param keep_summary: Si es True, devuelve también el RunningStatistics para combinarlo.
+    :return: Tupla (file_path, resultados o None, tiempo de CPU en segundos,
+    RunningStatistics o None).
+    """
+    start_time = time.process_time()
+    approximate = use_approximate(file_path, quantiles, approx_threshold)
+    if cache:
+        stats = update_cached_summary(file_path, approximate, error)
+    else:
+        if bulk and approximate:
+            data = chain.from_iterable(iter_data_bulk(file_path))
+        elif bulk:
+            data = read_data_bulk(file_path)
+        else:
+            data = iter_data(file_path)
+        stats = RunningStatistics(approximate, error)
+        stats.update(data)
+    return (file_path, stats.result(), time.process_time() - start_time,
+            stats if keep_summary else None)
+
+def merge_summaries(summaries):
+    """
+    Combina los resúmenes de varios archivos sin volver a leer sus datos.
+
+    :param summaries: Iterable de RunningStatistics; no se modifican.
+    :return: RunningStatistics con los datos de todos los archivos.
+    """
+    combined = None
+    for summary in summaries:
+        if combined is None:
+            combined = copy.deepcopy(summary)
+        else:
+            combined.merge(summary)
+    return combined if combined is not None else RunningStatistics()
+
+def _table_row(label, results, elapsed_time):
+    """Crea la fila de la tabla comparativa para un archivo o para el total."""
+    if results is None:
+        return [label, "N/A", "N/A", "N/A", "N/A", "N/A", "N/A", "N/A", "N/A",
+                "N/A", f"{elapsed_time:.4f} s"]
+    estimate = "~" if results['approximate'] else ""
+    return [label, results['n'], f"{results['mean']:.2f}",
+            f"{estimate}{results['median']:.2f}",
+            "N/A" if results['mode'] is None else results['mode'],
+            f"{results['std_dev']:.2f}", f"{results['variance']:.2f}",
+            f"{estimate}{results['p90']:.2f}", f"{estimate}{results['p95']:.2f}",
+            f"{estimate}{results['p99']:.2f}", f"{elapsed_time:.4f} s"]
+
+def _collect_results(processed, total):
+    """
+    Reúne los resultados de los archivos leídos y, si se pide, la fila del total.
+
+    :param processed: Tuplas devueltas por `process_file`.
+    :param total: Si es True, agrega el total combinando los resúmenes de los archivos.
+    :return: Lista de tuplas (archivo o "Total", resultados, tiempo de CPU).
     """
     all_results = []
-    for file_path in file_paths:
-        start_time = time.time()
-        data = read_data(file_path)
-        if not data:
+    summaries = []
+    for file_path, results, elapsed_time, summary in processed:
+        if results is None:
             print(f"""No se pudieron leer datos de {file_path}.
                   Continuando con el siguiente archivo.""")
             continue
-        results = calculate_statistics(data)
-        elapsed_time = time.time() - start_time
         all_results.append((file_path, results, elapsed_time))
+        summaries.append(summary)
+
+    if total and all_results:
+        start_time = time.process_time()
+        total_results = merge_summaries(summaries).result()
+        total_time = (sum(elapsed for _, _, elapsed in all_results)
+                      + time.process_time() - start_time)
+        all_results.append(("Total", total_results, total_time))
+    return all_results
 
+def _write_results(all_results):
+    """Imprime los resultados de cada archivo y los escribe en StatisticsResults.txt."""
     with open('StatisticsResults.txt', 'w', encoding='utf-8') as file:
         for file_path, results, elapsed_time in all_results:
             if results is not None:
@@ -116,23 +913,65 @@ def main(file_paths):
                 print(error_message)
                 file.write(error_message)
 
+def main(file_paths, bulk=False, jobs=1, total=False, **options):
+    """
+    Función principal que procesa múltiples archivos de datos, 
+    calcula estadísticas y las imprime en una tabla comparativa.
+    
+    :param file_paths: Lista de rutas de archivos de datos a procesar.
+    :param bulk: Si es True, usa el lector masivo con mapeo en memoria (`read_data_bulk`).
+    :param jobs: Número de procesos para repartir los archivos; 1 los procesa en serie.
+    :param total: Si es True, agrega una fila con las estadísticas de todos los archivos,
+    combinando sus resúmenes.
+    :param options: Opciones de percentiles y caché para `process_file`
+    (quantiles, error, approx_threshold, cache).
+    """
+    worker = partial(process_file, bulk=bulk, keep_summary=total, **options)
+    if jobs > 1 and len(file_paths) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            processed = list(executor.map(worker, file_paths))
+    else:
+        processed = [worker(file_path) for file_path in file_paths]
+
+    all_results = _collect_results(processed, total)
+
+    _write_results(all_results)
+
     headers = ["Archivo", "Conteo", "Media", "Mediana", "Moda", "Deviación Estándar",
-               "Variancia", "Tiempo Transcurrido"]
-    table = []
-    for file_path, results, elapsed_time in all_results:
-        if results is not None:
-            table.append([file_path, results['n'], f"{results['mean']:.2f}",
-                          f"{results['median']:.2f}", results['mode'],
-                        f"{results['std_dev']:.2f}", f"{results['variance']:.2f}",
-                        f"{elapsed_time:.4f} s"])
-        else:
-            table.append([file_path, "N/A", "N/A", "N/A", "N/A", "N/A", "N/A",
-                          f"{elapsed_time:.4f} s"])
+               "Variancia", "P90", "P95", "P99", "Tiempo CPU"]
+    table = [_table_row(file_path, results, elapsed_time)
+             for file_path, results, elapsed_time in all_results]
 
     print(tabulate(table, headers=headers, tablefmt="pretty"))
 
+def parse_args(argv=None):
+    """Interpreta los argumentos de línea de comandos."""
+    parser = argparse.ArgumentParser(
+        description="Calcula estadísticas descriptivas de uno o varios archivos de datos.")
+    parser.add_argument('file_paths', nargs='+', metavar='fileWithData.txt',
+                        help="Archivos con un número por línea.")
+    parser.add_argument('--bulk', action='store_true',
+                        help="Usa el lector masivo con mapeo en memoria para archivos grandes.")
+    parser.add_argument('--jobs', type=int, default=1, metavar='N',
+                        help="Procesa los archivos en paralelo con N procesos.")
+    parser.add_argument('--quantiles', choices=['auto', 'exact', 'approx'], default='auto',
+                        help="Mediana y percentiles exactos, aproximados en memoria fija, o "
+                             "aproximados solo para archivos mayores a --approx-threshold.")
+    parser.add_argument('--error', type=float, default=DEFAULT_QUANTILE_ERROR,
+                        help="Error de rango aceptable de los percentiles aproximados.")
+    parser.add_argument('--approx-threshold', type=int, default=APPROX_THRESHOLD,
+                        metavar='BYTES',
+                        help="Tamaño de archivo a partir del cual el modo 'auto' aproxima.")
+    parser.add_argument('--cache', action='store_true',
+                        help=f"Guarda un resumen por archivo en '<archivo>{CACHE_SUFFIX}' y, "
+                             "en la siguiente corrida, solo procesa las líneas agregadas.")
+    parser.add_argument('--total', action='store_true',
+                        help="Agrega una fila con las estadísticas combinadas de todos "
+                             "los archivos.")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python computeStatistics.py fileWithData1.txt [fileWithData2.txt ...]")
-    else:
-        main(sys.argv[1:])
+    args = parse_args()
+    main(args.file_paths, bulk=args.bulk, jobs=args.jobs, total=args.total,
+         quantiles=args.quantiles, error=args.error, approx_threshold=args.approx_threshold,
+         cache=args.cache)
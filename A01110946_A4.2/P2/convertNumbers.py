@@ -9,54 +9,312 @@ Los resultados se muestran tanto en la consola como en un archivo denominado
 maneja errores para datos no numéricos y archivos no encontrados, y registra
 el tiempo total de ejecución para el procesamiento de cada archivo.
 
-Uso: python convertNumbers.py archivo_con_numeros1.txt [archivo_con_numeros2.txt ...]
+Con --stream, o con --format csv/jsonl, las filas se escriben conforme se
+convierten, con anchos de columna fijos, por lo que la memoria no crece con el
+tamaño de la entrada.
+
+Uso: python convertNumbers.py [--stream] [--format {pretty,csv,jsonl}] [--width N]
+         archivo_con_numeros1.txt [archivo_con_numeros2.txt ...]
 
 Autor: Fernando Maytorena
 """
 
+import argparse
+import csv
+import json
+import os
 import sys
 import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from types import SimpleNamespace
 from tabulate import tabulate
 
-def read_numbers(file_path):
-    """Lee números de un archivo y devuelve una lista de enteros."""
-    numbers = []
+HEADERS = ["Archivo", "Decimal", "Binario", "Hexadecimal", "Tiempo Transcurrido"]
+# Números por bloque en el modo pipeline.
+CHUNK_SIZE = 65536
+# Bloques en vuelo por proceso de trabajo en el modo pipeline.
+PENDING_PER_JOB = 4
+# Entradas predeterminadas del caché de conversiones.
+DEFAULT_CACHE_SIZE = 65536
+# Archivo de resultados según el formato de salida.
+OUTPUT_FILES = {
+    'pretty': 'ConversionResults.txt',
+    'csv': 'ConversionResults.csv',
+    'jsonl': 'ConversionResults.jsonl',
+}
+
+def iter_numbers(file_path, verbose=True):
+    """
+    Lee números de un archivo de forma perezosa, produciendo un entero por línea.
+
+    :param file_path: Ruta del archivo de números.
+    :param verbose: Si es False, no reporta líneas inválidas ni archivos faltantes.
+    :return: Generador de enteros; las líneas inválidas se saltan.
+    """
     try:
         with open(file_path, 'r', encoding='utf-8') as file:
             for line in file:
                 try:
-                    number = int(line.strip())
-                    numbers.append(number)
+                    yield int(line.strip())
                 except ValueError:
-                    print(f"Error: '{line.strip()}' no es un número válido. Se omite.")
-        return numbers
+                    if verbose:
+                        print(f"Error: '{line.strip()}' no es un número válido. Se omite.")
     except FileNotFoundError as e:
-        print(f"Error al leer el archivo: {e}")
-        return []
+        if verbose:
+            print(f"Error al leer el archivo: {e}")
+
+def read_numbers(file_path):
+    """Lee números de un archivo y devuelve una lista de enteros."""
+    return list(iter_numbers(file_path))
+
+class ConversionCache:
+    """
+    Caché LRU acotado de conversiones para valores repetidos.
+
+    Cada número se convierte una sola vez mientras siga en el caché, y todas sus
+    apariciones comparten el mismo diccionario de conversión, por lo que no debe
+    modificarse. Opcionalmente se carga y se guarda en un archivo JSON para
+    reutilizarlo entre corridas.
+    """
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE, path=None):
+        """
+        Inicializa el caché.
+
+        :param maxsize: Número máximo de números distintos que se conservan.
+        :param path: Archivo de memoria persistente; si existe, se carga al iniciar.
+        """
+        self.maxsize = maxsize
+        self.path = path
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if path is not None:
+            self.load(path)
+
+    def get(self, number):
+        """
+        Devuelve la conversión de un número, calculándola solo si no está en el caché.
+
+        :param number: Entero a convertir.
+        :return: Diccionario compartido con 'Decimal', 'Binario' y 'Hexadecimal'.
+        """
+        conversion = self.entries.get(number)
+        if conversion is not None:
+            self.hits += 1
+            self.entries.move_to_end(number)
+            return conversion
+        self.misses += 1
+        conversion = {'Decimal': number, 'Binario': bin(number), 'Hexadecimal': hex(number)}
+        self.entries[number] = conversion
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        return conversion
+
+    def convert_chunk(self, numbers):
+        """
+        Convierte un bloque de números pasando cada uno por el caché.
+
+        Devuelve lo mismo que la función de módulo `convert_chunk`.
+
+        :param numbers: Lista de enteros a convertir.
+        :return: Tupla (binarios, hexadecimales) en el orden de `numbers`.
+        """
+        conversions = [self.get(number) for number in numbers]
+        return ([conversion['Binario'] for conversion in conversions],
+                [conversion['Hexadecimal'] for conversion in conversions])
+
+    def load(self, path):
+        """
+        Carga las entradas de un archivo de memoria, del menos al más reciente.
+
+        Un archivo inexistente o dañado se ignora y el caché empieza vacío; con
+        `maxsize` 0 no se carga nada.
+        """
+        if self.maxsize <= 0:
+            return
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                entries = json.load(file)['entries']
+            loaded = OrderedDict()
+            for number, binary, hexadecimal in entries[-self.maxsize:]:
+                loaded[number] = {'Decimal': number, 'Binario': binary,
+                                  'Hexadecimal': hexadecimal}
+        except (OSError, ValueError, KeyError, TypeError):
+            return
+        self.entries = loaded
 
-def convert_numbers(numbers):
-    """Convierte los números a representaciones binaria y hexadecimal."""
+    def save(self, path=None):
+        """Guarda las entradas en el archivo de memoria (por defecto, el de `path`)."""
+        path = path or self.path
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump({'entries': [[number, conversion['Binario'], conversion['Hexadecimal']]
+                                   for number, conversion in self.entries.items()]}, file)
+
+    def report(self):
+        """Crea el resumen de aciertos y fallos del caché."""
+        lookups = self.hits + self.misses
+        ratio = 100 * self.hits / lookups if lookups else 0
+        return (f"Caché de conversiones: {self.hits} aciertos, {self.misses} fallos "
+                f"({ratio:.1f} % aciertos), {len(self.entries)}/{self.maxsize} entradas.")
+
+def convert_numbers(numbers, cache=None):
+    """
+    Convierte los números a representaciones binaria y hexadecimal.
+
+    :param numbers: Iterable de enteros.
+    :param cache: ConversionCache opcional para reutilizar conversiones de valores repetidos.
+    :return: Lista de diccionarios con 'Decimal', 'Binario' y 'Hexadecimal'.
+    """
+    if cache is not None:
+        return [cache.get(n) for n in numbers]
     conversions = [{'Decimal': n, 'Binario': bin(n), 'Hexadecimal': hex(n)} for n in numbers]
     return conversions
 
-def process_files(file_paths):
-    """Procesa múltiples archivos y recolecta las conversiones."""
+def process_files(file_paths, cache=None):
+    """Procesa múltiples archivos y recolecta las conversiones, con un ConversionCache opcional."""
     conversions_list = []
     for file_path in file_paths:
         start_time = time.time()
         numbers = read_numbers(file_path)
-        conversions = convert_numbers(numbers)
+        conversions = convert_numbers(numbers, cache)
         elapsed_time = time.time() - start_time
         conversions_list.append((file_path, conversions, elapsed_time))
     return conversions_list
 
+class ConversionColumns:
+    """
+    Conversiones guardadas por columnas: listas paralelas de decimales, binarios y hexadecimales.
+
+    Evita crear un diccionario por número en el modo pipeline.
+    """
+
+    __slots__ = ('decimals', 'binaries', 'hexadecimals')
+
+    def __init__(self, decimals=None, binaries=None, hexadecimals=None):
+        """Inicializa las columnas; sin argumentos crea columnas vacías."""
+        self.decimals = decimals if decimals is not None else []
+        self.binaries = binaries if binaries is not None else []
+        self.hexadecimals = hexadecimals if hexadecimals is not None else []
+
+    def __len__(self):
+        """Número de conversiones guardadas."""
+        return len(self.decimals)
+
+    def extend(self, other):
+        """Agrega al final las conversiones de otro ConversionColumns."""
+        self.decimals.extend(other.decimals)
+        self.binaries.extend(other.binaries)
+        self.hexadecimals.extend(other.hexadecimals)
+
+    def rows(self):
+        """Devuelve un iterador de tuplas (decimal, binario, hexadecimal)."""
+        return zip(self.decimals, self.binaries, self.hexadecimals)
+
+def convert_chunk(numbers):
+    """
+    Convierte un bloque de números a sus columnas binaria y hexadecimal.
+
+    Se ejecuta en los procesos de trabajo; solo devuelve las columnas nuevas,
+    ya que el proceso principal conserva los decimales.
+
+    :param numbers: Lista de enteros.
+    :return: Tupla (lista de binarios, lista de hexadecimales).
+    """
+    return list(map(bin, numbers)), list(map(hex, numbers))
+
+def iter_number_chunks(file_path, chunk_size=CHUNK_SIZE):
+    """Lee los números de un archivo en listas de hasta `chunk_size` enteros."""
+    numbers = iter_numbers(file_path)
+    while True:
+        chunk = list(islice(numbers, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def iter_converted_chunks(file_paths, executor=None, chunk_size=CHUNK_SIZE, max_pending=1,
+                          cache=None):
+    """
+    Lee y convierte los archivos por bloques, opcionalmente en un pool de procesos.
+
+    Los resultados se entregan en el orden de los archivos y, dentro de cada archivo,
+    en el orden de sus números. Como máximo hay `max_pending` bloques en vuelo.
+
+    :param file_paths: Lista de rutas de archivos a procesar.
+    :param executor: Pool donde convertir los bloques; None los convierte en este proceso.
+    :param chunk_size: Números por bloque.
+    :param max_pending: Bloques enviados al pool antes de esperar el más antiguo.
+    :param cache: ConversionCache para la conversión en este proceso; se ignora con `executor`.
+    :return: Generador de tuplas (índice del archivo, ConversionColumns); al terminar
+    cada archivo se entrega (índice, None).
+    """
+    pending = deque()
+    for index, file_path in enumerate(file_paths):
+        for chunk in iter_number_chunks(file_path, chunk_size):
+            if executor is None:
+                convert = convert_chunk if cache is None else cache.convert_chunk
+                yield index, ConversionColumns(chunk, *convert(chunk))
+                continue
+            pending.append((index, chunk, executor.submit(convert_chunk, chunk)))
+            while len(pending) >= max_pending:
+                done_index, numbers, future = pending.popleft()
+                if future is None:
+                    yield done_index, None
+                else:
+                    yield done_index, ConversionColumns(numbers, *future.result())
+        if executor is None:
+            yield index, None
+        else:
+            pending.append((index, None, None))
+    while pending:
+        done_index, numbers, future = pending.popleft()
+        if future is None:
+            yield done_index, None
+        else:
+            yield done_index, ConversionColumns(numbers, *future.result())
+
+def process_files_pipeline(file_paths, jobs=None, chunk_size=CHUNK_SIZE):
+    """
+    Procesa múltiples archivos por bloques en un pool de procesos y guarda las conversiones
+    por columnas.
+
+    :param file_paths: Lista de rutas de archivos a procesar.
+    :param jobs: Número de procesos; None usa todos los núcleos.
+    :param chunk_size: Números por bloque.
+    :return: Lista de tuplas (ruta, ConversionColumns, tiempo transcurrido), en el orden
+    de `file_paths`. El tiempo de cada archivo se mide desde que terminó el anterior.
+    """
+    conversions_list = [(file_path, ConversionColumns()) for file_path in file_paths]
+    timings = []
+    jobs = jobs or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        start_time = time.time()
+        for index, columns in iter_converted_chunks(file_paths, executor, chunk_size,
+                                                    PENDING_PER_JOB * jobs):
+            if columns is None:
+                now = time.time()
+                timings.append(now - start_time)
+                start_time = now
+            else:
+                conversions_list[index][1].extend(columns)
+    return [(file_path, columns, elapsed_time)
+            for (file_path, columns), elapsed_time in zip(conversions_list, timings)]
+
+def _iter_rows(conversions):
+    """Itera (decimal, binario, hexadecimal) sobre conversiones en diccionarios o en columnas."""
+    if isinstance(conversions, ConversionColumns):
+        return conversions.rows()
+    return ((conversion['Decimal'], conversion['Binario'], conversion['Hexadecimal'])
+            for conversion in conversions)
+
 def print_comparative_table(all_conversions):
     """Imprime los resultados en una tabla comparativa con tabulate, y los guarda en un archivo."""
     table = []
     for file_path, conversions, elapsed_time in all_conversions:
-        for conversion in conversions:
-            table.append([file_path, conversion['Decimal'], conversion['Binario'],
-                          conversion['Hexadecimal'], f"{elapsed_time:.4f} s"])
+        for decimal, binary, hexadecimal in _iter_rows(conversions):
+            table.append([file_path, decimal, binary, hexadecimal, f"{elapsed_time:.4f} s"])
 
     headers = ["Archivo", "Decimal", "Binario", "Hexadecimal", "Tiempo Transcurrido"]
     table_str = tabulate(table, headers=headers, tablefmt="pretty")
@@ -65,10 +323,236 @@ def print_comparative_table(all_conversions):
     with open('ConversionResults.txt', 'w', encoding='utf-8') as file:
         file.write(table_str)
 
+def tee(*streams):
+    """
+    Crea un flujo que escribe el mismo texto en varios flujos a la vez.
+
+    :param streams: Flujos destino (consola y archivo de resultados).
+    :return: Objeto con un método `write`, como lo esperan los escritores y `csv.writer`.
+    """
+    def write(text):
+        for stream in streams:
+            stream.write(text)
+    return SimpleNamespace(write=write)
+
+def measure_columns(file_paths):
+    """
+    Calcula el ancho de cada columna de la tabla con una primera pasada sobre los archivos.
+
+    Solo guarda el mínimo y el máximo de cada archivo: la longitud decimal, binaria y
+    hexadecimal de un entero crece con su magnitud, así que los extremos definen el ancho.
+
+    :param file_paths: Lista de rutas de archivos a procesar.
+    :return: Lista con el ancho de cada columna de HEADERS.
+    """
+    widths = [len(header) for header in HEADERS]
+    widths[-1] = max(widths[-1], len("0.0000 s"))
+    for file_path in file_paths:
+        widths[0] = max(widths[0], len(file_path))
+        low = high = None
+        for number in iter_numbers(file_path, verbose=False):
+            if low is None or number < low:
+                low = number
+            if high is None or number > high:
+                high = number
+        for number in (low, high):
+            if number is not None:
+                widths[1] = max(widths[1], len(str(number)))
+                widths[2] = max(widths[2], len(bin(number)))
+                widths[3] = max(widths[3], len(hex(number)))
+    return widths
+
+class PrettyStreamWriter:
+    """Escribe la tabla comparativa fila por fila con anchos de columna fijos."""
+
+    def __init__(self, output, widths):
+        """
+        Inicializa el escritor.
+
+        :param output: Flujo de texto destino.
+        :param widths: Ancho de cada columna de HEADERS.
+        """
+        self.output = output
+        self.widths = widths
+        self.separator = "+" + "+".join("-" * (width + 2) for width in widths) + "+\n"
+
+    def _line(self, cells):
+        """Escribe una fila con cada celda centrada en su columna."""
+        self.output.write("| " + " | ".join(str(cell).center(width)
+                                             for cell, width in zip(cells, self.widths)) + " |\n")
+
+    def begin(self):
+        """Escribe el encabezado de la tabla."""
+        self.output.write(self.separator)
+        self._line(HEADERS)
+        self.output.write(self.separator)
+
+    def write_row(self, file_path, number, binary, hexadecimal):
+        """Escribe la fila de un número convertido."""
+        self._line([file_path, number, binary, hexadecimal, ""])
+
+    def end_file(self, file_path, elapsed_time):
+        """Escribe la fila con el tiempo transcurrido de un archivo."""
+        self._line([file_path, "", "", "", f"{elapsed_time:.4f} s"])
+
+    def end(self):
+        """Cierra la tabla."""
+        self.output.write(self.separator)
+
+class CsvStreamWriter:
+    """Escribe las conversiones como CSV, una fila por número."""
+
+    def __init__(self, output):
+        """Inicializa el escritor sobre el flujo de texto destino."""
+        self.writer = csv.writer(output, lineterminator="\n")
+
+    def begin(self):
+        """Escribe la fila de encabezados."""
+        self.writer.writerow(["archivo", "decimal", "binario", "hexadecimal"])
+
+    def write_row(self, file_path, number, binary, hexadecimal):
+        """Escribe la fila de un número convertido."""
+        self.writer.writerow([file_path, number, binary, hexadecimal])
+
+    def end_file(self, file_path, elapsed_time):
+        """Reporta en consola el tiempo transcurrido de un archivo."""
+        print(f"Tiempo transcurrido para {file_path}: {elapsed_time:.4f} s", file=sys.stderr)
+
+    def end(self):
+        """No hay nada que cerrar en CSV."""
+
+class JsonlStreamWriter:
+    """Escribe las conversiones como JSON Lines, un objeto por número."""
+
+    def __init__(self, output):
+        """Inicializa el escritor sobre el flujo de texto destino."""
+        self.output = output
+
+    def begin(self):
+        """JSON Lines no lleva encabezado."""
+
+    def write_row(self, file_path, number, binary, hexadecimal):
+        """Escribe el objeto de un número convertido."""
+        self.output.write(json.dumps({'Archivo': file_path, 'Decimal': number,
+                                      'Binario': binary, 'Hexadecimal': hexadecimal}) + "\n")
+
+    def end_file(self, file_path, elapsed_time):
+        """Reporta en consola el tiempo transcurrido de un archivo."""
+        print(f"Tiempo transcurrido para {file_path}: {elapsed_time:.4f} s", file=sys.stderr)
+
+    def end(self):
+        """No hay nada que cerrar en JSON Lines."""
+
+def _stream_writer(output_format, output, file_paths, width):
+    """
+    Crea el escritor del formato pedido sobre el flujo de salida.
+
+    :param output_format: 'pretty', 'csv' o 'jsonl'.
+    :param output: Flujo de texto destino.
+    :param file_paths: Lista de rutas de archivos a procesar (para los anchos de 'pretty').
+    :param width: Ancho fijo de las columnas numéricas, o None para medirlas.
+    """
+    if output_format == 'csv':
+        return CsvStreamWriter(output)
+    if output_format == 'jsonl':
+        return JsonlStreamWriter(output)
+    if width is None:
+        widths = measure_columns(file_paths)
+    else:
+        widths = [max(len(HEADERS[0]), *(len(path) for path in file_paths))]
+        widths.extend(max(width, len(header)) for header in HEADERS[1:4])
+        widths.append(len(HEADERS[4]))
+    return PrettyStreamWriter(output, widths)
+
+def _write_chunks(writer, file_paths, chunks):
+    """
+    Escribe las filas de los bloques convertidos y el tiempo de cada archivo al terminarlo.
+
+    :param writer: Escritor de flujo (pretty, csv o jsonl).
+    :param file_paths: Lista de rutas de archivos procesados.
+    :param chunks: Tuplas de `iter_converted_chunks`.
+    """
+    start_time = time.time()
+    for index, columns in chunks:
+        if columns is None:
+            now = time.time()
+            writer.end_file(file_paths[index], now - start_time)
+            start_time = now
+            continue
+        for number, binary, hexadecimal in columns.rows():
+            writer.write_row(file_paths[index], number, binary, hexadecimal)
+
+def stream_conversions(file_paths, output_format='pretty', width=None, jobs=1,
+                       cache=None):
+    """
+    Convierte y escribe los números fila por fila, sin acumular la tabla en memoria.
+
+    En formato 'pretty' los anchos de columna se calculan con una primera pasada
+    (`measure_columns`), salvo que se declare `width` para las columnas numéricas.
+
+    :param file_paths: Lista de rutas de archivos a procesar.
+    :param output_format: 'pretty', 'csv' o 'jsonl'.
+    :param width: Ancho fijo de las columnas Decimal, Binario y Hexadecimal; evita la
+    primera pasada.
+    :param jobs: Si es mayor que 1, convierte los bloques en un pool de `jobs` procesos.
+    :param cache: ConversionCache opcional; solo se usa cuando `jobs` es 1.
+    """
+    with open(OUTPUT_FILES[output_format], 'w', encoding='utf-8', newline='') as file:
+        writer = _stream_writer(output_format, tee(sys.stdout, file), file_paths, width)
+        writer.begin()
+        executor = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+        try:
+            _write_chunks(writer, file_paths,
+                          iter_converted_chunks(file_paths, executor,
+                                                max_pending=PENDING_PER_JOB * jobs, cache=cache))
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        writer.end()
+
+def non_negative_int(text):
+    """Tipo de argparse: entero mayor o igual que cero."""
+    value = int(text)
+    if value < 0:
+        raise argparse.ArgumentTypeError(f"debe ser un entero no negativo: {text}")
+    return value
+
+def parse_args(argv=None):
+    """Interpreta los argumentos de línea de comandos."""
+    parser = argparse.ArgumentParser(
+        description="Convierte números a binario y hexadecimal y los muestra en una tabla.")
+    parser.add_argument('file_paths', nargs='+', metavar='archivo_con_numeros.txt',
+                        help="Archivos con un número entero por línea.")
+    parser.add_argument('--stream', action='store_true',
+                        help="Escribe la tabla fila por fila con memoria constante.")
+    parser.add_argument('--format', choices=sorted(OUTPUT_FILES), default='pretty',
+                        help="Formato de salida; csv y jsonl siempre se escriben en streaming.")
+    parser.add_argument('--width', type=int, metavar='N',
+                        help="Ancho fijo de las columnas numéricas; evita la primera pasada.")
+    parser.add_argument('--jobs', type=int, default=1, metavar='N',
+                        help="Convierte los números por bloques en un pool de N procesos.")
+    parser.add_argument('--cache-size', type=non_negative_int, metavar='N',
+                        help="Activa un caché LRU de N conversiones para valores repetidos "
+                             "(no se usa con --jobs).")
+    parser.add_argument('--cache-file', metavar='RUTA',
+                        help="Carga y guarda el caché en este archivo entre corridas.")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("""Uso: python convertNumbers.py
-              archivo_con_numeros1.txt [archivo_con_numeros2.txt ...]""")
+    args = parse_args()
+    conversion_cache = None
+    if args.cache_size is not None or args.cache_file is not None:
+        cache_size = DEFAULT_CACHE_SIZE if args.cache_size is None else args.cache_size
+        conversion_cache = ConversionCache(cache_size, args.cache_file)
+    if args.stream or args.format != 'pretty':
+        stream_conversions(args.file_paths, args.format, args.width, args.jobs, conversion_cache)
+    elif args.jobs > 1:
+        print_comparative_table(process_files_pipeline(args.file_paths, args.jobs))
     else:
-        collected_conversions = process_files(sys.argv[1:])
+        collected_conversions = process_files(args.file_paths, conversion_cache)
         print_comparative_table(collected_conversions)
+    if conversion_cache is not None:
+        # Con --cache-size 0 no se sobrescribe la memoria de corridas anteriores
+        if args.cache_file is not None and conversion_cache.maxsize > 0:
+            conversion_cache.save()
+        print(conversion_cache.report())
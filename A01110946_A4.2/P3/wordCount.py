@@ -9,36 +9,323 @@ y registra el tiempo total de ejecución.
 Autor: Fernando Maytorena
 """
 
-import sys
+import argparse
+import csv
+import heapq
+import os
 import time
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from tabulate import tabulate
+from wordIndex import WordIndex
 
-def read_words(file_path):
+# Caracteres que se quitan de los extremos de cada palabra.
+PUNCTUATION = ".,!?;:'\"()[]{}"
+# Caracteres que lee el tokenizador en cada bloque.
+BLOCK_SIZE = 1 << 20
+# Tamaño objetivo, en bytes, de cada fragmento en el modo paralelo.
+SHARD_SIZE = 32 << 20
+# Bytes de espacio en blanco ASCII; en UTF-8 nunca forman parte de un carácter multibyte,
+# así que cortar justo después de uno de ellos no parte palabras ni caracteres.
+WHITESPACE_BYTES = b" \t\n\r\x0b\x0c"
+# Contadores que usa el modo --top por cada palabra reportada, si no se indica --capacity.
+TOP_CAPACITY_FACTOR = 10
+
+def iter_words(file_path, block_size=BLOCK_SIZE):
     """
-    Lee todas las palabras de un archivo, ignorando los caracteres no alfabéticos.
+    Lee las palabras de un archivo por bloques de tamaño fijo, sin cargarlo completo.
+
+    Si un bloque termina a mitad de una palabra, ese fragmento se guarda y se une al
+    inicio del siguiente bloque, así que el resultado es el mismo que al leer todo el texto.
 
     :param file_path: Ruta al archivo de texto a procesar.
-    :return: Lista de palabras en el archivo.
+    :param block_size: Número de caracteres por bloque.
+    :return: Generador de palabras en minúsculas, sin puntuación en los extremos.
     """
     try:
         with open(file_path, 'r', encoding='utf-8') as file:
-            words = file.read().lower().split()
-        words = [word.strip(".,!?;:'\"()[]{}") for word in words]
-        return words
+            carry = ''
+            while True:
+                block = file.read(block_size)
+                if not block:
+                    break
+                words = (carry + block.lower()).split()
+                carry = words.pop() if words and not block[-1].isspace() else ''
+                for word in words:
+                    yield word.strip(PUNCTUATION)
+            if carry:
+                yield carry.strip(PUNCTUATION)
     except FileNotFoundError as e:
         print(f"Error al leer el archivo: {e}")
-        return []
+
+def read_words(file_path):
+    """
+    Lee todas las palabras de un archivo, ignorando los caracteres no alfabéticos.
+
+    :param file_path: Ruta al archivo de texto a procesar.
+    :return: Lista de palabras en el archivo.
+    """
+    return list(iter_words(file_path))
 
 def count_words(words):
     """
-    Cuenta la frecuencia de cada palabra única en la lista proporcionada.
+    Cuenta la frecuencia de cada palabra única en la secuencia proporcionada.
 
-    :param words: Lista de palabras a contar.
+    :param words: Iterable de palabras a contar, por ejemplo el generador de `iter_words`.
     :return: Un objeto Counter con la frecuencia de cada palabra.
     """
     return Counter(words)
 
+def plan_shards(file_path, shard_size=SHARD_SIZE):
+    """
+    Divide un archivo en rangos de bytes que terminan justo después de un espacio en blanco.
+
+    :param file_path: Ruta al archivo de texto.
+    :param shard_size: Tamaño aproximado de cada fragmento en bytes.
+    :return: Lista de tuplas (inicio, fin) que cubren el archivo completo.
+    """
+    shards = []
+    with open(file_path, 'rb') as file:
+        size = os.fstat(file.fileno()).st_size
+        start = 0
+        while start < size:
+            end = start + shard_size
+            if end >= size:
+                end = size
+            else:
+                file.seek(end)
+                while end < size:
+                    window = file.read(BLOCK_SIZE)
+                    cut = min((index for index in (window.find(byte) for byte in WHITESPACE_BYTES)
+                               if index != -1), default=-1)
+                    if cut != -1:
+                        end += cut + 1
+                        break
+                    end = min(end + len(window), size)
+            shards.append((start, end))
+            start = end
+    return shards
+
+def count_shard(file_path, start, end):
+    """
+    Cuenta las palabras del rango de bytes [start, end) de un archivo.
+
+    Tokeniza igual que `iter_words`, por lo que la suma de los fragmentos de un archivo
+    coincide con el conteo en serie.
+
+    :return: Counter con las palabras del fragmento.
+    """
+    with open(file_path, 'rb') as file:
+        file.seek(start)
+        text = file.read(end - start).decode('utf-8')
+    return Counter(word.strip(PUNCTUATION) for word in text.lower().split())
+
+def _merge_pair(left, right):
+    """Combina dos Counter; se ejecuta en los procesos de trabajo durante la reducción."""
+    left.update(right)
+    return left
+
+def count_files_parallel(file_paths, jobs=None, shard_size=SHARD_SIZE):
+    """
+    Cuenta las palabras de varios archivos con map-reduce en un pool de procesos.
+
+    Cada archivo se divide en fragmentos (`plan_shards`) que se cuentan en paralelo;
+    después los Counter de cada archivo se combinan por pares, en rondas, como una
+    reducción en árbol que también corre en el pool.
+
+    :param file_paths: Lista de rutas de archivos de texto.
+    :param jobs: Número de procesos; None usa todos los núcleos.
+    :param shard_size: Tamaño aproximado de cada fragmento en bytes.
+    :return: Diccionario con la ruta del archivo como clave y su Counter como valor,
+    igual al que produce el modo en serie.
+    """
+    tasks = []
+    for file_path in dict.fromkeys(file_paths):
+        try:
+            tasks.extend((file_path, start, end)
+                         for start, end in plan_shards(file_path, shard_size))
+        except FileNotFoundError as e:
+            print(f"Error al leer el archivo: {e}")
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        groups = {file_path: [] for file_path in file_paths}
+        counts = executor.map(count_shard, *zip(*tasks)) if tasks else []
+        for (file_path, _, _), shard_counts in zip(tasks, counts):
+            groups[file_path].append(shard_counts)
+        while any(len(group) > 1 for group in groups.values()):
+            pairs = [(file_path, group[index], group[index + 1])
+                     for file_path, group in groups.items()
+                     for index in range(0, len(group) - 1, 2)]
+            leftovers = {file_path: group[-1:] if len(group) % 2 else []
+                         for file_path, group in groups.items()}
+            merged = executor.map(_merge_pair, [left for _, left, _ in pairs],
+                                  [right for _, _, right in pairs])
+            groups = {file_path: [] for file_path in groups}
+            for (file_path, _, _), counter in zip(pairs, merged):
+                groups[file_path].append(counter)
+            for file_path, leftover in leftovers.items():
+                groups[file_path].extend(leftover)
+    return {file_path: group[0] if group else Counter() for file_path, group in groups.items()}
+
+class SpaceSaving:
+    """
+    Resumen Space-Saving (Metwally et al.) de las palabras más frecuentes en memoria acotada.
+
+    Vigila a lo más `capacity` palabras. Cuando llega una palabra nueva y no hay lugar,
+    reemplaza a la de menor conteo y hereda ese conteo como error. Así, cada conteo
+    es una cota superior del real y `count - error` es una cota inferior; el error
+    nunca supera total / capacity.
+    """
+
+    def __init__(self, capacity):
+        """
+        Inicializa un resumen vacío.
+
+        :param capacity: Número máximo de palabras vigiladas.
+        """
+        self.capacity = capacity
+        self.total = 0
+        self.counts = {}
+        self.errors = {}
+        self._heap = []
+
+    def update(self, words):
+        """
+        Agrega todas las palabras de un iterable al resumen.
+
+        :param words: Iterable de palabras, por ejemplo el generador de `iter_words`.
+        """
+        counts, errors, heap = self.counts, self.errors, self._heap
+        for word in words:
+            self.total += 1
+            if word in counts:
+                counts[word] += 1
+            elif len(counts) < self.capacity:
+                counts[word] = 1
+                errors[word] = 0
+                heapq.heappush(heap, (1, word))
+            else:
+                minimum = self._pop_minimum()
+                counts[word] = minimum + 1
+                errors[word] = minimum
+                heapq.heappush(heap, (minimum + 1, word))
+
+    def _pop_minimum(self):
+        """
+        Saca del resumen la palabra de menor conteo y devuelve su conteo.
+
+        El heap guarda una entrada por palabra vigilada, con un conteo que puede estar
+        atrasado; las entradas atrasadas se reinsertan con su conteo actual.
+        """
+        while True:
+            count, word = heapq.heappop(self._heap)
+            current = self.counts[word]
+            if current == count:
+                del self.counts[word]
+                del self.errors[word]
+                return count
+            heapq.heappush(self._heap, (current, word))
+
+    def minimum(self):
+        """Conteo mínimo de una palabra no vigilada: 0 si el resumen no se ha llenado."""
+        if len(self.counts) < self.capacity:
+            return 0
+        return min(self.counts.values())
+
+    def merge(self, other):
+        """
+        Combina otro resumen en este, como si hubiera recibido también sus palabras.
+
+        Una palabra que falta en un resumen lleno pudo tener hasta su conteo mínimo, así
+        que ese mínimo se suma a su conteo y a su error; después se conservan las
+        `capacity` palabras con mayor conteo.
+
+        :param other: SpaceSaving a combinar; no se modifica.
+        """
+        own_minimum, other_minimum = self.minimum(), other.minimum()
+        counts, errors = {}, {}
+        for word in self.counts.keys() | other.counts.keys():
+            counts[word] = (self.counts.get(word, own_minimum)
+                            + other.counts.get(word, other_minimum))
+            errors[word] = (self.errors.get(word, own_minimum)
+                            + other.errors.get(word, other_minimum))
+        kept = heapq.nlargest(self.capacity, counts, key=counts.get)
+        self.counts = {word: counts[word] for word in kept}
+        self.errors = {word: errors[word] for word in kept}
+        self._heap = [(count, word) for word, count in self.counts.items()]
+        heapq.heapify(self._heap)
+        self.total += other.total
+
+    def top(self, k):
+        """
+        Devuelve las `k` palabras con mayor conteo estimado.
+
+        :return: Lista de tuplas (palabra, conteo estimado, error máximo), de mayor a menor.
+        """
+        words = sorted(self.counts, key=lambda word: (-self.counts[word], word))[:k]
+        return [(word, self.counts[word], self.errors[word]) for word in words]
+
+def sketch_shard(file_path, start, end, capacity):
+    """Igual que `count_shard`, pero resume el fragmento en un SpaceSaving de `capacity`."""
+    with open(file_path, 'rb') as file:
+        file.seek(start)
+        text = file.read(end - start).decode('utf-8')
+    sketch = SpaceSaving(capacity)
+    sketch.update(word.strip(PUNCTUATION) for word in text.lower().split())
+    return sketch
+
+def top_words(file_paths, capacity, jobs=1, shard_size=SHARD_SIZE):
+    """
+    Resume las palabras de todos los archivos en un único SpaceSaving.
+
+    En serie se alimenta un resumen por archivo con `iter_words`; con `jobs` mayor que 1
+    se resume cada fragmento en el pool. En ambos casos los resúmenes se combinan al final.
+
+    :param file_paths: Lista de rutas de archivos de texto.
+    :param capacity: Palabras vigiladas por cada resumen.
+    :param jobs: Número de procesos.
+    :param shard_size: Tamaño aproximado de cada fragmento en el modo paralelo.
+    :return: SpaceSaving con las palabras de todos los archivos.
+    """
+    if jobs > 1:
+        tasks = []
+        for file_path in file_paths:
+            try:
+                tasks.extend((file_path, start, end)
+                             for start, end in plan_shards(file_path, shard_size))
+            except FileNotFoundError as e:
+                print(f"Error al leer el archivo: {e}")
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            sketches = list(executor.map(sketch_shard, *zip(*tasks),
+                                         [capacity] * len(tasks))) if tasks else []
+    else:
+        sketches = []
+        for file_path in file_paths:
+            sketch = SpaceSaving(capacity)
+            sketch.update(iter_words(file_path))
+            sketches.append(sketch)
+    combined = SpaceSaving(capacity)
+    for sketch in sketches:
+        combined.merge(sketch)
+    return combined
+
+def print_top_table(sketch, k):
+    """
+    Imprime las `k` palabras más frecuentes con sus cotas de error, y las guarda en un archivo.
+
+    :param sketch: SpaceSaving con las palabras de todos los archivos.
+    :param k: Número de palabras a reportar.
+    """
+    headers = ["Palabra", "Conteo (máx.)", "Error (máx.)", "Conteo mínimo garantizado"]
+    table = [[word, count, error, count - error] for word, count, error in sketch.top(k)]
+    table_str = tabulate(table, headers=headers, tablefmt="pretty")
+    table_str += (f"\nPalabras totales: {sketch.total}. Palabras vigiladas: {sketch.capacity}. "
+                  f"Error máximo de cualquier conteo: {sketch.total // sketch.capacity}.")
+    print(table_str)
+
+    with open('WordCountResults.txt', 'w', encoding='utf-8') as file:
+        file.write(table_str)
+
 def print_comparative_table(all_word_counts):
     """
     Imprime una tabla comparativa de los conteos de palabras para todos los archivos procesados.
@@ -65,27 +352,129 @@ def print_comparative_table(all_word_counts):
     with open('WordCountResults.txt', 'w', encoding='utf-8') as file:
         file.write(table_str)
 
-def main(file_paths):
+def write_sparse_table(all_word_counts, file_name='WordCountResults.txt'):
+    """
+    Escribe los conteos en formato largo (palabra, archivo, conteo), solo las celdas no nulas.
+
+    El vocabulario se recorre en orden con una mezcla de k vías (`heapq.merge`) sobre
+    las palabras ordenadas de cada archivo, y cada fila se escribe en cuanto se produce,
+    sin construir la unión de palabras ni la tabla densa.
+
+    :param all_word_counts: Diccionario con la ruta del archivo como clave
+    y su Counter de palabras como valor.
+    :param file_name: Archivo CSV de salida.
+    :return: Número de filas escritas.
+    """
+    file_paths = list(all_word_counts)
+    sorted_words = [zip(sorted(all_word_counts[file_path]), repeat(index))
+                    for index, file_path in enumerate(file_paths)]
+    rows = 0
+    with open(file_name, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.writer(file, lineterminator="\n")
+        writer.writerow(["palabra", "archivo", "conteo"])
+        for word, index in heapq.merge(*sorted_words):
+            writer.writerow([word, file_paths[index], all_word_counts[file_paths[index]][word]])
+            rows += 1
+    print(f"Se escribieron {rows} conteos no nulos en {file_name}.")
+    return rows
+
+def update_index(directory, all_word_counts):
+    """
+    Agrega los conteos de esta corrida al índice invertido en disco de `directory`.
+
+    :param directory: Directorio del índice; se crea si no existe.
+    :param all_word_counts: Diccionario con la ruta del archivo como clave
+    y su Counter de palabras como valor.
+    """
+    with WordIndex(directory) as index:
+        index.add_files(all_word_counts)
+        print(f"Índice actualizado en {directory}: {len(index.manifest['files'])} archivos, "
+              f"{len(index.segments)} segmentos.")
+
+def main(file_paths, jobs=1, shard_size=SHARD_SIZE,  # pylint: disable=too-many-arguments
+         top=None, capacity=None, sparse=False, index=None):
     """
     Función principal que procesa múltiples archivos de texto para contar la
     frecuencia de cada palabra.
     
     :param file_paths: Lista de rutas de archivos de texto a procesar.
+    :param jobs: Si es mayor que 1, cuenta con map-reduce en un pool de `jobs` procesos.
+    :param shard_size: Tamaño aproximado de cada fragmento en el modo paralelo.
+    :param top: Si se indica, solo reporta las `top` palabras más frecuentes de todos los
+    archivos, usando un resumen SpaceSaving de memoria acotada.
+    :param capacity: Palabras vigiladas en el modo `top`; por defecto TOP_CAPACITY_FACTOR * top.
+    :param sparse: Si es True, escribe los conteos en formato largo con `write_sparse_table`
+    en lugar de la tabla comparativa.
+    :param index: Directorio de un índice invertido al que se agregan los conteos
+    (ver wordIndex.py); no aplica en el modo `top`.
     """
+    output = write_sparse_table if sparse else print_comparative_table
+    if top is not None:
+        if capacity is None:
+            capacity = TOP_CAPACITY_FACTOR * top
+        print(f"\nBuscando las {top} palabras más frecuentes en: {', '.join(file_paths)}")
+        start_time = time.time()
+        sketch = top_words(file_paths, capacity, jobs, shard_size)
+        elapsed_time = time.time() - start_time
+        print(f"Tiempo transcurrido: {elapsed_time:.4f} segundos")
+        print_top_table(sketch, top)
+        return
+
+    if jobs > 1:
+        print(f"\nProcesando en paralelo con {jobs} procesos: {', '.join(file_paths)}")
+        start_time = time.time()
+        all_word_counts = count_files_parallel(file_paths, jobs, shard_size)
+        elapsed_time = time.time() - start_time
+        print(f"Tiempo transcurrido: {elapsed_time:.4f} segundos")
+        output(all_word_counts)
+        if index is not None:
+            update_index(index, all_word_counts)
+        return
+
     all_word_counts = {}
     for file_path in file_paths:
         print(f"\nProcesando: {file_path}")
         start_time = time.time()
-        words = read_words(file_path)
-        word_counts = count_words(words)
+        word_counts = count_words(iter_words(file_path))
         all_word_counts[file_path] = word_counts
         elapsed_time = time.time() - start_time
         print(f"Tiempo transcurrido para {file_path}: {elapsed_time:.4f} segundos")
 
-    print_comparative_table(all_word_counts)
+    output(all_word_counts)
+    if index is not None:
+        update_index(index, all_word_counts)
+
+def positive_int(text):
+    """Tipo de argparse: entero mayor que cero."""
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"debe ser un entero positivo: {text}")
+    return value
+
+def parse_args(argv=None):
+    """Interpreta los argumentos de línea de comandos."""
+    parser = argparse.ArgumentParser(
+        description="Cuenta la frecuencia de cada palabra en uno o varios archivos de texto.")
+    parser.add_argument('file_paths', nargs='+', metavar='archivo.txt',
+                        help="Archivos de texto a procesar.")
+    parser.add_argument('--jobs', type=int, default=1, metavar='N',
+                        help="Cuenta con map-reduce en un pool de N procesos.")
+    parser.add_argument('--shard-size', type=int, default=SHARD_SIZE, metavar='BYTES',
+                        help="Tamaño aproximado de cada fragmento en el modo paralelo.")
+    parser.add_argument('--top', type=positive_int, metavar='K',
+                        help="Reporta solo las K palabras más frecuentes, en memoria acotada.")
+    parser.add_argument('--capacity', type=positive_int, metavar='M',
+                        help="Palabras vigiladas en el modo --top (por defecto "
+                             f"{TOP_CAPACITY_FACTOR} * K); más capacidad, menos error.")
+    parser.add_argument('--sparse', action='store_true',
+                        help="Escribe solo los conteos no nulos como CSV (palabra, archivo, "
+                             "conteo), fila por fila.")
+    parser.add_argument('--index', metavar='DIRECTORIO',
+                        help="Agrega los conteos a un índice invertido en disco, consultable "
+                             "con wordIndex.py.")
+    return parser.parse_args(argv)
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Uso: python wordCount.py archivo1.txt [archivo2.txt ...]")
-    else:
-        main(sys.argv[1:])
+    args = parse_args()
+    main(args.file_paths, args.jobs, args.shard_size, args.top, args.capacity, args.sparse,
+         args.index)
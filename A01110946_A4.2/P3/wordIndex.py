@@ -0,0 +1,361 @@
+"""
+wordIndex.py
+
+Índice invertido en disco construido a partir de los conteos de wordCount.py.
+
+El índice es un directorio con un manifiesto JSON y uno o más segmentos binarios.
+Cada segmento guarda un diccionario de términos ordenado y, para cada término, sus
+postings (archivo, conteo). Los segmentos se abren con mmap y los términos se buscan
+con búsqueda binaria, así que una consulta no lee el índice completo. Agregar
+archivos escribe un segmento nuevo en lugar de reconstruir los existentes; volver a
+indexar un archivo marca su versión anterior como obsoleta. `compact` combina todos
+los segmentos en uno y descarta los postings obsoletos.
+
+Uso: python wordIndex.py directorio_indice término [término ...] [--prefix PREFIJO ...]
+         [--compact]
+
+Autor: Fernando Maytorena
+"""
+
+import argparse
+import heapq
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from tabulate import tabulate
+
+MANIFEST_NAME = 'manifest.json'
+INDEX_VERSION = 1
+SEGMENT_MAGIC = b'WIDX'
+# Encabezado del segmento: firma, versión y número de términos.
+SEGMENT_HEADER = struct.Struct('<4sIQ')
+# Número de segmentos a partir del cual `add_files` compacta el índice.
+MAX_SEGMENTS = 16
+
+def _padded(length):
+    """Redondea una longitud al múltiplo de 8 siguiente, para alinear las secciones."""
+    return (length + 7) & ~7
+
+class IndexSegment:
+    """
+    Segmento de solo lectura del índice, mapeado en memoria.
+
+    Estructura del archivo, con cada sección alineada a 8 bytes:
+    encabezado, desplazamientos de términos (n + 1 enteros 'Q'), desplazamientos de
+    postings (n + 1 enteros 'Q'), bloque de términos en UTF-8, identificadores de
+    archivo de los postings (enteros 'I') y conteos de los postings (enteros 'Q').
+    """
+
+    def __init__(self, path):
+        """Abre y mapea el segmento ubicado en `path`."""
+        self.path = path
+        # El mapeo conserva su propia copia del descriptor, así que el archivo se cierra ya
+        with open(path, 'rb') as file:
+            self._mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.size = SEGMENT_HEADER.unpack_from(self._mapped, 0)
+        if magic != SEGMENT_MAGIC or version != INDEX_VERSION:
+            self.close()
+            raise ValueError(f"Segmento de índice inválido: {path}")
+        view = memoryview(self._mapped)
+        position = SEGMENT_HEADER.size
+        offsets_length = (self.size + 1) * 8
+        term_offsets = view[position:position + offsets_length].cast('Q')
+        position += offsets_length
+        posting_offsets = view[position:position + offsets_length].cast('Q')
+        position += offsets_length
+        # Desplazamientos de términos y de postings
+        self._offsets = (term_offsets, posting_offsets)
+        self._terms = view[position:position + term_offsets[self.size]]
+        position += _padded(term_offsets[self.size])
+        postings = posting_offsets[self.size]
+        self._posting_files = view[position:position + postings * 4].cast('I')
+        position += _padded(postings * 4)
+        self._posting_counts = view[position:position + postings * 8].cast('Q')
+        view.release()
+
+    def __len__(self):
+        """Número de términos del segmento."""
+        return self.size
+
+    def __getitem__(self, index):
+        """Devuelve el término en la posición `index`."""
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        term_offsets = self._offsets[0]
+        return str(self._terms[term_offsets[index]:term_offsets[index + 1]], 'utf-8')
+
+    def postings(self, index):
+        """
+        Devuelve los postings del término en la posición `index`.
+
+        :return: Lista de tuplas (identificador de archivo, conteo).
+        """
+        posting_offsets = self._offsets[1]
+        start, end = posting_offsets[index], posting_offsets[index + 1]
+        return list(zip(self._posting_files[start:end], self._posting_counts[start:end]))
+
+    def find(self, term):
+        """Devuelve la posición de `term`, o -1 si no está en el segmento."""
+        index = self.lower_bound(term)
+        return index if index < self.size and self[index] == term else -1
+
+    def lower_bound(self, term):
+        """Posición del primer término mayor o igual que `term` (búsqueda binaria)."""
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if self[middle] < term:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def iter_prefix(self, prefix):
+        """Genera (término, postings) para los términos que empiezan con `prefix`."""
+        index = self.lower_bound(prefix)
+        while index < self.size:
+            term = self[index]
+            if not term.startswith(prefix):
+                return
+            yield term, self.postings(index)
+            index += 1
+
+    def __iter__(self):
+        """Genera (término, postings) para todos los términos, en orden."""
+        for index in range(self.size):
+            yield self[index], self.postings(index)
+
+    def close(self):
+        """Libera el mapeo en memoria y el archivo."""
+        views = list(self.__dict__.pop('_offsets', ()))
+        views.extend(self.__dict__.pop(name, None)
+                     for name in ('_terms', '_posting_files', '_posting_counts'))
+        for view in views:
+            if view is not None:
+                view.release()
+        self._mapped.close()
+
+    @staticmethod
+    def write(path, entries):
+        """
+        Escribe un segmento nuevo.
+
+        :param path: Ruta del archivo de segmento.
+        :param entries: Iterable de (término, postings) ordenado por término, donde
+        postings es una lista de tuplas (identificador de archivo, conteo).
+        """
+        term_offsets = array('Q', [0])
+        posting_offsets = array('Q', [0])
+        terms = bytearray()
+        posting_files = array('I')
+        posting_counts = array('Q')
+        for term, postings in entries:
+            terms += term.encode('utf-8')
+            term_offsets.append(len(terms))
+            for file_id, count in postings:
+                posting_files.append(file_id)
+                posting_counts.append(count)
+            posting_offsets.append(len(posting_files))
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as file:
+            file.write(SEGMENT_HEADER.pack(SEGMENT_MAGIC, INDEX_VERSION, len(term_offsets) - 1))
+            file.write(term_offsets.tobytes())
+            file.write(posting_offsets.tobytes())
+            for section in (bytes(terms), posting_files.tobytes(), posting_counts.tobytes()):
+                file.write(section)
+                file.write(b'\0' * (_padded(len(section)) - len(section)))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+
+class WordIndex:
+    """Índice invertido en disco: manifiesto de archivos y lista de segmentos."""
+
+    def __init__(self, directory):
+        """
+        Abre el índice de `directory`, creándolo vacío si no existe.
+
+        :param directory: Directorio del índice.
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        manifest_path = os.path.join(directory, MANIFEST_NAME)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r', encoding='utf-8') as file:
+                self.manifest = json.load(file)
+            if self.manifest['byteorder'] != sys.byteorder:
+                raise ValueError(f"El índice {directory} se creó con otro orden de bytes.")
+        else:
+            self.manifest = {'version': INDEX_VERSION, 'byteorder': sys.byteorder,
+                             'next_file_id': 0, 'next_segment': 0, 'files': {},
+                             'segments': []}
+        self.segments = [IndexSegment(os.path.join(directory, name))
+                         for name in self.manifest['segments']]
+        self._file_names = {file_id: path for path, file_id in self.manifest['files'].items()}
+
+    def close(self):
+        """Cierra todos los segmentos."""
+        for segment in self.segments:
+            segment.close()
+        self.segments = []
+
+    def __enter__(self):
+        """Permite usar el índice con `with`."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Cierra el índice al salir del bloque `with`."""
+        self.close()
+
+    def _save_manifest(self):
+        """Escribe el manifiesto de forma atómica."""
+        path = os.path.join(self.directory, MANIFEST_NAME)
+        with open(path + '.tmp', 'w', encoding='utf-8') as file:
+            json.dump(self.manifest, file)
+        os.replace(path + '.tmp', path)
+
+    def _new_segment_path(self):
+        """Reserva el nombre del siguiente segmento."""
+        name = f"segment_{self.manifest['next_segment']:06d}.idx"
+        self.manifest['next_segment'] += 1
+        return name, os.path.join(self.directory, name)
+
+    def add_files(self, all_word_counts):
+        """
+        Agrega los conteos de uno o más archivos en un segmento nuevo.
+
+        Un archivo que ya estaba indexado recibe un identificador nuevo y sus postings
+        anteriores dejan de aparecer en las consultas.
+
+        :param all_word_counts: Diccionario con la ruta del archivo como clave
+        y su Counter de palabras como valor.
+        """
+        postings = {}
+        for file_path, word_counts in all_word_counts.items():
+            file_id = self.manifest['next_file_id']
+            self.manifest['next_file_id'] += 1
+            self.manifest['files'][os.path.abspath(file_path)] = file_id
+            for word, count in word_counts.items():
+                postings.setdefault(word, []).append((file_id, count))
+        self._file_names = {file_id: path for path, file_id in self.manifest['files'].items()}
+        name, path = self._new_segment_path()
+        IndexSegment.write(path, ((word, postings[word]) for word in sorted(postings)))
+        self.manifest['segments'].append(name)
+        self.segments.append(IndexSegment(path))
+        self._save_manifest()
+        if len(self.segments) > MAX_SEGMENTS:
+            self.compact()
+
+    def compact(self):
+        """Combina todos los segmentos en uno y descarta los postings obsoletos."""
+        name, path = self._new_segment_path()
+        live = set(self._file_names)
+
+        def merged_entries():
+            current, postings = None, []
+            for term, segment_postings in heapq.merge(*self.segments, key=lambda entry: entry[0]):
+                if term != current:
+                    if postings:
+                        yield current, postings
+                    current, postings = term, []
+                postings.extend(posting for posting in segment_postings if posting[0] in live)
+            if postings:
+                yield current, postings
+
+        IndexSegment.write(path, merged_entries())
+        old_names = self.manifest['segments']
+        self.close()
+        self.manifest['segments'] = [name]
+        self._save_manifest()
+        for old_name in old_names:
+            os.remove(os.path.join(self.directory, old_name))
+        self.segments = [IndexSegment(path)]
+
+    def _named(self, postings, results):
+        """Acumula postings vigentes en `results`, con la ruta del archivo como clave."""
+        for file_id, count in postings:
+            file_path = self._file_names.get(file_id)
+            if file_path is not None:
+                results[file_path] = results.get(file_path, 0) + count
+
+    def lookup(self, term):
+        """
+        Busca un término exacto.
+
+        :return: Diccionario con la ruta del archivo como clave y el conteo como valor.
+        """
+        results = {}
+        for segment in self.segments:
+            index = segment.find(term)
+            if index != -1:
+                self._named(segment.postings(index), results)
+        return results
+
+    def prefix(self, prefix):
+        """
+        Busca todos los términos que empiezan con `prefix`.
+
+        :return: Diccionario ordenado con el término como clave y, como valor, un
+        diccionario de ruta del archivo a conteo.
+        """
+        results = {}
+        for segment in self.segments:
+            for term, postings in segment.iter_prefix(prefix):
+                self._named(postings, results.setdefault(term, {}))
+        return {term: results[term] for term in sorted(results) if results[term]}
+
+def print_lookup(term, results, elapsed_time):
+    """Imprime los archivos que contienen un término y cuántas veces."""
+    print(f"\nTérmino: {term} ({elapsed_time * 1000:.2f} ms)")
+    if not results:
+        print("No aparece en ningún archivo indexado.")
+        return
+    table = sorted(results.items(), key=lambda item: (-item[1], item[0]))
+    print(tabulate(table, headers=["Archivo", "Conteo"], tablefmt="pretty"))
+
+def main(directory, terms, prefixes=(), compact=False):
+    """
+    Consulta un índice creado con `wordCount.py --index`.
+
+    :param directory: Directorio del índice.
+    :param terms: Términos a buscar de forma exacta.
+    :param prefixes: Prefijos a buscar.
+    :param compact: Si es True, compacta el índice antes de consultar.
+    """
+    with WordIndex(directory) as index:
+        if compact:
+            index.compact()
+            print(f"Índice compactado en {len(index.segments)} segmento.")
+        for term in terms:
+            start_time = time.perf_counter()
+            results = index.lookup(term.lower())
+            print_lookup(term, results, time.perf_counter() - start_time)
+        for prefix in prefixes:
+            start_time = time.perf_counter()
+            matches = index.prefix(prefix.lower())
+            elapsed_time = time.perf_counter() - start_time
+            print(f"\nPrefijo: {prefix} ({len(matches)} términos, {elapsed_time * 1000:.2f} ms)")
+            table = [[term, file_path, count] for term, files in matches.items()
+                     for file_path, count in sorted(files.items())]
+            if table:
+                print(tabulate(table, headers=["Término", "Archivo", "Conteo"],
+                               tablefmt="pretty"))
+
+def parse_args(argv=None):
+    """Interpreta los argumentos de línea de comandos."""
+    parser = argparse.ArgumentParser(description="Consulta un índice invertido de palabras.")
+    parser.add_argument('directory', help="Directorio del índice (wordCount.py --index).")
+    parser.add_argument('terms', nargs='*', help="Términos a buscar.")
+    parser.add_argument('--prefix', action='append', default=[], metavar='PREFIJO',
+                        help="Busca todos los términos que empiezan con PREFIJO.")
+    parser.add_argument('--compact', action='store_true',
+                        help="Combina los segmentos del índice antes de consultar.")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    main(args.directory, args.terms, args.prefix, args.compact)
@@ -8,12 +8,56 @@ PEP-8 y con manejo de errores básico.
 Autor: Fernando Maytorena
 Fecha: 2021-09-26
 
-Uso: python computeSales.py priceCatalogue.json salesRecord.json
+Los registros de ventas se leen en streaming, elemento por elemento, y pueden
+venir como un arreglo JSON o en formato JSON Lines (un objeto por línea).
+
+Varios pares catálogo/ventas se procesan como un lote: cada catálogo distinto
+se carga una sola vez y los pares pueden repartirse en un pool de procesos.
+
+Con --group-by se agregan, en la misma pasada, sumas y conteos por campo de la
+venta (por ejemplo Product o SALE_Date) con aritmética decimal exacta; --report
+escribe el total exacto y los grupos como JSON o CSV junto al resumen de texto.
+
+Con --cache, cada archivo de entrada se convierte una vez a un caché columnar
+binario (archivo.json.cols) que las siguientes corridas mapean en memoria en
+lugar de volver a parsear el JSON; se reconstruye si cambia la fuente.
+
+Uso: python computeSales.py [--jobs N] [--group-by CAMPO[+CAMPO]] [--report salida.json|csv]
+                            [--cache] priceCatalogue1.json salesRecord1.json [...]
 """
 
+import os
 import sys
+import csv
 import json
+import mmap
 import time
+import struct
+import hashlib
+import tempfile
+import argparse
+from array import array
+from decimal import Decimal
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+
+# Caracteres que se leen por bloque al parsear un arreglo JSON en streaming.
+STREAM_CHUNK_SIZE = 1 << 16
+JSON_WHITESPACE = ' \t\n\r'
+# Archivo donde se acumulan los resultados de todos los pares.
+RESULTS_FILE = 'SalesResults.txt'
+# Encabezados del reporte CSV de agregaciones.
+REPORT_HEADERS = ["Catálogo", "Ventas", "Grupo", "Clave", "Registros", "Cantidad", "Total"]
+# Caché columnar: sufijo, versión y encabezado (firma, versión, tamaño y mtime
+# de la fuente, longitud de los metadatos JSON que siguen).
+COLUMNS_SUFFIX = '.cols'
+COLUMNS_MAGIC = b'CSLC'
+COLUMNS_VERSION = 1
+COLUMNS_HEADER = struct.Struct('<4sHQqQ')
+# Alineación de cada columna dentro del caché, para poder hacer cast del mmap.
+COLUMNS_ALIGNMENT = 8
+# Identificador reservado en la tabla de valores para un campo ausente.
+MISSING_VALUE_ID = 0
 
 
 def load_json(file_path):
@@ -22,25 +66,620 @@ def load_json(file_path):
         return json.load(file)
 
 
+def _iter_json_array(file, buffer, chunk_size):
+    """
+    Parsea en streaming los elementos de un arreglo JSON ya abierto en `buffer`.
+
+    `buffer` empieza justo después del '['. Solo se guarda en memoria el texto
+    pendiente de parsear, nunca el arreglo completo.
+    """
+    decoder = json.JSONDecoder()
+    position = 0
+    expect_value = True
+    trailing_comma = False
+    at_eof = False
+    while True:
+        while position < len(buffer) and buffer[position] in JSON_WHITESPACE:
+            position += 1
+        if position == len(buffer):
+            if at_eof:
+                raise json.JSONDecodeError("Arreglo JSON sin cerrar", buffer, position)
+            chunk = file.read(chunk_size)
+            at_eof = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        if buffer[position] == ']':
+            if trailing_comma:
+                raise json.JSONDecodeError("Coma sobrante antes de ']'", buffer, position)
+            return
+        if not expect_value:
+            if buffer[position] != ',':
+                raise json.JSONDecodeError("Se esperaba ',' o ']'", buffer, position)
+            position += 1
+            expect_value = trailing_comma = True
+            continue
+        try:
+            record, end = decoder.raw_decode(buffer, position)
+            # Un número cortado por el bloque se parsea como un prefijo válido
+            # ("2." -> 2); el valor solo es completo si le sigue un delimitador.
+            complete = at_eof or (end < len(buffer) and buffer[end] in JSON_WHITESPACE + ',]')
+        except json.JSONDecodeError:
+            if at_eof:
+                raise
+            complete = False
+        if not complete:
+            chunk = file.read(chunk_size)
+            at_eof = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        yield record
+        position = end
+        expect_value = trailing_comma = False
+
+
+def iter_json_records(file_path, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Lee en streaming los registros de un archivo de ventas.
+
+    Acepta un arreglo JSON (los elementos se entregan conforme se parsean) o
+    JSON Lines (un objeto por línea; se ignoran las líneas vacías).
+    :param file_path: Ruta al archivo JSON o JSON Lines.
+    :param chunk_size: Caracteres que se leen por bloque.
+    :return: Generador de registros.
+    """
+    with open(file_path, 'r', encoding='utf-8') as file:
+        buffer = ''
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                return
+            buffer = (buffer + chunk).lstrip(JSON_WHITESPACE + '\ufeff')
+            if buffer:
+                break
+        if buffer[0] == '[':
+            yield from _iter_json_array(file, buffer[1:], chunk_size)
+            return
+        # JSON Lines: se parsea cada línea completa del bloque y la última,
+        # posiblemente cortada, pasa al siguiente.
+        while True:
+            lines = buffer.split('\n')
+            buffer = lines.pop()
+            for line in lines:
+                if line.strip():
+                    yield json.loads(line)
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            buffer += chunk
+        if buffer.strip():
+            yield json.loads(buffer)
+
+
+def _intern_key(value):
+    """Llave de internado que distingue tipos (1, 1.0 y True son valores distintos)."""
+    if isinstance(value, str):
+        return value
+    return (type(value).__name__, json.dumps(value, sort_keys=True))
+
+
+class _ColumnBuilder:
+    """
+    Construye una columna del caché.
+
+    La columna empieza tipada ('q' para enteros, 'd' para flotantes) y pasa a
+    identificadores de la tabla de valores ('I') en cuanto aparece un valor de
+    otro tipo o un registro sin el campo.
+    """
+
+    def __init__(self, values, interned, rows_before):
+        """
+        :param values: Tabla de valores internados, compartida por las columnas.
+        :param interned: Índice llave de internado -> identificador.
+        :param rows_before: Registros anteriores que no tenían el campo.
+        """
+        self.values = values
+        self.interned = interned
+        self.data = None
+        if rows_before:
+            self.data = array('I', [MISSING_VALUE_ID]) * rows_before
+
+    def _intern(self, value):
+        """Devuelve el identificador de un valor, internándolo si es nuevo."""
+        key = _intern_key(value)
+        value_id = self.interned.get(key)
+        if value_id is None:
+            value_id = self.interned[key] = len(self.values)
+            self.values.append(value)
+        return value_id
+
+    def _to_ids(self):
+        """Convierte una columna tipada a identificadores de valores."""
+        self.data = array('I', map(self._intern, self.data))
+
+    def append(self, value):
+        """Agrega el valor del siguiente registro."""
+        if self.data is None:
+            if isinstance(value, int) and not isinstance(value, bool):
+                self.data = array('q')
+            elif isinstance(value, float):
+                self.data = array('d')
+            else:
+                self.data = array('I')
+        typecode = self.data.typecode
+        if typecode == 'q' and isinstance(value, int) and not isinstance(value, bool) \
+                and -(1 << 63) <= value < (1 << 63):
+            self.data.append(value)
+            return
+        if typecode == 'd' and isinstance(value, float):
+            self.data.append(value)
+            return
+        if typecode != 'I':
+            self._to_ids()
+        self.data.append(self._intern(value))
+
+    def append_missing(self):
+        """Marca que el siguiente registro no tiene el campo."""
+        if self.data is None:
+            self.data = array('I')
+        elif self.data.typecode != 'I':
+            self._to_ids()
+        self.data.append(MISSING_VALUE_ID)
+
+
+def _build_columns(records):
+    """
+    Separa una secuencia de registros en columnas tipadas.
+
+    :param records: Iterable de diccionarios.
+    :return: Tupla (tabla de valores internados, columnas por nombre, número de registros).
+    """
+    values = [None]
+    interned = {}
+    columns = {}
+    count = 0
+    for record in records:
+        for name, value in record.items():
+            column = columns.get(name)
+            if column is None:
+                column = columns[name] = _ColumnBuilder(values, interned, count)
+            column.append(value)
+        if len(record) < len(columns):
+            for name, column in columns.items():
+                if name not in record:
+                    column.append_missing()
+        count += 1
+    return values, columns, count
+
+
+def write_columns(file_path, records, source_stat, extra=None):
+    """
+    Escribe el caché columnar de una secuencia de registros.
+
+    El archivo se escribe en un temporal con nombre único, para que varios
+    procesos puedan reconstruir el mismo caché a la vez, y se reemplaza de
+    forma atómica.
+    :param file_path: Ruta del caché.
+    :param records: Iterable de diccionarios.
+    :param source_stat: os.stat_result de la fuente, para invalidar el caché.
+    :param extra: Metadatos adicionales a guardar (por ejemplo el hash de la fuente).
+    """
+    values, columns, count = _build_columns(records)
+    meta = {'byteorder': sys.byteorder, 'count': count, 'values': values[1:],
+            'columns': [[name, column.data.typecode] for name, column in columns.items()]}
+    meta.update(extra or {})
+    meta_bytes = json.dumps(meta, ensure_ascii=False).encode('utf-8')
+    offset = COLUMNS_HEADER.size + len(meta_bytes)
+    descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(file_path) or '.',
+                                             prefix=os.path.basename(file_path), suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write(COLUMNS_HEADER.pack(COLUMNS_MAGIC, COLUMNS_VERSION, source_stat.st_size,
+                                           source_stat.st_mtime_ns, len(meta_bytes)))
+            file.write(meta_bytes)
+            for column in columns.values():
+                padding = -offset % COLUMNS_ALIGNMENT
+                file.write(bytes(padding))
+                column.data.tofile(file)
+                offset += padding + len(column.data) * column.data.itemsize
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class ColumnTable:
+    """
+    Caché columnar mapeado en memoria.
+
+    Cada campo es una columna tipada: enteros ('q'), flotantes ('d') o
+    identificadores ('I') en la tabla de valores internados, donde el 0 indica
+    un campo ausente. Las columnas se exponen como memoryview sobre el mmap,
+    sin copiarlas.
+    """
+
+    def __init__(self, file, mapped, meta, data_offset):
+        """Usar ColumnTable.open."""
+        self.file = file
+        self.mapped = mapped
+        self.meta = meta
+        self.count = meta['count']
+        self.values = [None] + meta['values']
+        self.columns = {}
+        self._views = []
+        offset = data_offset
+        for name, typecode in meta['columns']:
+            offset += -offset % COLUMNS_ALIGNMENT
+            size = self.count * array(typecode).itemsize
+            self.columns[name] = (typecode, offset, size)
+            offset += size
+
+    @classmethod
+    def open(cls, file_path, source_stat):
+        """
+        Abre un caché si sigue siendo válido para la fuente.
+        :param file_path: Ruta del caché.
+        :param source_stat: os.stat_result actual de la fuente.
+        :return: ColumnTable, o None si el caché no existe, es de otra versión o
+        la fuente cambió de tamaño o fecha de modificación.
+        """
+        try:
+            file = open(file_path, 'rb')  # pylint: disable=consider-using-with
+        except OSError:
+            return None
+        try:
+            header = file.read(COLUMNS_HEADER.size)
+            if len(header) != COLUMNS_HEADER.size:
+                raise ValueError("Encabezado incompleto")
+            magic, version, size, mtime_ns, meta_length = COLUMNS_HEADER.unpack(header)
+            if magic != COLUMNS_MAGIC or version != COLUMNS_VERSION \
+                    or size != source_stat.st_size or mtime_ns != source_stat.st_mtime_ns:
+                raise ValueError("Caché obsoleto")
+            meta = json.loads(file.read(meta_length).decode('utf-8'))
+            if meta['byteorder'] != sys.byteorder:
+                raise ValueError("Orden de bytes distinto")
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, KeyError, OSError):
+            file.close()
+            return None
+        return cls(file, mapped, meta, COLUMNS_HEADER.size + meta_length)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        """Número de registros."""
+        return self.count
+
+    def column(self, name):
+        """
+        Devuelve la columna cruda de un campo.
+        :param name: Nombre del campo.
+        :return: Tupla (código de tipo, memoryview), o None si ningún registro
+        tiene el campo.
+        """
+        if name not in self.columns:
+            return None
+        typecode, offset, size = self.columns[name]
+        view = memoryview(self.mapped)[offset:offset + size].cast(typecode)
+        self._views.append(view)
+        return typecode, view
+
+    def iter_values(self, name, default=None):
+        """
+        Itera los valores de un campo, registro por registro.
+        :param name: Nombre del campo.
+        :param default: Valor para los registros que no tienen el campo.
+        :return: Iterador de valores.
+        """
+        column = self.column(name)
+        if column is None:
+            return repeat(default, self.count)
+        typecode, view = column
+        if typecode != 'I':
+            return iter(view)
+        lookup = self.values.copy()
+        lookup[MISSING_VALUE_ID] = default
+        return map(lookup.__getitem__, view)
+
+    def records(self):
+        """Reconstruye los registros como diccionarios, en el orden original."""
+        names = list(self.columns)
+        missing = object()
+        columns = zip(*[self.iter_values(name, missing) for name in names])
+        for row in columns:
+            yield {name: value for name, value in zip(names, row) if value is not missing}
+
+    def close(self):
+        """Libera las vistas, el mmap y el archivo."""
+        for view in self._views:
+            view.release()
+        self._views = []
+        self.mapped.close()
+        self.file.close()
+
+
+def columns_cache_path(file_path):
+    """Ruta del caché columnar de un archivo de entrada."""
+    return file_path + COLUMNS_SUFFIX
+
+
+def load_columns(file_path, extra=None, meta_keys=()):
+    """
+    Abre el caché columnar de un archivo, construyéndolo si falta o es obsoleto.
+    :param file_path: Ruta al archivo JSON o JSON Lines.
+    :param extra: Función sin argumentos que devuelve (registros, metadatos
+    adicionales) para construir el caché; por defecto se leen en streaming.
+    :param meta_keys: Metadatos adicionales que el caché debe tener; si le falta
+    alguno (por ejemplo, porque se escribió sin `extra`), se reconstruye.
+    :return: ColumnTable; debe cerrarse al terminar.
+    """
+    cache_path = columns_cache_path(file_path)
+    source_stat = os.stat(file_path)
+    table = ColumnTable.open(cache_path, source_stat)
+    if table is not None and not all(key in table.meta for key in meta_keys):
+        table.close()
+        table = None
+    if table is None:
+        records, meta = extra() if extra else (iter_json_records(file_path), None)
+        write_columns(cache_path, records, source_stat, meta)
+        table = ColumnTable.open(cache_path, source_stat)
+    return table
+
+
+class PriceCatalogue:
+    """
+    Catálogo de precios compilado una sola vez en un índice título -> precio.
+
+    Permite reutilizar el mismo catálogo para varios archivos de ventas, con
+    búsquedas de precio en tiempo constante.
+    """
+
+    DUPLICATE_POLICIES = ('first', 'last', 'error')
+
+    def __init__(self, items, duplicates='first'):
+        """
+        Compila el índice de precios.
+        :param items: Lista de productos del catálogo, cada uno con 'title' y 'price'.
+        :param duplicates: Qué hacer con títulos repetidos: 'first' conserva el primer
+        precio (el comportamiento original), 'last' el último y 'error' lanza ValueError.
+        """
+        if duplicates not in self.DUPLICATE_POLICIES:
+            raise ValueError(f"Política de duplicados inválida: {duplicates}")
+        self.prices = {}
+        self.duplicate_titles = []
+        for item in items:
+            title = item.get('title')
+            if title in self.prices:
+                self.duplicate_titles.append(title)
+                if duplicates == 'error':
+                    raise ValueError(f"Título duplicado en el catálogo: {title}")
+                if duplicates == 'first':
+                    continue
+            self.prices[title] = item.get('price')
+
+    @classmethod
+    def from_file(cls, file_path, duplicates='first'):
+        """
+        Carga y compila un catálogo desde un archivo JSON.
+        :param file_path: Ruta al archivo JSON del catálogo de precios.
+        :param duplicates: Política para títulos repetidos; ver el constructor.
+        :return: PriceCatalogue compilado.
+        """
+        return cls(load_json(file_path), duplicates)
+
+    @classmethod
+    def from_columns(cls, table, duplicates='first'):
+        """
+        Compila un catálogo desde su caché columnar.
+        :param table: ColumnTable del catálogo.
+        :param duplicates: Política para títulos repetidos; ver el constructor.
+        :return: PriceCatalogue compilado.
+        """
+        items = ({'title': title, 'price': price} for title, price
+                 in zip(table.iter_values('title'), table.iter_values('price')))
+        return cls(items, duplicates)
+
+    def __len__(self):
+        """Número de títulos distintos en el catálogo."""
+        return len(self.prices)
+
+    def __contains__(self, title):
+        """Indica si el título está en el catálogo."""
+        return title in self.prices
+
+    def price_of(self, title):
+        """Devuelve el precio de un título, o None si no está en el catálogo."""
+        return self.prices.get(title)
+
+    def total(self, sales):
+        """Calcula el total de un registro de ventas con este catálogo."""
+        return calculate_total_sales(self, sales)
+
+
 def calculate_total_sales(prices, sales):
     """
     Calcula el total de ventas multiplicando el precio de cada producto
     por su cantidad vendida.
-    :param prices: Diccionario con los precios de los productos.
-    :param sales: Lista de diccionarios, cada uno representando una venta.
+    :param prices: PriceCatalogue, o la lista de productos del catálogo
+    (se compila en un PriceCatalogue).
+    :param sales: Iterable de diccionarios, cada uno representando una venta.
     :return: El costo total de las ventas.
     """
-    total_cost = 0
-    for sale in sales:
-        product_title = sale.get('Product')
-        product_price = next((item['price'] for item in prices
-                              if item['title'] == product_title), None)
-        if product_price is None:
-            print(f"Producto no encontrado o ID inválido: {product_title}")
-            continue
-        quantity = sale.get('Quantity', 0)
-        total_cost += product_price * quantity
-    return total_cost
+    aggregator = SalesAggregator(prices)
+    aggregator.consume(sales)
+    return aggregator.float_total
+
+
+def _new_accumulator():
+    """Acumulador [centavos, resto decimal, registros, cantidad]."""
+    return [0, Decimal(0), 0, 0]
+
+
+def _accumulated_amount(accumulator):
+    """Importe exacto de un acumulador, como Decimal."""
+    return Decimal(accumulator[0]).scaleb(-2) + accumulator[1]
+
+
+class SalesAggregator:
+    """
+    Agregador de ventas de una sola pasada: total general más sumas y conteos
+    por grupo.
+
+    Los importes se acumulan en centavos enteros cuando el precio tiene a lo
+    sumo dos decimales y la cantidad es entera; los demás se acumulan con
+    Decimal. En paralelo se lleva el total en punto flotante con el mismo orden
+    de sumas de siempre, para que el resumen de texto no cambie.
+    """
+
+    def __init__(self, prices, group_by=()):
+        """
+        Prepara el agregador.
+        :param prices: PriceCatalogue, o la lista de productos del catálogo.
+        :param group_by: Agrupaciones a calcular; cada una es una tupla de campos
+        de la venta, por ejemplo ('Product',) o ('SALE_Date', 'Product').
+        """
+        if not isinstance(prices, PriceCatalogue):
+            prices = PriceCatalogue(prices)
+        self.prices = prices
+        self.group_by = [tuple(fields) for fields in group_by]
+        self.groups = [{} for _ in self.group_by]
+        self.totals = _new_accumulator()
+        self.float_total = 0
+        self.missing = 0
+        self._exact_prices = {}
+
+    def _exact_price(self, title, price):
+        """Devuelve (centavos o None, Decimal) del precio de un título, con caché."""
+        exact = self._exact_prices.get(title)
+        if exact is None:
+            decimal_price = Decimal(str(price))
+            cents = None
+            if decimal_price.as_tuple().exponent >= -2:
+                cents = int(decimal_price.scaleb(2))
+            exact = self._exact_prices[title] = (cents, decimal_price)
+        return exact
+
+    def _accumulators(self, keys):
+        """Devuelve el acumulador total y el de cada grupo de una venta, creándolos si faltan."""
+        accumulators = [self.totals]
+        for groups, key in zip(self.groups, keys):
+            accumulator = groups.get(key)
+            if accumulator is None:
+                accumulator = groups[key] = _new_accumulator()
+            accumulators.append(accumulator)
+        return accumulators
+
+    def consume(self, sales):
+        """
+        Agrega un iterable de ventas.
+        :param sales: Iterable de diccionarios, cada uno representando una venta.
+        """
+        self._consume_rows(
+            (sale.get('Product'), sale.get('Quantity', 0),
+             [tuple(sale.get(field) for field in fields) for fields in self.group_by])
+            for sale in sales)
+
+    def consume_columns(self, table):
+        """
+        Agrega las ventas de un caché columnar sin reconstruir los registros.
+        :param table: ColumnTable del registro de ventas.
+        """
+        keys = repeat(())
+        if self.group_by:
+            keys = zip(*[zip(*[table.iter_values(field) for field in fields])
+                         for fields in self.group_by])
+        self._consume_rows(zip(table.iter_values('Product'),
+                               table.iter_values('Quantity', 0), keys))
+
+    def _consume_rows(self, rows):
+        """
+        Agrega filas (título, cantidad, llave de cada agrupación).
+        :param rows: Iterable de tuplas, una por venta.
+        """
+        for product_title, quantity, keys in rows:
+            product_price = self.prices.price_of(product_title)
+            if product_price is None:
+                print(f"Producto no encontrado o ID inválido: {product_title}")
+                self.missing += 1
+                continue
+            self.float_total += product_price * quantity
+            cents, decimal_price = self._exact_price(product_title, product_price)
+            accumulators = self._accumulators(keys)
+            if cents is not None and isinstance(quantity, int):
+                amount_cents = cents * quantity
+                for accumulator in accumulators:
+                    accumulator[0] += amount_cents
+            else:
+                amount = decimal_price * Decimal(str(quantity))
+                for accumulator in accumulators:
+                    accumulator[1] += amount
+            for accumulator in accumulators:
+                accumulator[2] += 1
+                accumulator[3] += quantity
+
+    @property
+    def total(self):
+        """Total general exacto, como Decimal."""
+        return _accumulated_amount(self.totals)
+
+    def summary(self):
+        """
+        Resume la agregación en estructuras serializables a JSON.
+
+        Los importes se representan como cadenas para no perder exactitud.
+        :return: Diccionario con total, registros, cantidad, productos no
+        encontrados y los grupos en orden de primera aparición.
+        """
+        groups = {}
+        for fields, accumulators in zip(self.group_by, self.groups):
+            groups['+'.join(fields)] = [
+                {'key': dict(zip(fields, key)),
+                 'total': str(_accumulated_amount(accumulator)),
+                 'count': accumulator[2],
+                 'quantity': accumulator[3]}
+                for key, accumulator in accumulators.items()
+            ]
+        return {'total': str(self.total), 'count': self.totals[2],
+                'quantity': self.totals[3], 'missing': self.missing, 'groups': groups}
+
+
+def aggregate_sales(prices, sales_record_path, group_by=(), start_time=None, cache=False):
+    """
+    Agrega un archivo de ventas con un catálogo ya compilado.
+    :param prices: PriceCatalogue a utilizar.
+    :param sales_record_path: Ruta al archivo JSON o JSON Lines del registro de ventas.
+    :param group_by: Agrupaciones a calcular; ver SalesAggregator.
+    :param start_time: Inicio de la medición; por defecto, el momento de la llamada.
+    :param cache: Si es True, lee las ventas desde su caché columnar.
+    :return: Tupla (texto con el total y el tiempo transcurrido, resumen estructurado).
+    """
+    if start_time is None:
+        start_time = time.time()
+    aggregator = SalesAggregator(prices, group_by)
+    if cache:
+        with load_columns(sales_record_path) as table:
+            aggregator.consume_columns(table)
+    else:
+        aggregator.consume(iter_json_records(sales_record_path))
+    elapsed_time = time.time() - start_time
+    results_str = f"""Costo total de ventas: {aggregator.float_total}\n
+    Tiempo transcurrido: {elapsed_time:.2f} segundos\n"""
+    return results_str, aggregator.summary()
+
+
+def compute_sales(prices, sales_record_path, start_time=None):
+    """
+    Calcula el total de un archivo de ventas con un catálogo ya compilado.
+    :param prices: PriceCatalogue a utilizar.
+    :param sales_record_path: Ruta al archivo JSON o JSON Lines del registro de ventas.
+    :param start_time: Inicio de la medición; por defecto, el momento de la llamada.
+    :return: Texto con el total y el tiempo transcurrido.
+    """
+    return aggregate_sales(prices, sales_record_path, start_time=start_time)[0]
 
 
 def main(price_catalogue_path, sales_record_path):
@@ -48,30 +687,179 @@ def main(price_catalogue_path, sales_record_path):
     Función principal que carga los datos, calcula el total de ventas,
     e imprime y guarda los resultados.
     :param price_catalogue_path: Ruta al archivo JSON del catálogo de precios.
-    :param sales_record_path: Ruta al archivo JSON del registro de ventas.
+    :param sales_record_path: Ruta al archivo JSON o JSON Lines del registro de ventas.
     """
     start_time = time.time()
-    prices = load_json(price_catalogue_path)
-    sales = load_json(sales_record_path)
-    total_cost = calculate_total_sales(prices, sales)
-    elapsed_time = time.time() - start_time
-    results_str = f"""Costo total de ventas: {total_cost}\n
-    Tiempo transcurrido: {elapsed_time:.2f} segundos\n"""
+    prices = PriceCatalogue.from_file(price_catalogue_path)
+    results_str = compute_sales(prices, sales_record_path, start_time)
     print(results_str)
     return results_str
 
 
+def _read_catalogue(path):
+    """Lee un catálogo y devuelve (hash del contenido, lista de productos)."""
+    with open(path, 'rb') as file:
+        raw = file.read()
+    return hashlib.blake2b(raw, digest_size=16).hexdigest(), json.loads(raw)
+
+
+def load_catalogues(catalogue_paths, cache=False):
+    """
+    Carga cada catálogo distinto una sola vez.
+
+    Las rutas se deduplican por ruta real y luego por el hash del contenido, de
+    modo que copias idénticas del mismo catálogo comparten un solo índice. Con
+    caché, el hash se guarda en los metadatos del caché columnar y el catálogo
+    se compila desde sus columnas.
+    :param catalogue_paths: Rutas a los catálogos, posiblemente repetidas.
+    :param cache: Si es True, usa el caché columnar de cada catálogo.
+    :return: Tupla (llave por ruta, PriceCatalogue por llave).
+    """
+    keys_by_realpath = {}
+    catalogues = {}
+    keys = {}
+    for path in catalogue_paths:
+        real_path = os.path.realpath(path)
+        if real_path not in keys_by_realpath:
+            if cache:
+                def build(path=path):
+                    digest, items = _read_catalogue(path)
+                    return items, {'hash': digest}
+                with load_columns(path, build, meta_keys=('hash',)) as table:
+                    key = table.meta.get('hash')
+                    if key not in catalogues:
+                        catalogues[key] = PriceCatalogue.from_columns(table)
+            else:
+                key, items = _read_catalogue(path)
+                if key not in catalogues:
+                    catalogues[key] = PriceCatalogue(items)
+            keys_by_realpath[real_path] = key
+        keys[path] = keys_by_realpath[real_path]
+    return keys, catalogues
+
+
+# Catálogos compartidos con cada proceso del pool, recibidos una vez por proceso.
+_WORKER_CATALOGUES = {}
+
+
+def _init_worker(catalogues):
+    """Inicializa un proceso del pool con los catálogos del lote."""
+    _WORKER_CATALOGUES.update(catalogues)
+
+
+def _compute_pair(catalogue_key, sales_record_path, group_by, cache):
+    """Agrega un par del lote dentro de un proceso del pool."""
+    return aggregate_sales(_WORKER_CATALOGUES[catalogue_key], sales_record_path, group_by,
+                           cache=cache)
+
+
+def write_report(report_path, pairs, summaries):
+    """
+    Escribe el reporte estructurado de un lote.
+
+    El formato se elige por la extensión: '.csv' escribe una fila por total y
+    por grupo (la clave de varios campos se une con '|'); cualquier otra
+    escribe JSON.
+    :param report_path: Ruta del reporte.
+    :param pairs: Lista de tuplas (ruta del catálogo, ruta de ventas).
+    :param summaries: Resumen de cada par, en el mismo orden; ver SalesAggregator.summary.
+    """
+    with open(report_path, 'w', encoding='utf-8', newline='') as report_file:
+        if not report_path.lower().endswith('.csv'):
+            entries = [{'catalogue': catalogue, 'sales': sales, **summary}
+                       for (catalogue, sales), summary in zip(pairs, summaries)]
+            json.dump(entries, report_file, ensure_ascii=False, indent=2)
+            report_file.write('\n')
+            return
+        writer = csv.writer(report_file, lineterminator='\n')
+        writer.writerow(REPORT_HEADERS)
+        for (catalogue, sales), summary in zip(pairs, summaries):
+            writer.writerow([catalogue, sales, '', '', summary['count'], summary['quantity'],
+                             summary['total']])
+            for group, rows in summary['groups'].items():
+                for row in rows:
+                    key = '|'.join('' if value is None else str(value)
+                                   for value in row['key'].values())
+                    writer.writerow([catalogue, sales, group, key, row['count'],
+                                     row['quantity'], row['total']])
+
+
+def run_batch(pairs, jobs=1,  # pylint: disable=too-many-arguments,too-many-locals
+              output_path=RESULTS_FILE, group_by=(), report_path=None, cache=False):
+    """
+    Procesa un lote de pares catálogo/ventas.
+
+    Los catálogos se cargan una sola vez; con jobs > 1 los pares se calculan en
+    un pool de procesos. Los resultados se imprimen y se escriben en
+    `output_path` en una sola pasada, en el orden original de los pares.
+    El tiempo reportado por par no incluye la carga compartida del catálogo.
+    :param pairs: Lista de tuplas (ruta del catálogo, ruta de ventas).
+    :param jobs: Número de procesos a utilizar.
+    :param output_path: Archivo de resultados.
+    :param group_by: Agrupaciones a calcular; ver SalesAggregator.
+    :param report_path: Si se indica, ruta del reporte estructurado (JSON o CSV).
+    :param cache: Si es True, lee catálogos y ventas desde su caché columnar.
+    :return: Lista con el texto de resultados de cada par.
+    """
+    keys, catalogues = load_catalogues([catalogue for catalogue, _ in pairs], cache)
+    catalogue_keys = [keys[catalogue] for catalogue, _ in pairs]
+    sales_paths = [sales for _, sales in pairs]
+    executor = None
+    if jobs > 1 and len(pairs) > 1:
+        executor = ProcessPoolExecutor(max_workers=min(jobs, len(pairs)),
+                                       initializer=_init_worker, initargs=(catalogues,))
+        results = executor.map(_compute_pair, catalogue_keys, sales_paths,
+                               repeat(group_by), repeat(cache))
+    else:
+        results = (aggregate_sales(catalogues[key], sales, group_by, cache=cache)
+                   for key, sales in zip(catalogue_keys, sales_paths))
+    result_strs = []
+    summaries = []
+    sections = []
+    try:
+        for catalogue, sales in pairs:
+            processing_str = f"{catalogue} y {sales}"
+            print(processing_str)
+            result_str, summary = next(results)
+            print(result_str)
+            result_strs.append(result_str)
+            summaries.append(summary)
+            sections.append(processing_str + "\n" + result_str + "\n\n----------\n\n")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    with open(output_path, 'w', encoding='utf-8') as output_file:
+        output_file.write(''.join(sections))
+    if report_path:
+        write_report(report_path, pairs, summaries)
+    return result_strs
+
+
+def parse_args(argv=None):
+    """Interpreta los argumentos de línea de comandos."""
+    parser = argparse.ArgumentParser(
+        description="Calcula el total de ventas de uno o varios pares catálogo/ventas.")
+    parser.add_argument('file_paths', nargs='+', metavar='archivo.json',
+                        help="Pares catálogo de precios, registro de ventas.")
+    parser.add_argument('--jobs', type=int, default=1, metavar='N',
+                        help="Calcula los pares en un pool de N procesos.")
+    parser.add_argument('--group-by', action='append', default=[], metavar='CAMPO[+CAMPO]',
+                        help="Agrega sumas y conteos por uno o varios campos de la venta; "
+                             "puede repetirse.")
+    parser.add_argument('--report', metavar='ARCHIVO',
+                        help="Escribe el total exacto y los grupos como JSON, o como CSV si "
+                             "la extensión es .csv.")
+    parser.add_argument('--cache', action='store_true',
+                        help="Lee las entradas desde un caché columnar binario junto a cada "
+                             f"archivo ({COLUMNS_SUFFIX}), reconstruido si la fuente cambia.")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    args = sys.argv[1:]
-    if len(args) % 2 != 0 or len(args) == 0:
+    args = parse_args()
+    if len(args.file_paths) % 2 != 0:
         print("Uso: python computeSales.py priceCatalogue1.json salesRecord1.json [...]")
     else:
-        # Asegurarse de que el archivo SalesResults.txt esté vacío al inicio
-        open('SalesResults.txt', 'w', encoding='utf-8').close()
-
-        for i in range(0, len(args), 2):
-            processing_str = f"{args[i]} y {args[i + 1]}"
-            print(processing_str)
-            result_str = main(args[i], args[i + 1])
-            with open('SalesResults.txt', 'a', encoding='utf-8') as output_file:
-                output_file.write(processing_str + "\n" + result_str + "\n\n----------\n\n")
+        run_batch(list(zip(args.file_paths[::2], args.file_paths[1::2])), args.jobs,
+                  group_by=[tuple(spec.split('+')) for spec in args.group_by],
+                  report_path=args.report, cache=args.cache)
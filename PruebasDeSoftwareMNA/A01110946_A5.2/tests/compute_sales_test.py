@@ -0,0 +1,284 @@
+"""
+Pruebas unitarias de computeSales.py.
+
+Verifican que la lectura en streaming de JSON Lines entrega los mismos
+registros y el mismo total que el arreglo JSON equivalente, que el catálogo
+resuelve precios por título, que las agrupaciones suman exactamente el total,
+que un lote produce los mismos resultados en uno o varios procesos, y que el
+caché columnar reproduce la fuente y se reconstruye cuando queda obsoleto.
+"""
+
+import csv
+import glob
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from decimal import Decimal
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+# pylint: disable=wrong-import-position
+from computeSales import (PriceCatalogue, SalesAggregator, aggregate_sales, columns_cache_path,
+                          iter_json_records, load_catalogues, load_columns, run_batch,
+                          write_report)
+
+
+class TestJsonLines(unittest.TestCase):
+    """Pruebas del formato JSON Lines."""
+
+    def setUp(self):
+        """Convierte las ventas de TC2 a JSON Lines en un directorio temporal."""
+        self.directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.sales_path = os.path.join(PROJECT_DIR, 'TC2', 'TC2.Sales.json')
+        self.jsonl_path = os.path.join(self.directory.name, 'TC2.Sales.jsonl')
+        with open(self.sales_path, 'r', encoding='utf-8') as file:
+            self.records = json.load(file)
+        with open(self.jsonl_path, 'w', encoding='utf-8') as file:
+            file.write('\n\n'.join(json.dumps(record) for record in self.records[:2]))
+            file.write('\n')
+            file.writelines(json.dumps(record) + '\n' for record in self.records[2:])
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_records_match_array(self):
+        """Todos los registros se leen, también con bloques que cortan líneas."""
+        for chunk_size in (7, 64, 1 << 16):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(list(iter_json_records(self.jsonl_path, chunk_size)), self.records)
+
+    def test_total_matches_array(self):
+        """El total de JSON Lines coincide con el del arreglo JSON."""
+        prices = PriceCatalogue.from_file(os.path.join(PROJECT_DIR, 'TC1', 'TC1.ProductList.json'))
+        self.assertEqual(prices.total(iter_json_records(self.jsonl_path)),
+                         prices.total(iter_json_records(self.sales_path)))
+
+    def test_last_line_without_newline(self):
+        """La última línea se parsea aunque no termine en salto de línea."""
+        with open(self.jsonl_path, 'w', encoding='utf-8') as file:
+            file.write('{"a": 1}\n{"a": 2}')
+        self.assertEqual(list(iter_json_records(self.jsonl_path, 4)), [{'a': 1}, {'a': 2}])
+
+
+class TestPriceCatalogue(unittest.TestCase):
+    """Pruebas del índice de precios por título."""
+
+    def setUp(self):
+        """Compila el catálogo de TC1."""
+        self.prices = PriceCatalogue.from_file(os.path.join(PROJECT_DIR, 'TC1',
+                                                            'TC1.ProductList.json'))
+
+    def test_price_of_title(self):
+        """Cada título del catálogo se resuelve a su precio."""
+        self.assertEqual(len(self.prices), 50)
+        self.assertIn('Brown eggs', self.prices)
+        self.assertEqual(self.prices.price_of('Brown eggs'), 28.1)
+
+    def test_unknown_title(self):
+        """Un título desconocido no tiene precio y su venta se omite del total."""
+        self.assertNotIn('Brown egg', self.prices)
+        self.assertIsNone(self.prices.price_of('Brown egg'))
+        self.assertIsNone(self.prices.price_of(None))
+        output = io.StringIO()
+        with redirect_stdout(output):
+            total = self.prices.total([{'Product': 'Brown eggs', 'Quantity': 2},
+                                       {'Product': 'Brown egg', 'Quantity': 5},
+                                       {'Quantity': 1}])
+        self.assertEqual(total, 28.1 * 2)
+        self.assertIn('Brown egg', output.getvalue())
+
+    def test_duplicate_titles(self):
+        """Los títulos repetidos se resuelven según la política elegida."""
+        items = [{'title': 'A', 'price': 1}, {'title': 'A', 'price': 2}]
+        self.assertEqual(PriceCatalogue(items).price_of('A'), 1)
+        self.assertEqual(PriceCatalogue(items, 'last').price_of('A'), 2)
+        self.assertEqual(PriceCatalogue(items).duplicate_titles, ['A'])
+        with self.assertRaises(ValueError):
+            PriceCatalogue(items, 'error')
+        with self.assertRaises(ValueError):
+            PriceCatalogue(items, 'newest')
+
+
+class TestGroupBy(unittest.TestCase):
+    """Pruebas de las agrupaciones y del reporte estructurado."""
+
+    GROUP_BY = [('Product',), ('SALE_Date', 'Product')]
+
+    def setUp(self):
+        """Carga el catálogo de TC1 y las ventas de TC2."""
+        self.prices = PriceCatalogue.from_file(os.path.join(PROJECT_DIR, 'TC1',
+                                                            'TC1.ProductList.json'))
+        self.sales_path = os.path.join(PROJECT_DIR, 'TC2', 'TC2.Sales.json')
+
+    def test_groups_add_up_to_total(self):
+        """Los totales, registros y cantidades de cada agrupación suman los generales."""
+        summary = aggregate_sales(self.prices, self.sales_path, self.GROUP_BY)[1]
+        records = list(iter_json_records(self.sales_path))
+        products = [row['key']['Product'] for row in summary['groups']['Product']]
+        self.assertEqual(products, list(dict.fromkeys(record['Product'] for record in records)))
+        for group, fields in (('Product', 1), ('SALE_Date+Product', 2)):
+            with self.subTest(group=group):
+                rows = summary['groups'][group]
+                self.assertTrue(all(len(row['key']) == fields for row in rows))
+                self.assertEqual(sum(Decimal(row['total']) for row in rows),
+                                 Decimal(summary['total']))
+                self.assertEqual(sum(row['count'] for row in rows), summary['count'])
+                self.assertEqual(sum(row['quantity'] for row in rows), summary['quantity'])
+
+    def test_exact_amounts(self):
+        """Los importes se suman en decimal exacto, también con cantidades fraccionarias."""
+        aggregator = SalesAggregator([{'title': 'A', 'price': 0.1}, {'title': 'B', 'price': 0.125}],
+                                     [('Product',)])
+        aggregator.consume([{'Product': 'A', 'Quantity': 1}, {'Product': 'A', 'Quantity': 2},
+                            {'Product': 'B', 'Quantity': 0.5}])
+        self.assertEqual(aggregator.total, Decimal('0.3625'))
+        rows = aggregator.summary()['groups']['Product']
+        self.assertEqual([(row['key'], Decimal(row['total'])) for row in rows],
+                         [({'Product': 'A'}, Decimal('0.3')),
+                          ({'Product': 'B'}, Decimal('0.0625'))])
+
+    def test_cache_matches_records(self):
+        """Las agrupaciones leídas del caché columnar coinciden con las de la fuente."""
+        with tempfile.TemporaryDirectory() as directory:
+            sales_path = os.path.join(directory, 'TC2.Sales.json')
+            with open(self.sales_path, 'rb') as source, open(sales_path, 'wb') as destination:
+                destination.write(source.read())
+            self.assertEqual(aggregate_sales(self.prices, sales_path, self.GROUP_BY, cache=True)[1],
+                             aggregate_sales(self.prices, sales_path, self.GROUP_BY)[1])
+
+    def test_csv_report(self):
+        """El reporte CSV tiene una fila por total y una por grupo, con claves unidas por '|'."""
+        summary = aggregate_sales(self.prices, self.sales_path, self.GROUP_BY)[1]
+        with tempfile.TemporaryDirectory() as directory:
+            report_path = os.path.join(directory, 'report.csv')
+            write_report(report_path, [('catalogo.json', 'ventas.json')], [summary])
+            with open(report_path, 'r', encoding='utf-8', newline='') as file:
+                rows = list(csv.reader(file))
+        groups = summary['groups']
+        self.assertEqual(len(rows), 2 + len(groups['Product']) + len(groups['SALE_Date+Product']))
+        self.assertEqual(rows[1][2:], ['', '', str(summary['count']), str(summary['quantity']),
+                                       summary['total']])
+        first = groups['SALE_Date+Product'][0]['key']
+        self.assertIn(f"{first['SALE_Date']}|{first['Product']}", [row[3] for row in rows])
+
+
+class TestRunBatch(unittest.TestCase):
+    """Pruebas del procesamiento de un lote de pares catálogo/ventas."""
+
+    def setUp(self):
+        """Arma un lote con los tres casos de prueba y un directorio de salida temporal."""
+        self.directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.output_path = os.path.join(self.directory.name, 'SalesResults.txt')
+        self.pairs = [(os.path.join(PROJECT_DIR, case, 'TC1.ProductList.json'),
+                       os.path.join(PROJECT_DIR, case, f'{case}.Sales.json'))
+                      for case in ('TC1', 'TC2', 'TC3')]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def run_quietly(self, **kwargs):
+        """Ejecuta el lote sin imprimir y devuelve (resultados, archivo de resultados)."""
+        with redirect_stdout(io.StringIO()):
+            result_strs = run_batch(self.pairs, output_path=self.output_path, **kwargs)
+        with open(self.output_path, 'r', encoding='utf-8') as file:
+            return result_strs, file.read()
+
+    @staticmethod
+    def totals(result_strs):
+        """Extrae la línea del total de cada resultado, sin el tiempo transcurrido."""
+        return [result_str.splitlines()[0] for result_str in result_strs]
+
+    def test_results_in_pair_order(self):
+        """Cada par se escribe en su orden con el mismo total que su cálculo individual."""
+        result_strs, output = self.run_quietly()
+        with redirect_stdout(io.StringIO()):
+            expected = [aggregate_sales(PriceCatalogue.from_file(catalogue), sales)[0]
+                        for catalogue, sales in self.pairs]
+        self.assertEqual(self.totals(result_strs), self.totals(expected))
+        positions = [output.index(f"{catalogue} y {sales}\n") for catalogue, sales in self.pairs]
+        self.assertEqual(positions, sorted(positions))
+        self.assertEqual(output.count('----------'), len(self.pairs))
+
+    def test_catalogue_copies_share_index(self):
+        """Las copias idénticas del catálogo se cargan una sola vez."""
+        keys, catalogues = load_catalogues([catalogue for catalogue, _ in self.pairs])
+        self.assertEqual(len(set(keys.values())), 1)
+        self.assertEqual(len(catalogues), 1)
+
+    def test_jobs_match_sequential(self):
+        """Con varios procesos los totales y el reporte coinciden con la corrida secuencial."""
+        reports = []
+        totals = []
+        for jobs in (1, 2):
+            report_path = os.path.join(self.directory.name, f'report{jobs}.json')
+            result_strs, _ = self.run_quietly(jobs=jobs, group_by=[('Product',)],
+                                              report_path=report_path)
+            totals.append(self.totals(result_strs))
+            with open(report_path, 'r', encoding='utf-8') as file:
+                reports.append(json.load(file))
+        self.assertEqual(totals[0], totals[1])
+        self.assertEqual(reports[0], reports[1])
+        self.assertEqual([(entry['catalogue'], entry['sales']) for entry in reports[0]],
+                         self.pairs)
+
+
+class TestColumnCache(unittest.TestCase):
+    """Pruebas del caché columnar (.cols)."""
+
+    def setUp(self):
+        """Copia el catálogo y las ventas de TC2 a un directorio temporal."""
+        self.directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.catalogue_path = os.path.join(self.directory.name, 'TC1.ProductList.json')
+        self.sales_path = os.path.join(self.directory.name, 'TC2.Sales.json')
+        for source, destination in ((os.path.join('TC1', 'TC1.ProductList.json'),
+                                     self.catalogue_path),
+                                    (os.path.join('TC2', 'TC2.Sales.json'), self.sales_path)):
+            with open(os.path.join(PROJECT_DIR, source), 'rb') as source_file, \
+                    open(destination, 'wb') as destination_file:
+                destination_file.write(source_file.read())
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_records_round_trip(self):
+        """El caché reconstruye los mismos registros y deja solo el archivo .cols."""
+        with load_columns(self.sales_path) as table:
+            self.assertEqual(list(table.records()), list(iter_json_records(self.sales_path)))
+        self.assertTrue(os.path.exists(columns_cache_path(self.sales_path)))
+        self.assertEqual(glob.glob(os.path.join(self.directory.name, '*.tmp')), [])
+
+    def test_total_matches_source(self):
+        """El total leído desde el caché coincide con el de la fuente, también al reusarlo."""
+        prices = PriceCatalogue.from_file(self.catalogue_path)
+        expected = aggregate_sales(prices, self.sales_path)[1]
+        for _ in range(2):
+            self.assertEqual(aggregate_sales(prices, self.sales_path, cache=True)[1], expected)
+
+    def test_changed_source_rebuilds(self):
+        """Si la fuente cambia, el caché se reconstruye con el contenido nuevo."""
+        with load_columns(self.sales_path) as table:
+            self.assertGreater(len(table), 1)
+        with open(self.sales_path, 'w', encoding='utf-8') as file:
+            json.dump([{'Product': 'Plums Black', 'Quantity': 3}], file)
+        with load_columns(self.sales_path) as table:
+            self.assertEqual(list(table.records()), [{'Product': 'Plums Black', 'Quantity': 3}])
+
+    def test_catalogue_cache_without_hash(self):
+        """Un caché de catálogo escrito sin hash se reconstruye con la misma llave."""
+        load_columns(self.catalogue_path).close()
+        keys, catalogues = load_catalogues([self.catalogue_path], cache=True)
+        expected_keys, expected_catalogues = load_catalogues([self.catalogue_path])
+        self.assertEqual(keys, expected_keys)
+        key = keys[self.catalogue_path]
+        self.assertEqual(len(catalogues[key]), len(expected_catalogues[key]))
+        with load_columns(self.catalogue_path) as table:
+            self.assertEqual(table.meta['hash'], key)
+
+
+if __name__ == '__main__':
+    unittest.main()
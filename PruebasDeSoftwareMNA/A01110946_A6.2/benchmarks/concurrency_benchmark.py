@@ -0,0 +1,131 @@
+"""
+Benchmark of concurrent reservations from several worker processes.
+
+Every worker opens its own storage, loads the same shared hotel and tries to
+make one-night bookings. Each booking is tried by two workers, so half of the
+attempts lose a race. After each run the hotel is reloaded and checked:
+every booking must have been made once ("double" counts the extra ones) and
+persisted ("lost" counts the missing ones). The throughput of attempts and
+of successful bookings is printed.
+
+Usage: python -m benchmarks.concurrency_benchmark [--rooms N] [--nights N]
+           [--workers N ...] [--backend {json,sqlite}]
+
+Author: Fernando Maytorena
+"""
+
+import argparse
+import datetime
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bookinn.hotel.hotel import Hotel
+from bookinn.hotel.room import Room
+from bookinn.storage.storage import open_storage, set_storage
+
+HOTEL_NAME = "Benchmark Hotel"
+
+
+def make_bookings(rooms, nights):
+    """Builds every one-night booking of the hotel as (room_number, start_date, end_date)."""
+    first_night = datetime.date(2024, 1, 1)
+    bookings = []
+    for night in range(nights):
+        start = first_night + datetime.timedelta(days=night)
+        end = start + datetime.timedelta(days=1)
+        bookings.extend((room, start.isoformat(), end.isoformat()) for room in range(rooms))
+    return bookings
+
+
+def worker(spec, index, workers, bookings):
+    """Process pool task: tries its share of the bookings and the next worker's.
+
+    Returns:
+        tuple: The number of attempts and of bookings made, and the start and end times.
+    """
+    storage = open_storage(spec)
+    set_storage(storage)
+    try:
+        hotel = Hotel(HOTEL_NAME, "", shared=True)
+        hotel.load_from_file()
+        mine = bookings[index::workers]
+        if workers > 1:
+            theirs = bookings[(index + 1) % workers::workers]
+            mine = [booking for pair in zip(mine, theirs) for booking in pair]
+        made = 0
+        start = time.time()
+        for attempt, (room, start_date, end_date) in enumerate(mine):
+            made += hotel.reserve_room(f"w{index}-{attempt}", "cust", room, start_date, end_date)
+        storage.sync()
+        return len(mine), made, start, time.time()
+    finally:
+        storage.close()
+
+
+def totals(results):
+    """Adds up the workers' results.
+
+    Returns:
+        tuple: Attempts, bookings made, and the seconds from the first start to the last end.
+    """
+    results = list(results)
+    attempts = sum(result[0] for result in results)
+    made = sum(result[1] for result in results)
+    return attempts, made, max(result[3] for result in results) - min(result[2] for result in results)
+
+
+def run(backend, rooms, nights, workers):
+    """Runs the workers on a fresh hotel and storage.
+
+    Returns:
+        tuple: Attempts, bookings made, elapsed seconds, double bookings and lost bookings.
+    """
+    bookings = make_bookings(rooms, nights)
+    with tempfile.TemporaryDirectory() as directory:
+        spec = f"sqlite:{os.path.join(directory, 'bookinn.db')}" if backend == 'sqlite' else f"json:{directory}"
+        storage = open_storage(spec)
+        previous = set_storage(storage)
+        try:
+            hotel = Hotel(HOTEL_NAME, "Benchmark")
+            hotel.rooms.extend(Room(number, "double", 100) for number in range(rooms))
+            hotel.save_to_file()
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                attempts, made, elapsed = totals(executor.map(
+                    worker, [spec] * workers, range(workers), [workers] * workers, [bookings] * workers))
+            hotel = Hotel(HOTEL_NAME, "")
+            hotel.load_from_file()
+            stored = min(sum(len(room.bookings) for room in hotel.rooms), len(storage.keys('reservation')))
+            return attempts, made, elapsed, made - len(bookings), made - stored
+        finally:
+            set_storage(previous)
+            storage.close()
+
+
+def parse_args(argv=None):
+    """Parses the command line arguments."""
+    parser = argparse.ArgumentParser(description="Measures reservation throughput as worker processes are added.")
+    parser.add_argument('--rooms', type=int, default=200, metavar='N', help="Rooms in the hotel.")
+    parser.add_argument('--nights', type=int, default=10, metavar='N', help="Nights to book every room.")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8], metavar='N',
+                        help="Worker process counts to measure.")
+    parser.add_argument('--backend', choices=['json', 'sqlite'], action='append',
+                        help="Storage backend to measure (repeatable; default both).")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Runs the benchmark and prints one line per backend and worker count."""
+    args = parse_args(argv)
+    print(f"{'backend':<8} {'workers':>7} {'booked':>7} {'seconds':>9} {'attempts/s':>11} {'bookings/s':>11}"
+          f" {'double':>7} {'lost':>5}")
+    for backend in args.backend or ['json', 'sqlite']:
+        for workers in args.workers:
+            attempts, made, elapsed, double, lost = run(backend, args.rooms, args.nights, workers)
+            print(f"{backend:<8} {workers:>7} {made:>7} {elapsed:>9.3f} {attempts / elapsed:>11.0f}"
+                  f" {made / elapsed:>11.0f} {double:>7} {lost:>5}")
+
+
+if __name__ == '__main__':
+    main()
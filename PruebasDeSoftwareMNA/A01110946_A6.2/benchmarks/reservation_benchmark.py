@@ -0,0 +1,95 @@
+"""
+Benchmark of per-call reservations against the bulk reservation API.
+
+Books the same set of reservations once through Hotel.reserve_room, one call
+per booking, and once through Hotel.reserve_rooms in batches, on a fresh
+hotel and a temporary storage for each run, and prints the throughput.
+
+Usage: python -m benchmarks.reservation_benchmark [--rooms N] [--bookings N]
+           [--batch-size N] [--backend {json,sqlite}]
+
+Author: Fernando Maytorena
+"""
+
+import argparse
+import datetime
+import os
+import tempfile
+import time
+
+from bookinn.hotel.hotel import Hotel
+from bookinn.hotel.room import Room
+from bookinn.storage.storage import open_storage, set_storage
+
+
+def make_bookings(rooms, bookings):
+    """Builds non-conflicting one-night bookings spread over the rooms."""
+    first_night = datetime.date(2024, 1, 1)
+    batch = []
+    for index in range(bookings):
+        start = first_night + datetime.timedelta(days=index // rooms)
+        batch.append({
+            'reservation_id': f"bench{index}",
+            'customer_id': f"cust{index}",
+            'room_number': index % rooms,
+            'start_date': start.isoformat(),
+            'end_date': (start + datetime.timedelta(days=1)).isoformat(),
+        })
+    return batch
+
+
+def run(backend, rooms, batch, batch_size):
+    """Books every item on a fresh hotel and returns the elapsed seconds.
+
+    Parameters:
+        backend (str): 'json' or 'sqlite'.
+        rooms (int): Number of rooms in the hotel.
+        batch (list): Bookings, as taken by Hotel.reserve_rooms.
+        batch_size (int): Bookings per reserve_rooms call, or 0 to use reserve_room.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        location = os.path.join(directory, 'bookinn.db') if backend == 'sqlite' else directory
+        storage = open_storage(f"{backend}:{location}")
+        previous = set_storage(storage)
+        try:
+            hotel = Hotel("Benchmark Hotel", "Benchmark")
+            hotel.rooms.extend(Room(number, "double", 100) for number in range(rooms))
+            hotel.save_to_file()
+            start = time.perf_counter()
+            if batch_size:
+                for offset in range(0, len(batch), batch_size):
+                    hotel.reserve_rooms(batch[offset:offset + batch_size])
+            else:
+                for item in batch:
+                    hotel.reserve_room(**item)
+            storage.sync()
+            return time.perf_counter() - start
+        finally:
+            set_storage(previous)
+            storage.close()
+
+
+def parse_args(argv=None):
+    """Parses the command line arguments."""
+    parser = argparse.ArgumentParser(description="Compares per-call and bulk reservation throughput.")
+    parser.add_argument('--rooms', type=int, default=500, metavar='N', help="Rooms in the hotel.")
+    parser.add_argument('--bookings', type=int, default=5000, metavar='N', help="Bookings to make.")
+    parser.add_argument('--batch-size', type=int, default=500, metavar='N', help="Bookings per bulk call.")
+    parser.add_argument('--backend', choices=['json', 'sqlite'], action='append',
+                        help="Storage backend to measure (repeatable; default both).")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Runs the benchmark and prints one line per backend and API."""
+    args = parse_args(argv)
+    batch = make_bookings(args.rooms, args.bookings)
+    print(f"{'backend':<8} {'api':<14} {'seconds':>9} {'bookings/s':>12}")
+    for backend in args.backend or ['json', 'sqlite']:
+        for api, batch_size in (('reserve_room', 0), ('reserve_rooms', args.batch_size)):
+            elapsed = run(backend, args.rooms, batch, batch_size)
+            print(f"{backend:<8} {api:<14} {elapsed:>9.3f} {len(batch) / elapsed:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
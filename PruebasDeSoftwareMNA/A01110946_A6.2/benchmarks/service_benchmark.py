@@ -0,0 +1,135 @@
+"""
+Load test of the bookinn HTTP/JSON service on one machine.
+
+Starts the service in a subprocess on a temporary storage (or targets a
+running one with --port), creates a hotel and runs concurrent keep-alive
+clients. Each request is a read (the rooms free for a night) or, with
+probability --write-ratio, a one-night reservation of a random room. Prints
+the throughput and the latency percentiles of reads and writes.
+
+Usage: python -m benchmarks.service_benchmark [--clients N] [--requests N]
+           [--write-ratio R] [--backend {json,sqlite}] [--port PORT]
+
+Author: Fernando Maytorena
+"""
+
+import argparse
+import asyncio
+import datetime
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from bookinn.service.client import ServiceClient, quote
+
+HOTEL_NAME = "Load Test Hotel"
+
+
+def percentile(values, fraction):
+    """Returns the value at a fraction (0 to 1) of the sorted values."""
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))] if values else 0.0
+
+
+async def wait_for_service(port, timeout=10.0):
+    """Waits until the service accepts connections."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection('127.0.0.1', port)
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.05)
+            continue
+        writer.close()
+        await writer.wait_closed()
+        return
+
+
+async def client_loop(port, index, requests, args, latencies):
+    """Sends one client's share of the requests and records their latencies."""
+    client = ServiceClient('127.0.0.1', port)
+    rng = random.Random(index)
+    hotel = f"/hotels/{quote(HOTEL_NAME)}"
+    first_night = datetime.date(2024, 1, 1)
+    try:
+        for attempt in range(requests):
+            night = first_night + datetime.timedelta(days=rng.randrange(args.nights))
+            end = night + datetime.timedelta(days=1)
+            start = time.perf_counter()
+            if rng.random() < args.write_ratio:
+                status, _ = await client.request('POST', f"{hotel}/reservations", {
+                    'reservation_id': f"load{index}-{attempt}", 'customer_id': f"c{index}",
+                    'room_number': rng.randrange(args.rooms),
+                    'start_date': night.isoformat(), 'end_date': end.isoformat()})
+                kind = 'write'
+            else:
+                status, _ = await client.request('GET', f"{hotel}/rooms?start={night}&end={end}")
+                kind = 'read'
+            if status >= 500:
+                raise RuntimeError(f"service answered {status}")
+            latencies[kind].append(time.perf_counter() - start)
+    finally:
+        await client.close()
+
+
+async def run(args, port):
+    """Creates the hotel and runs the clients against the service on a port."""
+    await wait_for_service(port)
+    client = ServiceClient('127.0.0.1', port)
+    await client.request('POST', '/hotels', {
+        'name': HOTEL_NAME, 'location': "Benchmark",
+        'rooms': [{'room_number': number, 'room_type': "double", 'price': 100} for number in range(args.rooms)]})
+    await client.close()
+    latencies = {'read': [], 'write': []}
+    share = args.requests // args.clients
+    start = time.perf_counter()
+    await asyncio.gather(*(client_loop(port, index, share, args, latencies) for index in range(args.clients)))
+    elapsed = time.perf_counter() - start
+    total = sum(len(values) for values in latencies.values())
+    print(f"{total} requests from {args.clients} clients in {elapsed:.3f} s: {total / elapsed:.0f} requests/s")
+    print(f"{'kind':<6} {'count':>7} {'p50 ms':>8} {'p99 ms':>8}")
+    for kind, values in latencies.items():
+        print(f"{kind:<6} {len(values):>7} {percentile(values, 0.5) * 1000:>8.2f} "
+              f"{percentile(values, 0.99) * 1000:>8.2f}")
+
+
+def parse_args(argv=None):
+    """Parses the command line arguments."""
+    parser = argparse.ArgumentParser(description="Load-tests the bookinn service on this machine.")
+    parser.add_argument('--clients', type=int, default=32, metavar='N', help="Concurrent connections.")
+    parser.add_argument('--requests', type=int, default=5000, metavar='N', help="Total requests.")
+    parser.add_argument('--write-ratio', type=float, default=0.2, metavar='R', help="Fraction of reservations.")
+    parser.add_argument('--rooms', type=int, default=200, metavar='N', help="Rooms in the hotel.")
+    parser.add_argument('--nights', type=int, default=60, metavar='N', help="Nights reservations spread over.")
+    parser.add_argument('--backend', choices=['json', 'sqlite'], default='sqlite',
+                        help="Storage of the service started by the benchmark.")
+    parser.add_argument('--port', type=int,
+                        help="Target a service already running on this port instead of starting one.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Runs the load test."""
+    args = parse_args(argv)
+    if args.port:
+        asyncio.run(run(args, args.port))
+        return
+    with tempfile.TemporaryDirectory() as directory:
+        spec = f"sqlite:{os.path.join(directory, 'bookinn.db')}" if args.backend == 'sqlite' else f"json:{directory}"
+        port = 18000 + os.getpid() % 1000
+        project = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        with subprocess.Popen([sys.executable, '-m', 'bookinn.service.server', '--port', str(port),
+                               '--storage', spec], cwd=project, stdout=subprocess.DEVNULL) as server:
+            try:
+                asyncio.run(run(args, port))
+            finally:
+                server.terminate()
+
+
+if __name__ == '__main__':
+    main()
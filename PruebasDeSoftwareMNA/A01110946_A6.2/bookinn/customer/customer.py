@@ -5,8 +5,7 @@ Author: Fernando Maytorena
 Last edited: February 08, 2024
 """
 
-import json
-import os
+from bookinn.storage.storage import get_storage
 
 
 class Customer:
@@ -20,14 +19,13 @@ class Customer:
         self.filename = f"customer_{customer_id}.json"
 
     def save_to_file(self):
-        """Saves customer data to a file."""
+        """Saves customer data to the active storage backend."""
         data = {
             'customer_id': self.customer_id,
             'name': self.name,
             'email': self.email
         }
-        with open(self.filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f)
+        get_storage().save('customer', self.customer_id, data)
 
     @staticmethod
     def create_customer(customer_id, name, email):
@@ -38,9 +36,8 @@ class Customer:
 
     @staticmethod
     def delete_customer(customer_id):
-        """Deletes a customer's data file."""
-        filename = f"customer_{customer_id}.json"
-        os.remove(filename)
+        """Deletes a customer's record."""
+        get_storage().delete('customer', customer_id)
 
     def display_customer_info(self):
         """Displays the customer's information."""
@@ -57,8 +54,6 @@ class Customer:
 
     @staticmethod
     def load_customer(customer_id):
-        """Loads a customer's data from a file."""
-        filename = f"customer_{customer_id}.json"
-        with open(filename, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        """Loads a customer's data from the active storage backend."""
+        data = get_storage().load('customer', customer_id)
         return Customer(data['customer_id'], data['name'], data['email'])
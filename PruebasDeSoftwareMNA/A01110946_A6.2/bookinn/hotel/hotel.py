@@ -5,40 +5,426 @@ Author: Fernando Maytorena
 Last edited: February 08, 2024
 """
 
-import json
-import os
+import contextlib
+import functools
+import threading
+import uuid
 from bookinn.hotel.room import Room
 from bookinn.reservation.reservation import make_reservation
+from bookinn.storage.locks import SharedLock
+from bookinn.storage.storage import RecordNotFound, get_storage
 
+# Journal entries after which a reservation change writes a full snapshot instead
+JOURNAL_COMPACT_EVERY = 1000
+# Rooms reserve_any tries when other writers keep booking the chosen room first
+RESERVE_ANY_ATTEMPTS = 32
 
-class Hotel:
-    """Represents a hotel within the reservation system, with persistence."""
 
-    def __init__(self, name, location):
-        """Initializes a Hotel object with a name and location."""
+class RoomList(list):
+    """List of a hotel's rooms that indexes them by number and by type.
+
+    The free rooms of each type are kept in insertion-ordered dictionaries,
+    which the list updates as it observes its rooms' availability, so
+    lookups, "any free room of a type" and free room counts do not scan the
+    list. Appending indexes the room incrementally; any other change to the
+    list rebuilds the index.
+    """
+
+    def __init__(self, rooms=()):
+        """Initializes the list with its initial rooms and indexes them."""
+        super().__init__(rooms)
+        self.lock = threading.RLock()
+        self._by_number = {}
+        self._by_type = {}
+        self._free_by_type = {}
+        self._reindex()
+
+    def append(self, room):
+        """Adds a room and indexes it."""
+        super().append(room)
+        self._index(room)
+
+    def _rebuilding(name):  # pylint: disable=no-self-argument
+        """Wraps a list method so the index is rebuilt after it runs."""
+        method = getattr(list, name)
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            result = method(self, *args, **kwargs)
+            self._reindex()  # pylint: disable=protected-access
+            return result
+        return wrapper
+
+    extend = _rebuilding('extend')
+    insert = _rebuilding('insert')
+    remove = _rebuilding('remove')
+    pop = _rebuilding('pop')
+    clear = _rebuilding('clear')
+    __setitem__ = _rebuilding('__setitem__')
+    __delitem__ = _rebuilding('__delitem__')
+    __iadd__ = _rebuilding('__iadd__')
+    del _rebuilding
+
+    def _index(self, room):
+        """Adds a room to the index and starts observing its availability."""
+        with self.lock:
+            room.observer = self
+            self._by_number.setdefault(room.room_number, room)
+            if self._by_number[room.room_number] is room:
+                self._by_type.setdefault(room.room_type, {})[room.room_number] = room
+                if room.is_available:
+                    self._free_by_type.setdefault(room.room_type, {})[room.room_number] = room
+
+    def _reindex(self):
+        """Rebuilds the index from the list."""
+        with self.lock:
+            for room in self._by_number.values():
+                if room.observer is self:
+                    room.observer = None
+            self._by_number = {}
+            self._by_type = {}
+            self._free_by_type = {}
+            for room in self:
+                self._index(room)
+
+    def room_availability_changed(self, room):
+        """Updates the free room sets after a room's availability changes."""
+        with self.lock:
+            if self._by_number.get(room.room_number) is not room:
+                return
+            free = self._free_by_type.setdefault(room.room_type, {})
+            if room.is_available:
+                free[room.room_number] = room
+            else:
+                free.pop(room.room_number, None)
+
+    def get(self, room_number):
+        """Returns the room with the given number, or None."""
+        return self._by_number.get(room_number)
+
+    def of_type(self, room_type=None):
+        """Returns the rooms, optionally only those of one type."""
+        with self.lock:
+            if room_type is not None:
+                return list(self._by_type.get(room_type, {}).values())
+            return list(self._by_number.values())
+
+    def free(self, room_type=None):
+        """Returns the free rooms, optionally only those of one type."""
+        with self.lock:
+            if room_type is not None:
+                return list(self._free_by_type.get(room_type, {}).values())
+            return [room for free in self._free_by_type.values() for room in free.values()]
+
+    def first_free(self, room_type):
+        """Returns the free room of a type indexed first, or None."""
+        with self.lock:
+            free = self._free_by_type.get(room_type)
+            return next(iter(free.values())) if free else None
+
+    def count_free(self, room_type=None):
+        """Returns the number of free rooms, optionally only those of one type."""
+        with self.lock:
+            if room_type is not None:
+                return len(self._free_by_type.get(room_type, {}))
+            return sum(len(free) for free in self._free_by_type.values())
+
+
+# Besides its data, a hotel keeps its locks and where it is in its journal
+class Hotel:  # pylint: disable=too-many-instance-attributes
+    """Represents a hotel within the reservation system, with persistence.
+
+    The rooms are indexed by number and by type (see RoomList), so lookups,
+    "reserve any free room of a type" and free room counts do not scan them.
+    Date ranges are checked against each room's sorted bookings (see
+    Room.is_free).
+
+    save_to_file writes a full snapshot. Reservations and cancellations only
+    append the changed room to the hotel's journal; every compact_every
+    entries the journal is folded into a new snapshot. Each snapshot starts a
+    new journal generation, so entries left over from an older snapshot are
+    never replayed.
+
+    Changes hold the hotel lock shared and the lock of each room they touch,
+    so threads booking different rooms do not wait for each other, while
+    snapshots hold the hotel lock exclusively. A shared hotel, one that other
+    processes change through the same storage, also takes the matching
+    storage locks and replays the other processes' journal entries before
+    checking its rooms (see locked).
+    """
+
+    def __init__(self, name, location, shared=False):
+        """Initializes a Hotel object with a name and location.
+
+        Parameters:
+            name (str): The hotel's name.
+            location (str): The hotel's location.
+            shared (bool): Whether other processes change the hotel too.
+        """
         self.name = name
         self.location = location
+        self.shared = shared
+        self.writer_id = uuid.uuid4().hex  # Tags this object's journal entries
+        self._lock = SharedLock()
+        self._journal_lock = threading.RLock()
         self.rooms = []  # Could be a list of Room objects
         self.filename = f"{name}_data.json"
+        # Like the filename, the stored record keeps the name the hotel was created with
+        self.storage_key = name
+        self.journal_generation = None  # Journal started by the last snapshot
+        self.journal_seq = 0  # Entries of that journal applied so far
+        self.journal_position = None  # Where the next refresh reads the journal from
+        self.compact_every = JOURNAL_COMPACT_EVERY
+
+    @contextlib.contextmanager
+    def _storage_lock(self, name, shared=False):
+        """Holds one of the hotel's storage locks, if the hotel is shared."""
+        if self.shared:
+            with get_storage().lock(f"{self.storage_key}_{name}", shared):
+                yield
+        else:
+            yield
+
+    @contextlib.contextmanager
+    def locked(self, room_numbers=()):
+        """Holds the locks needed to check and change the given rooms.
+
+        Takes the hotel lock shared and then the lock of each existing room,
+        in room number order so that concurrent batches cannot deadlock. A
+        shared hotel takes the same locks in storage and then refreshes, so
+        the rooms reflect every change other processes have persisted.
+        """
+        room_numbers = list(room_numbers)
+        self._lock.acquire_shared()
+        try:
+            if self.shared:
+                storage_locks = self._storage_locks(room_numbers)
+            else:
+                storage_locks = contextlib.nullcontext(self._existing_rooms(room_numbers))
+            with storage_locks as numbers:
+                locks = [self.get_room(number).lock for number in numbers]
+                for lock in locks:
+                    lock.acquire()
+                try:
+                    yield self
+                finally:
+                    for lock in reversed(locks):
+                        lock.release()
+        finally:
+            self._lock.release_shared()
+
+    def _existing_rooms(self, room_numbers):
+        """Returns the numbers of the given rooms the hotel has, in lock order."""
+        return sorted({number for number in room_numbers if self.get_room(number) is not None}, key=str)
+
+    @contextlib.contextmanager
+    def _storage_locks(self, room_numbers):
+        """Holds the hotel's storage lock shared and the given rooms' exclusively, then refreshes.
+
+        The refresh can add rooms another process created; if one of the given
+        rooms was among them, the locks are taken again including it.
+
+        Yields:
+            list: The numbers of the given rooms that exist, in lock order.
+        """
+        storage = get_storage()
+        while True:
+            numbers = self._existing_rooms(room_numbers)
+            with contextlib.ExitStack() as stack:
+                stack.enter_context(storage.lock(f"{self.storage_key}_hotel", shared=True))
+                for number in numbers:
+                    stack.enter_context(storage.lock(f"{self.storage_key}_room{number}"))
+                self._refresh()
+                if self._existing_rooms(room_numbers) == numbers:
+                    yield numbers
+                    return
+
+    @contextlib.contextmanager
+    def _exclusive(self):
+        """Holds the hotel lock exclusively, in storage too if the hotel is shared."""
+        with self._lock.exclusive(), self._storage_lock('hotel'):
+            if self.shared and self.journal_generation is not None:
+                self._refresh()
+            yield
 
     def save_to_file(self):
-        """Saves hotel data to a file."""
+        """Saves a full snapshot of the hotel and starts a new, empty journal."""
+        with self._exclusive():
+            self._write_snapshot()
+
+    def _write_snapshot(self):
+        """Writes the snapshot; the caller holds the hotel lock exclusively."""
+        generation = uuid.uuid4().hex
         data = {
             'name': self.name,
             'location': self.location,
-            'rooms': [room.to_dict() for room in self.rooms]
+            'rooms': [room.to_dict() for room in self.rooms],
+            'journal_generation': generation
         }
-        with open(self.filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f)
+        storage = get_storage()
+        with storage.transaction():
+            storage.save('hotel', self.storage_key, data)
+            storage.save('hotel_head', self.storage_key, {'generation': generation})
+            storage.clear_journal('hotel', self.storage_key)
+        with self._journal_lock:
+            self.journal_generation = generation
+            self.journal_seq = 0
+            self.journal_position = None
+
+    def add_room(self, room):
+        """Adds a room and saves a snapshot, unless the hotel has a room with its number.
+
+        The check and the snapshot hold the hotel lock exclusively, so
+        concurrent calls cannot add two rooms with the same number.
+
+        Returns:
+            bool: Whether the room was added.
+        """
+        with self._exclusive():
+            if self.get_room(room.room_number) is not None:
+                return False
+            self.rooms.append(room)
+            self._write_snapshot()
+        return True
+
+    def _compact_if_due(self):
+        """Writes a snapshot if the hotel has none yet or its journal is over compact_every entries."""
+        if self.journal_generation is None or self.journal_seq > self.compact_every:
+            with self._exclusive():
+                if self.journal_generation is None or self.journal_seq > self.compact_every:
+                    self._write_snapshot()
+
+    def _record_room_changes(self, rooms):
+        """Persists the new state of several rooms with a single journal append.
+
+        Call with the rooms locked (see locked). A hotel without a snapshot is
+        persisted by the next _compact_if_due instead.
+        """
+        changed = list({id(room): room for room in rooms}.values())
+        with self._journal_lock:
+            if self.journal_generation is None:
+                return
+            entries = []
+            for room in changed:
+                self.journal_seq += 1
+                entries.append({'generation': self.journal_generation, 'seq': self.journal_seq,
+                                'writer': self.writer_id, 'room': room.to_dict()})
+            get_storage().append_journal('hotel', self.storage_key, entries)
+
+    def _refresh(self):
+        """Applies the room changes other processes have persisted since the last refresh.
+
+        Replays the journal entries appended since, or reloads every room in
+        place if another process has written a new snapshot. Call with the
+        hotel's storage lock held (see locked).
+        """
+        storage = get_storage()
+        with self._journal_lock:
+            try:
+                generation = storage.load('hotel_head', self.storage_key)['generation']
+            except RecordNotFound:
+                # Snapshots written before head records existed
+                generation = storage.load('hotel', self.storage_key).get('journal_generation')
+            if generation != self.journal_generation:
+                for room_data in self._read_stored_rooms(storage)[1]:
+                    self._restore_room(room_data)
+                return
+            entries, self.journal_position = storage.read_journal_from(
+                'hotel', self.storage_key, self.journal_position)
+            for entry in entries:
+                if entry.get('generation') != self.journal_generation:
+                    continue
+                self.journal_seq += 1
+                if entry.get('writer') != self.writer_id:
+                    self._restore_room(entry['room'])
+
+    def refresh_for_reading(self):
+        """Applies the changes other processes have persisted, if the hotel is shared.
+
+        Unlike locked, it takes no room locks and only a read lock in storage
+        (see Storage.read_lock), so reads do not wait for writers.
+        """
+        if self.shared:
+            with self._lock.shared(), get_storage().read_lock(f"{self.storage_key}_hotel"):
+                self._refresh()
+
+    def _restore_room(self, room_data):
+        """Brings a room in line with its stored state, adding it if it is new."""
+        room = self.get_room(room_data['room_number'])
+        if room is None:
+            self.rooms.append(Room.from_dict(room_data))
+        else:
+            room.restore(room_data)
+
+    @property
+    def rooms(self):
+        """RoomList: The hotel's rooms."""
+        return self._rooms
+
+    @rooms.setter
+    def rooms(self, rooms):
+        """Replaces the hotel's rooms and indexes them."""
+        self._rooms = RoomList(rooms)
+
+    def get_room(self, room_number):
+        """Returns the room with the given number, or None."""
+        return self._rooms.get(room_number)
+
+    def free_rooms(self, room_type=None):
+        """Returns the free rooms, optionally only those of one type."""
+        return self._rooms.free(room_type)
+
+    def count_free(self, room_type=None):
+        """Returns the number of free rooms, optionally only those of one type."""
+        return self._rooms.count_free(room_type)
+
+    def is_room_free(self, room_number, start_date, end_date):
+        """Checks whether a room exists and is free for [start_date, end_date)."""
+        room = self.get_room(room_number)
+        return room is not None and room.is_free(start_date, end_date)
+
+    def free_rooms_between(self, start_date, end_date, room_type=None):
+        """Returns the rooms free for the whole range [start_date, end_date).
+
+        Each room is checked with a binary search over its bookings, so the
+        cost is logarithmic per room of the requested type.
+        """
+        return [room for room in self._rooms.of_type(room_type) if room.is_free(start_date, end_date)]
 
     def load_from_file(self):
-        """Loads hotel data from a file."""
-        with open(self.filename, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        """Loads the hotel snapshot and replays its journal."""
+        with self._storage_lock('hotel', shared=True), self._journal_lock:
+            data, rooms_data = self._read_stored_rooms(get_storage())
         self.name = data['name']
         self.location = data['location']
         # Assume a from_dict class method for Room to reconstruct room objects
-        self.rooms = [Room.from_dict(room_data) for room_data in data['rooms']]  # pylint: disable=no-member
+        self.rooms = [Room.from_dict(room_data) for room_data in rooms_data]
+
+    def _read_stored_rooms(self, storage):
+        """Reads the snapshot and replays its journal, resetting the journal state.
+
+        Returns:
+            tuple: The snapshot, and the latest stored state of every room.
+        """
+        data = storage.load('hotel', self.storage_key)
+        rooms_data = list(data['rooms'])
+        positions = {}
+        for position, room_data in enumerate(rooms_data):
+            positions.setdefault(room_data['room_number'], position)
+        self.journal_generation = data.get('journal_generation')
+        self.journal_seq = 0
+        entries, self.journal_position = storage.read_journal_from('hotel', self.storage_key)
+        for entry in entries:
+            if self.journal_generation is None or entry.get('generation') != self.journal_generation:
+                continue
+            room_data = entry['room']
+            position = positions.setdefault(room_data['room_number'], len(rooms_data))
+            if position == len(rooms_data):
+                rooms_data.append(room_data)
+            else:
+                rooms_data[position] = room_data
+            self.journal_seq += 1
+        return data, rooms_data
 
     @staticmethod
     def create_hotel(name, location):
@@ -49,8 +435,12 @@ class Hotel:
 
     @staticmethod
     def delete_hotel(hotel):
-        """Deletes hotel data file."""
-        os.remove(hotel.filename)
+        """Deletes the hotel record and its journal."""
+        storage = get_storage()
+        storage.delete('hotel', hotel.storage_key)
+        with contextlib.suppress(RecordNotFound):
+            storage.delete('hotel_head', hotel.storage_key)
+        storage.clear_journal('hotel', hotel.storage_key)
 
     def display_information(self):
         """Returns hotel information as a string."""
@@ -66,10 +456,13 @@ class Hotel:
 
     def reserve_room(self, reservation_id, customer_id, room_number,  # pylint: disable=too-many-arguments
                      start_date, end_date):
-        """Reserve a room if available."""
-        room = next((room for room in self.rooms if room.room_number == room_number and room.is_available), None)
-        if room:
-            room.make_reservation()
+        """Reserve a room if it is free for [start_date, end_date) and the reservation id is new."""
+        with self.locked([room_number]):
+            room = self.get_room(room_number)
+            if room is None or get_storage().exists('reservation', reservation_id):
+                return False
+            if not room.make_reservation(start_date, end_date, reservation_id):
+                return False
             reservation = make_reservation(
                 reservation_id=reservation_id,
                 customer_id=customer_id,
@@ -78,24 +471,181 @@ class Hotel:
                 start_date=start_date,
                 end_date=end_date
             )
-            reservation.save_to_file()
-            self.save_to_file()
-            return True
-        return False
+            with get_storage().transaction():
+                reservation.save_to_file()
+                self._record_room_changes([room])
+        self._compact_if_due()
+        return True
+
+    def reserve_any(self, reservation_id, customer_id, room_type,  # pylint: disable=too-many-arguments
+                    start_date, end_date):
+        """Reserve any room of the given type that is free for [start_date, end_date).
+
+        Rooms without any booking are tried first, in O(1); otherwise the rooms
+        of the type are checked against their bookings. If another thread or
+        process books the chosen room first, the next free room is tried, up to
+        RESERVE_ANY_ATTEMPTS rooms.
+
+        Returns:
+            The number of the reserved room, or None if none is free, the
+            reservation id is already taken or the room refuses it otherwise.
+        """
+        for _ in range(RESERVE_ANY_ATTEMPTS):
+            if get_storage().exists('reservation', reservation_id):
+                return None
+            room = self._rooms.first_free(room_type)
+            if room is None:
+                room = next(iter(self.free_rooms_between(start_date, end_date, room_type)), None)
+                if room is None:
+                    return None
+            if self.reserve_room(reservation_id, customer_id, room.room_number, start_date, end_date):
+                return room.room_number
+            # Only a booking that won the race for the room is worth trying another room
+            room = self.get_room(room.room_number)
+            if room is None or room.is_free(start_date, end_date):
+                return None
+        return None
+
+    def reserve_rooms(self, batch, atomic=True):
+        """Reserve several rooms, persisting the whole batch at once.
+
+        Every item is checked against the rooms' bookings, including the items
+        before it in the same batch, and its id against the stored reservations. The reservations are then saved in one
+        storage transaction and the changed rooms in one journal append.
+
+        Parameters:
+            batch (iterable): Dictionaries with 'reservation_id', 'customer_id',
+                'room_number', 'start_date' and 'end_date', as taken by reserve_room.
+            atomic (bool): If True, any failure rejects the whole batch; if False,
+                the valid items are reserved and only the failed ones are skipped.
+
+        Returns:
+            list: (reservation_id, reason) for each failed item, in batch order.
+        """
+        batch = list(batch)
+        with self.locked(item.get('room_number') for item in batch):
+            failures = self._reserve_batch(batch, atomic)
+        self._compact_if_due()
+        return failures
+
+    def _reserve_batch(self, batch, atomic):
+        """Reserves a batch whose rooms are locked (see reserve_rooms)."""
+        storage = get_storage()
+        # Ids already in storage are found before any room is touched
+        existing = {item.get('reservation_id') for item in batch
+                    if item.get('reservation_id') is not None
+                    and storage.exists('reservation', item.get('reservation_id'))}
+        failures = []
+        applied = []
+        seen = set()
+        for item in batch:
+            reservation_id = item.get('reservation_id')
+            room = self.get_room(item.get('room_number'))
+            if reservation_id is None or reservation_id in seen:
+                failures.append((reservation_id, "missing or duplicate reservation id"))
+                continue
+            if reservation_id in existing:
+                failures.append((reservation_id, "reservation id already exists"))
+                continue
+            if room is None:
+                failures.append((reservation_id, "room not found"))
+                continue
+            try:
+                booked = room.make_reservation(item.get('start_date'), item.get('end_date'), reservation_id)
+            except (TypeError, ValueError):
+                failures.append((reservation_id, "invalid dates"))
+                continue
+            if not booked:
+                failures.append((reservation_id, "room not free for those dates"))
+                continue
+            seen.add(reservation_id)
+            applied.append((room, make_reservation(
+                reservation_id=reservation_id,
+                customer_id=item.get('customer_id'),
+                hotel_name=self.name,
+                room_number=room.room_number,
+                start_date=item.get('start_date'),
+                end_date=item.get('end_date')
+            )))
+        if atomic and failures:
+            for room, reservation in reversed(applied):
+                room.cancel_reservation(reservation.reservation_id)
+            return failures
+        if applied:
+            with storage.transaction():
+                storage.save_many('reservation', [(reservation.reservation_id, vars(reservation))
+                                                  for _, reservation in applied])
+                self._record_room_changes([room for room, _ in applied])
+        return failures
+
+    def cancel_reservations(self, reservation_ids, atomic=True):
+        """Cancel several reservations, persisting the whole batch at once.
+
+        Parameters:
+            reservation_ids (iterable): Reservations to cancel.
+            atomic (bool): If True, any failure rejects the whole batch; if False,
+                the valid reservations are cancelled and only the failed ones skipped.
+
+        Returns:
+            list: (reservation_id, reason) for each failed item, in batch order.
+        """
+        reservation_ids = list(reservation_ids)
+        storage = get_storage()
+        room_numbers = []
+        for reservation_id in reservation_ids:
+            with contextlib.suppress(FileNotFoundError):
+                room_numbers.append(storage.load('reservation', reservation_id)['room_number'])
+        # Reservations are looked up again with the rooms locked, in case one was cancelled meanwhile
+        with self.locked(room_numbers):
+            failures = self._cancel_batch(reservation_ids, atomic)
+        self._compact_if_due()
+        return failures
+
+    def _cancel_batch(self, reservation_ids, atomic):
+        """Cancels a batch whose rooms are locked (see cancel_reservations)."""
+        storage = get_storage()
+        failures = []
+        found = []
+        seen = set()
+        for reservation_id in reservation_ids:
+            if reservation_id in seen:
+                failures.append((reservation_id, "missing or duplicate reservation id"))
+                continue
+            try:
+                data = storage.load('reservation', reservation_id)
+            except FileNotFoundError:
+                failures.append((reservation_id, "reservation not found"))
+                continue
+            room = self.get_room(data['room_number'])
+            if room is None:
+                failures.append((reservation_id, "room not found"))
+                continue
+            seen.add(reservation_id)
+            found.append((reservation_id, room))
+        if (atomic and failures) or not found:
+            return failures
+        for reservation_id, room in found:
+            room.cancel_reservation(reservation_id)
+        with storage.transaction():
+            storage.delete_many('reservation', [reservation_id for reservation_id, _ in found])
+            self._record_room_changes([room for _, room in found])
+        return failures
 
     def cancel_reservation(self, reservation_id):
         """Cancel a room reservation."""
         # This assumes reservation data includes the room number and can be matched to a room in this hotel
+        storage = get_storage()
         try:
-            with open(f"reservation_{reservation_id}.json", 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            room_number = data['room_number']
-            room = next((room for room in self.rooms if room.room_number == room_number), None)
-            if room:
-                room.cancel_reservation()
-                os.remove(f"reservation_{reservation_id}.json")
-                self.save_to_file()
-                return True
+            room_number = storage.load('reservation', reservation_id)['room_number']
+            with self.locked([room_number]):
+                room = self.get_room(room_number)
+                if not (room and storage.exists('reservation', reservation_id)):
+                    return False
+                room.cancel_reservation(reservation_id)
+                with storage.transaction():
+                    storage.delete('reservation', reservation_id)
+                    self._record_room_changes([room])
         except FileNotFoundError:
-            pass
-        return False
+            return False
+        self._compact_if_due()
+        return True
@@ -5,15 +5,81 @@ Author: Fernando Maytorena
 Last edited: February 08, 2024
 """
 
+import bisect
+import datetime
+import threading
+
+
+def to_date(value):
+    """Converts an ISO 8601 string (YYYY-MM-DD) or a date to a date."""
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.date.fromisoformat(value)
+
+
+class Bookings:
+    """A room's dated bookings: non-overlapping [start, end) intervals sorted by start.
+
+    The start dates are kept in a parallel list for binary search, and each
+    reservation id maps to the start of its booking. Callers hold the room's
+    lock.
+    """
+
+    def __init__(self):
+        """Initializes an empty set of bookings."""
+        self.starts = []
+        self.intervals = []  # (start, end, reservation_id), sorted by start
+        self.by_id = {}  # reservation_id -> start
+
+    def __len__(self):
+        """Returns the number of bookings."""
+        return len(self.intervals)
+
+    def __iter__(self):
+        """Iterates over the bookings as (start, end, reservation_id), by start date."""
+        return iter(self.intervals)
+
+    def __contains__(self, reservation_id):
+        """Returns whether a reservation has a booking."""
+        return reservation_id in self.by_id
+
+    def overlaps(self, start, end):
+        """Returns whether a booking overlaps the range [start, end)."""
+        # Bookings do not overlap, so only the last one starting before `end` can.
+        index = bisect.bisect_left(self.starts, end)
+        return index > 0 and self.intervals[index - 1][1] > start
+
+    def add(self, start, end, reservation_id):
+        """Inserts a booking keeping the bookings sorted by start date."""
+        index = bisect.bisect_left(self.starts, start)
+        self.starts.insert(index, start)
+        self.intervals.insert(index, (start, end, reservation_id))
+        if reservation_id is not None:
+            self.by_id[reservation_id] = start
+
+    def remove(self, reservation_id):
+        """Removes the booking of a reservation."""
+        index = bisect.bisect_left(self.starts, self.by_id.pop(reservation_id))
+        del self.starts[index]
+        del self.intervals[index]
+
 
 class Room:
     """Represents a room in a hotel.
 
+    Besides the legacy availability flag, a room keeps its dated bookings as
+    non-overlapping [start, end) intervals sorted by start date (see
+    Bookings), so checking whether a date range is free is a binary search. Its methods
+    hold the room's lock, which callers can also hold to check and book the
+    room as one step.
+
     Attributes:
         room_number (int): The room number.
         room_type (str): The type of the room (e.g., single, double, suite).
-        is_available (bool): Availability status of the room.
+        is_available (bool): Availability status of the room: False while it
+            has bookings or has been blocked without dates.
         price (float): Price per night for the room.
+        lock (threading.RLock): Serializes changes to the room.
     """
 
     def __init__(self, room_number, room_type, price, is_available=True):
@@ -29,15 +95,93 @@ class Room:
         self.room_number = room_number
         self.room_type = room_type
         self.price = price
-        self.is_available = is_available
+        self.observer = None  # RoomList notified when availability changes
+        self.lock = threading.RLock()
+        self._blocked = not is_available
+        self._bookings = Bookings()
+
+    @property
+    def is_available(self):
+        """bool: Availability status of the room."""
+        return not self._blocked and not self._bookings
+
+    @is_available.setter
+    def is_available(self, value):
+        """Blocks or unblocks the room regardless of dates."""
+        self._set_blocked(not value)
+
+    def _set_blocked(self, blocked):
+        """Blocks or unblocks the room and notifies the observer of the change."""
+        self._change(lambda: setattr(self, '_blocked', blocked))
+
+    def _change(self, action):
+        """Runs an action and notifies the observing hotel if availability changed."""
+        with self.lock:
+            was_available = self.is_available
+            result = action()
+            if self.observer is not None and self.is_available != was_available:
+                self.observer.room_availability_changed(self)
+            return result
+
+    @property
+    def bookings(self):
+        """list: The room's bookings as (start, end, reservation_id), by start date."""
+        with self.lock:
+            return list(self._bookings)
+
+    def is_free(self, start_date, end_date):
+        """Checks whether the room is free for the whole range [start_date, end_date).
+
+        Parameters:
+            start_date (str or date): First night of the stay.
+            end_date (str or date): Check-out date (not included).
 
-    def make_reservation(self):
-        """Marks the room as reserved (not available)."""
-        self.is_available = False
+        Returns:
+            bool: True if the room is not blocked and no booking overlaps the range.
+        """
+        start, end = to_date(start_date), to_date(end_date)
+        if end <= start:
+            raise ValueError("end_date must be after start_date")
+        with self.lock:
+            return not self._blocked and not self._bookings.overlaps(start, end)
 
-    def cancel_reservation(self):
-        """Marks the room as available (cancels reservation)."""
-        self.is_available = True
+    def make_reservation(self, start_date=None, end_date=None, reservation_id=None):
+        """Reserves the room.
+
+        With dates, books the range [start_date, end_date) if it is free and
+        the room has no booking with the same reservation_id.
+        Without dates, marks the room as reserved (not available) indefinitely.
+
+        Returns:
+            bool: Whether the reservation was made.
+        """
+        if start_date is None and end_date is None:
+            self._set_blocked(True)
+            return True
+        with self.lock:
+            if reservation_id is not None and reservation_id in self._bookings:
+                return False
+            if not self.is_free(start_date, end_date):
+                return False
+            start, end = to_date(start_date), to_date(end_date)
+            self._change(lambda: self._bookings.add(start, end, reservation_id))
+            return True
+
+    def cancel_reservation(self, reservation_id=None):
+        """Cancels a reservation.
+
+        Removes the booking of the given reservation; without a known booking,
+        marks the room as available (cancels an undated reservation).
+
+        Returns:
+            bool: Whether a dated booking was removed.
+        """
+        with self.lock:
+            if reservation_id not in self._bookings:
+                self._set_blocked(False)
+                return False
+            self._change(lambda: self._bookings.remove(reservation_id))
+            return True
 
     def update_price(self, new_price):
         """Updates the room's price.
@@ -47,6 +191,23 @@ class Room:
         """
         self.price = new_price
 
+    def restore(self, data):
+        """Replaces the room's price, block and bookings with those of a dictionary.
+
+        Parameters:
+            data (dict): The room's state, as returned by to_dict.
+        """
+        self._change(lambda: self._restore(data))
+
+    def _restore(self, data):
+        """Replaces the room's state without notifying the observing hotel."""
+        self.price = data['price']
+        # Files without 'blocked' predate dated bookings; their flag is the block
+        self._blocked = data.get('blocked', not data.get('is_available', True))
+        self._bookings = Bookings()
+        for start, end, reservation_id in data.get('bookings', []):
+            self._bookings.add(to_date(start), to_date(end), reservation_id)
+
     @classmethod
     def from_dict(cls, data):
         """Creates a Room instance from a dictionary.
@@ -57,12 +218,13 @@ class Room:
         Returns:
             Room: An instance of the Room class.
         """
-        return cls(
+        room = cls(
             room_number=data['room_number'],
             room_type=data['room_type'],
-            price=data['price'],
-            is_available=data.get('is_available', True)  # Default to True if not specified
+            price=data['price']
         )
+        room.restore(data)
+        return room
 
     def to_dict(self):
         """
@@ -74,11 +236,16 @@ class Room:
 
         Returns:
             dict: A dictionary containing the room's properties, including
-                'room_number', 'room_type', 'price', and 'is_available'.
+                'room_number', 'room_type', 'price', 'is_available', 'blocked'
+                and 'bookings' (as [start, end, reservation_id] with ISO dates).
         """
-        return {
-            'room_number': self.room_number,
-            'room_type': self.room_type,
-            'price': self.price,
-            'is_available': self.is_available
-        }
+        with self.lock:
+            return {
+                'room_number': self.room_number,
+                'room_type': self.room_type,
+                'price': self.price,
+                'is_available': self.is_available,
+                'blocked': self._blocked,
+                'bookings': [[start.isoformat(), end.isoformat(), reservation_id]
+                             for start, end, reservation_id in self._bookings]
+            }
@@ -5,8 +5,7 @@ Author: Fernando Maytorena
 Last edited: February 08, 2024
 """
 
-import json
-import os
+from bookinn.storage.storage import get_storage
 
 
 class Reservation:
@@ -31,17 +30,13 @@ class Reservation:
         self.end_date = kwargs.get('end_date')
 
     def save_to_file(self):
-        """Saves reservation details to a file."""
-        data = vars(self)
-        filename = f"reservation_{self.reservation_id}.json"
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f)
+        """Saves reservation details to the active storage backend."""
+        get_storage().save('reservation', self.reservation_id, vars(self))
 
     @staticmethod
     def cancel_reservation(reservation_id):
-        """Cancels a reservation by removing its file."""
-        filename = f"reservation_{reservation_id}.json"
-        os.remove(filename)
+        """Cancels a reservation by removing its record."""
+        get_storage().delete('reservation', reservation_id)
 
     @classmethod
     def create_reservation(cls, **kwargs):
@@ -0,0 +1,68 @@
+"""
+Minimal asyncio client for the bookinn HTTP/JSON service.
+
+Keeps one HTTP/1.1 connection open across requests, which is what the
+tests and the load-test benchmark need; it is not a general HTTP client.
+
+Author: Fernando Maytorena
+"""
+
+import asyncio
+import json
+import urllib.parse
+
+
+class ServiceClient:
+    """Keep-alive connection to a bookinn service."""
+
+    def __init__(self, host, port):
+        """Initializes a client for the service at host:port; connects on first use."""
+        self.host = host
+        self.port = port
+        self._reader = None
+        self._writer = None
+
+    async def request(self, method, path, body=None):
+        """Sends a request and waits for its response.
+
+        Parameters:
+            method (str): The request method.
+            path (str): The path and query string; segments are sent as given,
+                so quote them with quote().
+            body (dict): Sent as JSON if given.
+
+        Returns:
+            tuple: The response status and decoded JSON body (None if empty).
+        """
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        data = b'' if body is None else json.dumps(body).encode('utf-8')
+        head = f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Length: {len(data)}\r\n"
+        if body is not None:
+            head += "Content-Type: application/json\r\n"
+        self._writer.write((head + "\r\n").encode('latin-1') + data)
+        await self._writer.drain()
+        status = int((await self._reader.readline()).split()[1])
+        headers = {}
+        while True:
+            line = await self._reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        payload = await self._reader.readexactly(int(headers.get('content-length', 0)))
+        if headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return status, json.loads(payload) if payload else None
+
+    async def close(self):
+        """Closes the connection."""
+        if self._writer is not None:
+            self._writer.close()
+            await self._writer.wait_closed()
+            self._reader = self._writer = None
+
+
+def quote(segment):
+    """Quotes a value for use as one path segment, e.g. a hotel name."""
+    return urllib.parse.quote(str(segment), safe='')
@@ -0,0 +1,511 @@
+"""
+Asyncio HTTP/JSON service exposing hotels, customers and reservations.
+
+The event loop only parses requests and writes responses. Every call into
+the library runs on a thread of one of two bounded executors, reads and
+writes, each thread borrowing an open backend from a StoragePool, so slow
+writes never hold up reads. Hotels are loaded once and kept in memory;
+their room locks make them safe to share between the executor threads.
+
+Usage: python -m bookinn.service.server [--host HOST] [--port PORT]
+           [--storage SPEC] [--read-workers N] [--write-workers N] [--shared]
+
+Author: Fernando Maytorena
+"""
+
+import argparse
+import asyncio
+import contextlib
+import http
+import json
+import logging
+import os
+import re
+import threading
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+from bookinn.customer.customer import Customer
+from bookinn.hotel.hotel import Hotel
+from bookinn.hotel.room import Room
+from bookinn.storage.storage import STORAGE_ENV_VAR, StoragePool, get_storage, use_storage
+
+logger = logging.getLogger(__name__)
+
+# Largest request body accepted, in bytes
+MAX_BODY_SIZE = 1 << 20
+# Hotel names and ids become storage keys, which the JSON backend puts in filenames
+SAFE_NAME = re.compile(r'[A-Za-z0-9 _-]+')
+# Status, and message (None for the error's own), of errors the library raises
+ERROR_STATUSES = ((FileNotFoundError, 404, "not found"), (ValueError, 400, None))
+
+
+class HttpError(Exception):
+    """Raised by request handlers to answer with an error status."""
+
+    def __init__(self, status, message):
+        """Initializes the error with an HTTP status code and a message."""
+        super().__init__(message)
+        self.status = status
+
+
+class Request:
+    """A parsed HTTP request.
+
+    Attributes:
+        method (str): The request method, e.g. 'GET'.
+        path (str): The path, still percent-encoded, without the query string.
+        query (dict): The query parameters, with the last value of each.
+        headers (dict): The headers, with lowercase names.
+        body (bytes): The request body.
+        keep_alive (bool): Whether the connection stays open after the response.
+    """
+
+    def __init__(self, method, target, version, headers, body):
+        """Initializes a request from its parsed parts."""
+        url = urllib.parse.urlsplit(target)
+        self.method = method
+        self.path = url.path
+        self.query = dict(urllib.parse.parse_qsl(url.query))
+        self.headers = headers
+        self.body = body
+        connection = headers.get('connection', '').lower()
+        self.keep_alive = connection == 'keep-alive' if version == 'HTTP/1.0' else connection != 'close'
+
+    def json(self):
+        """Returns the body decoded as a JSON object."""
+        try:
+            data = json.loads(self.body or b'{}')
+        except ValueError as error:
+            raise HttpError(400, "request body is not valid JSON") from error
+        if not isinstance(data, dict):
+            raise HttpError(400, "request body must be a JSON object")
+        return data
+
+    @classmethod
+    async def read(cls, reader):
+        """Reads one request from a connection.
+
+        Returns:
+            Request: The request, or None if the client closed the connection.
+        """
+        line = await reader.readline()
+        if not line.strip():
+            return None
+        try:
+            method, target, version = line.decode('latin-1').split()
+        except ValueError as error:
+            raise HttpError(400, "malformed request line") from error
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError as error:
+            raise HttpError(400, "invalid Content-Length") from error
+        if length > MAX_BODY_SIZE:
+            raise HttpError(413, "request body too large")
+        body = await reader.readexactly(length) if length > 0 else b''
+        return cls(method, target, version, headers, body)
+
+
+def write_response(writer, status, payload, keep_alive):
+    """Writes a response with a JSON body, or no body when payload is None."""
+    body = b'' if payload is None else json.dumps(payload).encode('utf-8')
+    head = [f"HTTP/1.1 {status} {http.HTTPStatus(status).phrase}",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+    if payload is not None:
+        head.append("Content-Type: application/json")
+    writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body)
+
+
+def require(data, *fields):
+    """Returns the values of required fields of a request body, in order."""
+    missing = [field for field in fields if data.get(field) is None]
+    if missing:
+        raise HttpError(400, f"missing field(s): {', '.join(missing)}")
+    return [data[field] for field in fields]
+
+
+def check_name(value, field):
+    """Returns a hotel name or an id if it is safe to use as a storage key.
+
+    Raises:
+        HttpError: 400, unless the value is an integer or a string of letters,
+            digits, spaces, '_' and '-'.
+    """
+    if isinstance(value, bool) or not isinstance(value, (str, int)) or not SAFE_NAME.fullmatch(str(value)):
+        raise HttpError(400, f"invalid {field}: use letters, digits, spaces, '_' and '-'")
+    return value
+
+
+def require_objects(value, field, *fields):
+    """Returns a list of objects from a request body, each with the required fields."""
+    if not isinstance(value, list) or not all(isinstance(item, dict) for item in value):
+        raise HttpError(400, f"{field} must be a list of objects")
+    for item in value:
+        require(item, *fields)
+    return value
+
+
+def error_response(request, error):
+    """Returns the status and payload answering a request whose handler raised an error."""
+    for error_type, status, message in ERROR_STATUSES:
+        if isinstance(error, error_type):
+            return status, {'error': message or str(error)}
+    logger.exception("Error serving %s %s", request.method, request.path, exc_info=error)
+    return 500, {'error': "internal error"}
+
+
+def room_summary(room):
+    """Returns a room's number, type and price, without its bookings."""
+    return {'room_number': room.room_number, 'room_type': room.room_type, 'price': room.price}
+
+
+def hotel_to_dict(hotel):
+    """Returns a hotel's information and rooms as a dictionary."""
+    return {'name': hotel.name, 'location': hotel.location, 'free_rooms': hotel.count_free(),
+            'rooms': [room.to_dict() for room in hotel.rooms]}
+
+
+class Service:  # pylint: disable=too-many-instance-attributes
+    """The bookinn HTTP/JSON service.
+
+    Routes:
+        POST   /hotels                                  create a hotel (with 'rooms')
+        GET    /hotels/{name}                           hotel information and rooms
+        PATCH  /hotels/{name}                           change 'name' or 'location'
+        DELETE /hotels/{name}                           delete a hotel
+        POST   /hotels/{name}/rooms                     add a room
+        GET    /hotels/{name}/rooms?start=&end=&type=   rooms, or those free for the dates (no bookings)
+        POST   /hotels/{name}/reservations              reserve a 'room_number' or any room of a 'room_type'
+        POST   /hotels/{name}/reservations/batch        reserve several rooms (see Hotel.reserve_rooms)
+        DELETE /hotels/{name}/reservations/{id}         cancel a reservation
+        GET    /reservations/{id}                       a reservation
+        POST   /customers                               create a customer
+        GET    /customers/{id}                          a customer
+        PATCH  /customers/{id}                          change 'name' or 'email'
+        DELETE /customers/{id}                          delete a customer
+    """
+
+    def __init__(self, storage_spec, read_workers=4, write_workers=4, shared=False):
+        """Initializes the service.
+
+        Parameters:
+            storage_spec (str): Storage specification, as taken by open_storage.
+            read_workers (int): Threads serving reads.
+            write_workers (int): Threads serving writes.
+            shared (bool): Whether other processes change the same hotels
+                (several service processes on one storage).
+        """
+        self.shared = shared
+        self.pool = StoragePool(storage_spec, read_workers + write_workers)
+        self._executors = {
+            'read': ThreadPoolExecutor(max_workers=read_workers, thread_name_prefix='bookinn-read'),
+            'write': ThreadPoolExecutor(max_workers=write_workers, thread_name_prefix='bookinn-write'),
+        }
+        self._workers = {'read': read_workers, 'write': write_workers}
+        self._slots = None  # Created by start, on the event loop
+        self._hotels = {}
+        self._hotels_lock = threading.Lock()
+        self.routes = [(re.compile(pattern), handlers) for pattern, handlers in (
+            (r'/hotels', {'POST': self._create_hotel}),
+            (r'/hotels/([^/]+)', {'GET': self._get_hotel, 'PATCH': self._modify_hotel,
+                                  'DELETE': self._delete_hotel}),
+            (r'/hotels/([^/]+)/rooms', {'POST': self._add_room, 'GET': self._list_rooms}),
+            (r'/hotels/([^/]+)/reservations', {'POST': self._reserve}),
+            (r'/hotels/([^/]+)/reservations/batch', {'POST': self._reserve_batch}),
+            (r'/hotels/([^/]+)/reservations/([^/]+)', {'DELETE': self._cancel}),
+            (r'/reservations/([^/]+)', {'GET': self._get_reservation}),
+            (r'/customers', {'POST': self._create_customer}),
+            (r'/customers/([^/]+)', {'GET': self._get_customer, 'PATCH': self._modify_customer,
+                                     'DELETE': self._delete_customer}),
+        )]
+
+    async def read(self, function, *args):
+        """Runs a blocking function that only reads, on the read executor."""
+        return await self._run('read', function, args)
+
+    async def write(self, function, *args):
+        """Runs a blocking function that changes storage, on the write executor."""
+        return await self._run('write', function, args)
+
+    async def _run(self, kind, function, args):
+        """Runs a function on an executor thread with a backend from the pool."""
+        async with self._slots[kind]:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executors[kind], self._call, function, args)
+
+    def _call(self, function, args):
+        """Calls a function with a pooled backend as the thread's storage."""
+        with self.pool.handle() as storage, use_storage(storage):
+            return function(*args)
+
+    def hotel(self, name):
+        """Returns a hotel, loading it from storage the first time (call on an executor)."""
+        hotel = self._hotels.get(name)
+        if hotel is not None:
+            return hotel
+        with self._hotels_lock:
+            hotel = self._hotels.get(name)
+            if hotel is None:
+                hotel = Hotel(name, "", shared=self.shared)
+                hotel.load_from_file()
+                self._hotels[name] = hotel
+            return hotel
+
+    async def handle_connection(self, reader, writer):
+        """Serves the requests of one connection until the client closes it."""
+        try:
+            while True:
+                try:
+                    request = await Request.read(reader)
+                except HttpError as error:
+                    write_response(writer, error.status, {'error': str(error)}, False)
+                    break
+                if request is None:
+                    break
+                status, payload = await self.dispatch(request)
+                write_response(writer, status, payload, request.keep_alive)
+                await writer.drain()
+                if not request.keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass  # Client gone, or a line over the stream limit (readline raises ValueError)
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    def route(self, request):
+        """Returns the handler of a request and the parameters taken from its path.
+
+        Raises:
+            HttpError: 404 if no route matches the path, 405 if the route
+                does not take the method, 400 if a name or id is unsafe.
+        """
+        allowed = False
+        for pattern, handlers in self.routes:
+            match = pattern.fullmatch(request.path)
+            if match is None:
+                continue
+            if request.method not in handlers:
+                allowed = True
+                continue
+            return handlers[request.method], [check_name(urllib.parse.unquote(group), 'name or id')
+                                              for group in match.groups()]
+        raise HttpError(405, "method not allowed") if allowed else HttpError(404, "not found")
+
+    async def dispatch(self, request):
+        """Routes a request to its handler.
+
+        Returns:
+            tuple: The response status and JSON payload (None for no body).
+        """
+        try:
+            handler, parameters = self.route(request)
+            return await handler(request, *parameters)
+        except HttpError as error:
+            return error.status, {'error': str(error)}
+        except Exception as error:  # pylint: disable=broad-except
+            return error_response(request, error)
+
+    async def _create_hotel(self, request):
+        """POST /hotels"""
+        data = request.json()
+        name, location = require(data, 'name', 'location')
+        check_name(name, 'hotel name')
+        rooms = [Room(check_name(room['room_number'], 'room number'), room['room_type'], room['price'])
+                 for room in require_objects(data.get('rooms', []), 'rooms', 'room_number', 'room_type', 'price')]
+
+        def create():
+            # Checked and saved as one step, here and, if shared, in every process
+            storage = get_storage()
+            with self._hotels_lock, storage.lock('hotels') if self.shared else contextlib.nullcontext():
+                if storage.exists('hotel', name):
+                    raise HttpError(409, f"hotel {name} already exists")
+                hotel = Hotel(name, location, shared=self.shared)
+                hotel.rooms.extend(rooms)
+                hotel.save_to_file()
+                self._hotels[name] = hotel
+            return hotel_to_dict(hotel)
+        return 201, await self.write(create)
+
+    def current(self, name):
+        """Returns a hotel with the changes other processes persisted applied (call on an executor)."""
+        hotel = self.hotel(name)
+        hotel.refresh_for_reading()
+        return hotel
+
+    async def _get_hotel(self, request, name):  # pylint: disable=unused-argument
+        """GET /hotels/{name}"""
+        return 200, await self.read(lambda: hotel_to_dict(self.current(name)))
+
+    async def _modify_hotel(self, request, name):
+        """PATCH /hotels/{name}"""
+        data = request.json()
+        if data.get('name') is not None:
+            check_name(data['name'], 'hotel name')
+
+        def modify():
+            hotel = self.hotel(name)
+            hotel.modify_information(data.get('name'), data.get('location'))
+            return hotel_to_dict(hotel)
+        return 200, await self.write(modify)
+
+    async def _delete_hotel(self, request, name):  # pylint: disable=unused-argument
+        """DELETE /hotels/{name}"""
+        def delete():
+            Hotel.delete_hotel(self.hotel(name))
+            with self._hotels_lock:
+                self._hotels.pop(name, None)
+        await self.write(delete)
+        return 204, None
+
+    async def _add_room(self, request, name):
+        """POST /hotels/{name}/rooms"""
+        room_number, room_type, price = require(request.json(), 'room_number', 'room_type', 'price')
+        room = Room(check_name(room_number, 'room number'), room_type, price)
+
+        def add():
+            if not self.hotel(name).add_room(room):
+                raise HttpError(409, f"room {room.room_number} already exists")
+            return room.to_dict()
+        return 201, await self.write(add)
+
+    async def _list_rooms(self, request, name):
+        """GET /hotels/{name}/rooms"""
+        start, end, room_type = (request.query.get(field) for field in ('start', 'end', 'type'))
+
+        def rooms():
+            hotel = self.current(name)
+            if start or end:
+                found = hotel.free_rooms_between(start, end, room_type)
+            else:
+                found = [room for room in hotel.rooms if room_type is None or room.room_type == room_type]
+            return [room_summary(room) for room in found]
+        return 200, await self.read(rooms)
+
+    async def _reserve(self, request, name):
+        """POST /hotels/{name}/reservations"""
+        data = request.json()
+        reservation_id, customer_id, start_date, end_date = require(
+            data, 'reservation_id', 'customer_id', 'start_date', 'end_date')
+        check_name(reservation_id, 'reservation id')
+        room_number, room_type = data.get('room_number'), data.get('room_type')
+        if room_number is None and room_type is None:
+            raise HttpError(400, "missing field(s): room_number or room_type")
+
+        def reserve():
+            hotel = self.hotel(name)
+            if room_number is None:
+                return hotel.reserve_any(reservation_id, customer_id, room_type, start_date, end_date)
+            return room_number if hotel.reserve_room(
+                reservation_id, customer_id, room_number, start_date, end_date) else None
+        reserved = await self.write(reserve)
+        if reserved is None:
+            raise HttpError(409, "no room free for those dates")
+        return 201, {'reservation_id': reservation_id, 'room_number': reserved}
+
+    async def _reserve_batch(self, request, name):
+        """POST /hotels/{name}/reservations/batch"""
+        data = request.json()
+        batch = require_objects(require(data, 'reservations')[0], 'reservations', 'reservation_id', 'customer_id',
+                                'room_number', 'start_date', 'end_date')
+        for item in batch:
+            check_name(item['reservation_id'], 'reservation id')
+        atomic = data.get('atomic', True)
+        failures = await self.write(lambda: self.hotel(name).reserve_rooms(batch, atomic))
+        return 200, {'failures': [{'reservation_id': reservation_id, 'reason': reason}
+                                  for reservation_id, reason in failures]}
+
+    async def _cancel(self, request, name, reservation_id):  # pylint: disable=unused-argument
+        """DELETE /hotels/{name}/reservations/{id}"""
+        if not await self.write(lambda: self.hotel(name).cancel_reservation(reservation_id)):
+            raise HttpError(404, f"reservation {reservation_id} not found")
+        return 204, None
+
+    async def _get_reservation(self, request, reservation_id):  # pylint: disable=unused-argument
+        """GET /reservations/{id}"""
+        return 200, await self.read(lambda: get_storage().load('reservation', reservation_id))
+
+    async def _create_customer(self, request):
+        """POST /customers"""
+        customer_id, name, email = require(request.json(), 'customer_id', 'name', 'email')
+        check_name(customer_id, 'customer id')
+        await self.write(Customer.create_customer, customer_id, name, email)
+        return 201, {'customer_id': customer_id, 'name': name, 'email': email}
+
+    async def _get_customer(self, request, customer_id):  # pylint: disable=unused-argument
+        """GET /customers/{id}"""
+        customer = await self.read(Customer.load_customer, customer_id)
+        return 200, {'customer_id': customer.customer_id, 'name': customer.name, 'email': customer.email}
+
+    async def _modify_customer(self, request, customer_id):
+        """PATCH /customers/{id}"""
+        data = request.json()
+
+        def modify():
+            customer = Customer.load_customer(customer_id)
+            customer.update_details(data.get('name'), data.get('email'))
+            return {'customer_id': customer.customer_id, 'name': customer.name, 'email': customer.email}
+        return 200, await self.write(modify)
+
+    async def _delete_customer(self, request, customer_id):  # pylint: disable=unused-argument
+        """DELETE /customers/{id}"""
+        await self.write(Customer.delete_customer, customer_id)
+        return 204, None
+
+    async def start(self, host='127.0.0.1', port=8080):
+        """Starts listening and returns the asyncio server."""
+        # Requests beyond the executor threads wait on the event loop, not in an unbounded queue
+        self._slots = {kind: asyncio.Semaphore(workers) for kind, workers in self._workers.items()}
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    def close(self):
+        """Waits for the executors to finish and closes the pooled backends."""
+        for executor in self._executors.values():
+            executor.shutdown()
+        self.pool.close()
+
+
+def parse_args(argv=None):
+    """Parses the command line arguments."""
+    parser = argparse.ArgumentParser(description="Serves bookinn over HTTP/JSON.")
+    parser.add_argument('--host', default='127.0.0.1', help="Address to listen on.")
+    parser.add_argument('--port', type=int, default=8080, help="Port to listen on.")
+    parser.add_argument('--storage', default=os.environ.get(STORAGE_ENV_VAR, 'json:'), metavar='SPEC',
+                        help="Storage backend, e.g. json:DIRECTORY or sqlite:bookinn.db.")
+    parser.add_argument('--read-workers', type=int, default=4, metavar='N', help="Threads serving reads.")
+    parser.add_argument('--write-workers', type=int, default=4, metavar='N', help="Threads serving writes.")
+    parser.add_argument('--shared', action='store_true',
+                        help="Coordinate with other processes serving the same storage.")
+    return parser.parse_args(argv)
+
+
+async def serve(args):
+    """Runs the service until cancelled."""
+    service = Service(args.storage, args.read_workers, args.write_workers, args.shared)
+    server = await service.start(args.host, args.port)
+    print(f"Serving bookinn on {', '.join(str(sock.getsockname()) for sock in server.sockets)}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main(argv=None):
+    """Runs the service from the command line."""
+    logging.basicConfig(level=logging.INFO)
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(serve(parse_args(argv)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+Module for the locks that coordinate concurrent writers of the reservation system.
+
+SharedLock is a readers-writer lock for the threads of one process;
+file_lock is an advisory lock on a file, which also coordinates the
+processes sharing a storage directory.
+
+Author: Fernando Maytorena
+"""
+
+import contextlib
+import os
+import threading
+
+if os.name == 'nt':  # pragma: no cover - Windows
+    import msvcrt  # pylint: disable=import-error
+
+    def _lock_file(file, shared):  # pylint: disable=unused-argument
+        """Locks the first byte of an open file, waiting for other holders (always exclusive)."""
+        file.seek(0)
+        while True:
+            try:
+                msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue
+
+    def _unlock_file(file):
+        """Releases a lock taken by _lock_file."""
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def _lock_file(file, shared):
+        """Locks an open file, shared or exclusively, waiting for other holders."""
+        fcntl.flock(file.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+
+    def _unlock_file(file):
+        """Releases a lock taken by _lock_file."""
+        fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+
+class SharedLock:
+    """Readers-writer lock for the threads of one process.
+
+    Any number of threads can hold it shared at once; an exclusive holder
+    waits for them and then runs alone. While an exclusive holder waits, new
+    shared holders wait too, so a stream of readers cannot starve it. The
+    lock is not reentrant.
+    """
+
+    def __init__(self):
+        """Initializes an unlocked lock."""
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    def acquire_shared(self):
+        """Takes the lock shared, waiting for exclusive holders."""
+        with self._condition:
+            while self._writer or self._writers_waiting:
+                self._condition.wait()
+            self._readers += 1
+
+    def release_shared(self):
+        """Releases a shared hold."""
+        with self._condition:
+            self._readers -= 1
+            if not self._readers:
+                self._condition.notify_all()
+
+    def acquire_exclusive(self):
+        """Takes the lock exclusively, waiting for every other holder."""
+        with self._condition:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._condition.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+
+    def release_exclusive(self):
+        """Releases an exclusive hold."""
+        with self._condition:
+            self._writer = False
+            self._condition.notify_all()
+
+    @contextlib.contextmanager
+    def shared(self):
+        """Holds the lock shared for the duration of the block."""
+        self.acquire_shared()
+        try:
+            yield self
+        finally:
+            self.release_shared()
+
+    @contextlib.contextmanager
+    def exclusive(self):
+        """Holds the lock exclusively for the duration of the block."""
+        self.acquire_exclusive()
+        try:
+            yield self
+        finally:
+            self.release_exclusive()
+
+
+@contextlib.contextmanager
+def file_lock(path, shared=False):
+    """Holds an advisory lock on a file, creating it if needed.
+
+    Every call opens its own file descriptor, so the lock excludes other
+    threads of the same process as well as other processes. On Windows
+    shared locks are taken as exclusive ones.
+
+    Parameters:
+        path (str): The lock file. It is left in place afterwards.
+        shared (bool): Whether other shared holders may hold it at once.
+    """
+    with open(path, 'a+b') as f:
+        _lock_file(f, shared)
+        try:
+            yield
+        finally:
+            _unlock_file(f)
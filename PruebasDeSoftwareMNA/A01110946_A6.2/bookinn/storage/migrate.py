@@ -0,0 +1,66 @@
+"""
+Migration tool that imports the JSON record files into another backend.
+
+Usage: python -m bookinn.storage.migrate [--source DIRECTORY] [--destination SPEC]
+
+Author: Fernando Maytorena
+"""
+
+import argparse
+
+from bookinn.storage.storage import FILENAME_PATTERNS, JOURNAL_PATTERNS, JsonFileStorage, open_storage
+
+
+def migrate(source, destination):
+    """Copies every customer, reservation and hotel record between backends.
+
+    Record journals are copied along with their records. All records are
+    written in a single transaction of the destination.
+
+    Parameters:
+        source (Storage): Backend to read from.
+        destination (Storage): Backend to write to.
+
+    Returns:
+        dict: Number of records copied per kind.
+    """
+    counts = {}
+    with destination.transaction():
+        for kind in FILENAME_PATTERNS:
+            keys = source.keys(kind)
+            for key in keys:
+                destination.save(kind, key, source.load(kind, key))
+                if kind in JOURNAL_PATTERNS:
+                    destination.clear_journal(kind, key)
+                    entries = source.read_journal(kind, key)
+                    if entries:
+                        destination.append_journal(kind, key, entries)
+            counts[kind] = len(keys)
+    return counts
+
+
+def parse_args(argv=None):
+    """Parses the command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Imports bookinn JSON record files into another storage backend.")
+    parser.add_argument('--source', default='.', metavar='DIRECTORY',
+                        help="Directory with the customer_*, reservation_* and *_data JSON files.")
+    parser.add_argument('--destination', default='sqlite:bookinn.db', metavar='SPEC',
+                        help="Destination backend, e.g. sqlite:bookinn.db.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Runs the migration from the command line."""
+    args = parse_args(argv)
+    destination = open_storage(args.destination)
+    try:
+        counts = migrate(JsonFileStorage(args.source), destination)
+    finally:
+        destination.close()
+    for kind, count in counts.items():
+        print(f"{kind}: {count} record(s) imported")
+
+
+if __name__ == '__main__':
+    main()
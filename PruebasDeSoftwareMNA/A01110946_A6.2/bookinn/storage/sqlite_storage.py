@@ -0,0 +1,191 @@
+"""
+Module for the SQLite storage backend of the hotel reservation system.
+
+Every record lives in a single database file, in one table keyed by
+(kind, key) with the record serialized as JSON; journals live in a second
+table ordered by a per-record sequence number. Statements are
+parameterized constants, so sqlite3 reuses their prepared form, and writes
+inside transaction() are committed together. SQLite admits one writer at a
+time, so a transaction also serves as the cross-process lock.
+
+Author: Fernando Maytorena
+"""
+
+import contextlib
+import json
+import sqlite3
+import threading
+
+from bookinn.storage.storage import RecordNotFound, Storage
+
+# Seconds a connection waits for another process's write transaction to end
+BUSY_TIMEOUT = 30.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (kind, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS journal (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    entry TEXT NOT NULL,
+    PRIMARY KEY (kind, key, seq)
+) WITHOUT ROWID;
+"""
+SAVE_SQL = "INSERT OR REPLACE INTO records (kind, key, data) VALUES (?, ?, ?)"
+LOAD_SQL = "SELECT data FROM records WHERE kind = ? AND key = ?"
+DELETE_SQL = "DELETE FROM records WHERE kind = ? AND key = ?"
+EXISTS_SQL = "SELECT 1 FROM records WHERE kind = ? AND key = ?"
+KEYS_SQL = "SELECT key FROM records WHERE kind = ? ORDER BY key"
+APPEND_JOURNAL_SQL = "INSERT INTO journal (kind, key, seq, entry) VALUES (?, ?, ?, ?)"
+LAST_JOURNAL_SEQ_SQL = "SELECT COALESCE(MAX(seq), 0) FROM journal WHERE kind = ? AND key = ?"
+READ_JOURNAL_SQL = "SELECT entry FROM journal WHERE kind = ? AND key = ? ORDER BY seq"
+READ_JOURNAL_FROM_SQL = "SELECT seq, entry FROM journal WHERE kind = ? AND key = ? AND seq > ? ORDER BY seq"
+CLEAR_JOURNAL_SQL = "DELETE FROM journal WHERE kind = ? AND key = ?"
+
+
+class SQLiteStorage(Storage):
+    """Stores every record in a single SQLite database file."""
+
+    def __init__(self, path):
+        """Opens (and creates if needed) the database.
+
+        Parameters:
+            path (str): Database file, or ':memory:'.
+        """
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None,
+                                          check_same_thread=False)
+        if path != ':memory:':
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        self._lock = threading.RLock()
+        self._depth = 0
+
+    def _execute(self, sql, parameters):
+        """Runs a statement while holding the connection lock."""
+        with self._lock:
+            return self.connection.execute(sql, parameters).fetchall()
+
+    def save(self, kind, key, data):
+        """Inserts or replaces a record."""
+        self._execute(SAVE_SQL, (kind, str(key), json.dumps(data)))
+
+    def load(self, kind, key):
+        """Returns a record as a dictionary."""
+        rows = self._execute(LOAD_SQL, (kind, str(key)))
+        if not rows:
+            raise RecordNotFound(f"{kind} {key} not found")
+        return json.loads(rows[0][0])
+
+    def delete(self, kind, key):
+        """Deletes a record."""
+        with self._lock:
+            if self.connection.execute(DELETE_SQL, (kind, str(key))).rowcount == 0:
+                raise RecordNotFound(f"{kind} {key} not found")
+
+    def save_many(self, kind, records):
+        """Inserts or replaces several (key, data) records with one statement."""
+        with self.transaction():
+            self.connection.executemany(
+                SAVE_SQL, [(kind, str(key), json.dumps(data)) for key, data in records])
+
+    def delete_many(self, kind, keys):
+        """Deletes several records with one statement."""
+        keys = [str(key) for key in keys]
+        with self.transaction():
+            deleted = self.connection.executemany(DELETE_SQL, [(kind, key) for key in keys]).rowcount
+            if deleted != len(keys):
+                raise RecordNotFound(f"{len(keys) - deleted} {kind} record(s) not found")
+
+    def exists(self, kind, key):
+        """Returns whether a record exists."""
+        return bool(self._execute(EXISTS_SQL, (kind, str(key))))
+
+    def keys(self, kind):
+        """Returns the keys of every record of a kind."""
+        return [key for (key,) in self._execute(KEYS_SQL, (kind,))]
+
+    def append_journal(self, kind, key, entries):
+        """Appends entries to the record's journal."""
+        key = str(key)
+        with self.transaction():
+            (last,) = self.connection.execute(LAST_JOURNAL_SEQ_SQL, (kind, key)).fetchone()
+            self.connection.executemany(
+                APPEND_JOURNAL_SQL,
+                [(kind, key, last + offset, json.dumps(entry)) for offset, entry in enumerate(entries, 1)])
+
+    def read_journal(self, kind, key):
+        """Returns the record's journal entries in append order."""
+        return [json.loads(entry) for (entry,) in self._execute(READ_JOURNAL_SQL, (kind, str(key)))]
+
+    def read_journal_from(self, kind, key, position=None):
+        """Returns the journal entries after a sequence number, and the last one read."""
+        rows = self._execute(READ_JOURNAL_FROM_SQL, (kind, str(key), position or 0))
+        return [json.loads(entry) for _, entry in rows], rows[-1][0] if rows else position or 0
+
+    def clear_journal(self, kind, key):
+        """Discards the record's journal."""
+        self._execute(CLEAR_JOURNAL_SQL, (kind, str(key)))
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Applies every write in the block atomically.
+
+        Nested blocks join the outermost transaction. Other threads using the
+        same backend wait until the transaction ends.
+        """
+        with self._lock:
+            if self._depth == 0:
+                self.connection.execute("BEGIN IMMEDIATE")
+            self._depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._depth -= 1
+                if self._depth == 0:
+                    self.connection.execute("ROLLBACK")
+                raise
+            self._depth -= 1
+            if self._depth == 0:
+                self.connection.execute("COMMIT")
+
+    @contextlib.contextmanager
+    def lock(self, name, shared=False):
+        """Runs the block in a write transaction, whatever the lock name.
+
+        Only one connection can be in a write transaction, so this excludes
+        every other process and thread using the database.
+        """
+        with self.transaction():
+            yield self
+
+    @contextlib.contextmanager
+    def read_lock(self, name):
+        """Runs the block in a read transaction, whatever the lock name.
+
+        The block sees one consistent snapshot of the database. Unlike lock,
+        it does not take the write lock, so in WAL mode it neither waits for
+        writers nor holds them up. Inside a transaction it joins that one.
+        """
+        with self._lock:
+            if self._depth:
+                yield self
+                return
+            self.connection.execute("BEGIN DEFERRED")
+            self._depth += 1
+            try:
+                yield self
+            finally:
+                self._depth -= 1
+                self.connection.execute("COMMIT")
+
+    def close(self):
+        """Closes the database connection."""
+        with self._lock:
+            self.connection.close()
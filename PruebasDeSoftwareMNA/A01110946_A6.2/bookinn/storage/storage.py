@@ -0,0 +1,468 @@
+"""
+Module for the pluggable storage layer of the hotel reservation system.
+
+Entities are stored as JSON-compatible records identified by a kind
+('customer', 'reservation', 'hotel' or 'hotel_head') and a key. The default backend keeps
+the original one-file-per-record layout; SQLiteStorage keeps every record in
+a single database file. The active backend is chosen with set_storage, or
+with the BOOKINN_STORAGE environment variable ("json:DIRECTORY" or
+"sqlite:PATH"); use_storage overrides it for one thread, for example with a
+handle taken from a StoragePool.
+
+Records can also have an append-only journal of changes, used by Hotel to
+persist room updates without rewriting the whole hotel record, and named
+locks that coordinate the processes sharing a backend.
+
+Author: Fernando Maytorena
+"""
+
+import contextlib
+import glob
+import json
+import os
+import queue
+import threading
+import time
+
+from bookinn.storage.locks import file_lock
+
+STORAGE_ENV_VAR = 'BOOKINN_STORAGE'
+
+# Filename pattern of each record kind in the JSON file layout.
+FILENAME_PATTERNS = {
+    'customer': 'customer_{}.json',
+    'reservation': 'reservation_{}.json',
+    'hotel': '{}_data.json',
+    # Generation of the hotel's latest snapshot, small enough to check on every change
+    'hotel_head': '{}_head.json',
+}
+# Filename pattern of the journal of each record kind.
+JOURNAL_PATTERNS = {
+    'hotel': '{}_journal.jsonl',
+}
+# Group commit: journal appends are fsynced once this many entries are pending,
+# and at most this many seconds after they were written.
+JOURNAL_SYNC_EVERY = 64
+JOURNAL_SYNC_INTERVAL = 0.05
+
+
+class RecordNotFound(FileNotFoundError):
+    """Raised when a record does not exist in the storage backend.
+
+    Subclasses FileNotFoundError so callers written against the JSON files
+    keep working with any backend.
+    """
+
+
+class Storage:
+    """Base class of storage backends."""
+
+    def save(self, kind, key, data):
+        """Inserts or replaces a record."""
+        raise NotImplementedError
+
+    def load(self, kind, key):
+        """Returns a record as a dictionary, or raises RecordNotFound."""
+        raise NotImplementedError
+
+    def delete(self, kind, key):
+        """Deletes a record, or raises RecordNotFound."""
+        raise NotImplementedError
+
+    def save_many(self, kind, records):
+        """Inserts or replaces several (key, data) records in one transaction."""
+        with self.transaction():
+            for key, data in records:
+                self.save(kind, key, data)
+
+    def delete_many(self, kind, keys):
+        """Deletes several records in one transaction."""
+        with self.transaction():
+            for key in keys:
+                self.delete(kind, key)
+
+    def exists(self, kind, key):
+        """Returns whether a record exists."""
+        try:
+            self.load(kind, key)
+        except RecordNotFound:
+            return False
+        return True
+
+    def keys(self, kind):
+        """Returns the keys of every record of a kind, as strings."""
+        raise NotImplementedError
+
+    def append_journal(self, kind, key, entries):
+        """Appends entries (JSON-compatible dictionaries) to a record's journal."""
+        raise NotImplementedError
+
+    def read_journal(self, kind, key):
+        """Returns the entries of a record's journal in the order they were appended."""
+        raise NotImplementedError
+
+    def read_journal_from(self, kind, key, position=None):
+        """Returns the journal entries appended after a position, and the new position.
+
+        Positions are opaque values returned by earlier calls; None is the
+        start of the journal.
+        """
+        entries = self.read_journal(kind, key)
+        return entries[position or 0:], len(entries)
+
+    def clear_journal(self, kind, key):
+        """Discards a record's journal; does nothing if it is empty."""
+        raise NotImplementedError
+
+    def sync(self):
+        """Makes every journal entry appended so far durable."""
+
+    @contextlib.contextmanager
+    def lock(self, name, shared=False):  # pylint: disable=unused-argument
+        """Holds a named lock shared with the other processes using the backend.
+
+        Backends that cannot be shared between processes need no lock.
+        """
+        yield self
+
+    @contextlib.contextmanager
+    def read_lock(self, name):
+        """Holds a named lock for a block that only reads.
+
+        Like lock(name, shared=True), it waits for exclusive holders, but
+        backends may hold it more cheaply since the block must not write.
+        """
+        with self.lock(name, shared=True):
+            yield self
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Groups several writes so they are applied together.
+
+        Backends without transactions apply each write immediately.
+        """
+        yield self
+
+    def close(self):
+        """Releases any resources held by the backend."""
+
+
+# The batch state (pending, last_sync, _timer) changes together under _lock
+class JournalFile:  # pylint: disable=too-many-instance-attributes
+    """Append-only JSON Lines file with group commit.
+
+    Every append is a single unbuffered write to the operating system, so it
+    survives a crash of the process and never interleaves with appends of
+    other processes; fsync, which makes it survive a power loss, is batched
+    across appends (see JOURNAL_SYNC_EVERY and JOURNAL_SYNC_INTERVAL). A
+    timer fsyncs a batch that no later append completes in time.
+    """
+
+    def __init__(self, path, sync_every=JOURNAL_SYNC_EVERY, sync_interval=JOURNAL_SYNC_INTERVAL):
+        """Opens the journal for appending."""
+        self.path = path
+        self.file = open(path, 'ab', buffering=0)  # pylint: disable=consider-using-with
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.pending = 0
+        self.last_sync = time.monotonic()
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def append(self, entries):
+        """Writes entries, one JSON object per line, and fsyncs if a batch is due.
+
+        Otherwise makes sure a timer fsyncs them within sync_interval.
+        """
+        lines = ''.join(json.dumps(entry) + '\n' for entry in entries).encode('utf-8')
+        with self._lock:
+            self.file.write(lines)
+            self.pending += len(entries)
+            waited = time.monotonic() - self.last_sync
+            if self.pending >= self.sync_every or waited >= self.sync_interval:
+                self._sync()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.sync_interval - waited, self._timed_sync)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _timed_sync(self):
+        """Timer callback: fsyncs the batch no later append completed."""
+        with self._lock:
+            self._timer = None
+            if not self.file.closed:
+                self._sync()
+
+    def _sync(self):
+        """Fsyncs the pending entries."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self.pending:
+            os.fsync(self.file.fileno())
+            self.pending = 0
+        self.last_sync = time.monotonic()
+
+    def sync(self):
+        """Fsyncs every entry appended so far."""
+        with self._lock:
+            self._sync()
+
+    def replaced(self):
+        """Returns whether the file at the journal's path is no longer the open one.
+
+        That happens when another process cleared the journal.
+        """
+        try:
+            return not os.path.samestat(os.fstat(self.file.fileno()), os.stat(self.path))
+        except FileNotFoundError:
+            return True
+
+    def close(self):
+        """Fsyncs and closes the journal."""
+        with self._lock:
+            self._sync()
+            self.file.close()
+
+
+def read_journal_file(path, offset=0):
+    """Reads the entries of a JSON Lines journal from a byte offset.
+
+    A torn last line, left by a crash in the middle of an append, is ignored.
+
+    Returns:
+        tuple: The entries, and the offset just after the last one read.
+    """
+    entries = []
+    try:
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+                offset += len(line)
+    except FileNotFoundError:
+        pass
+    return entries, offset
+
+
+class JsonFileStorage(Storage):
+    """Stores each record as its own JSON file, using the original filenames."""
+
+    def __init__(self, directory=None):
+        """Initializes the backend.
+
+        Parameters:
+            directory (str): Directory for the files. Defaults to the current
+                working directory at the time of each call.
+        """
+        self.directory = directory
+        self._journals = {}
+        self._journals_lock = threading.Lock()
+
+    def path(self, kind, key):
+        """Returns the path of the file holding a record."""
+        filename = FILENAME_PATTERNS[kind].format(key)
+        return os.path.join(self.directory, filename) if self.directory else filename
+
+    def journal_path(self, kind, key):
+        """Returns the path of a record's journal file."""
+        filename = JOURNAL_PATTERNS[kind].format(key)
+        return os.path.join(self.directory, filename) if self.directory else filename
+
+    def lock_path(self, name):
+        """Returns the path of the file behind a named lock."""
+        filename = f"{name}.lock"
+        return os.path.join(self.directory, filename) if self.directory else filename
+
+    def save(self, kind, key, data):
+        """Writes a record to its file, replacing the previous one atomically."""
+        path = self.path(kind, key)
+        # Unique per writer, so concurrent saves of a record never share a temp file
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(temp_path, path)
+
+    def load(self, kind, key):
+        """Reads a record from its file."""
+        try:
+            with open(self.path(kind, key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError as error:
+            raise RecordNotFound(f"{kind} {key} not found") from error
+
+    def delete(self, kind, key):
+        """Removes the file of a record."""
+        try:
+            os.remove(self.path(kind, key))
+        except FileNotFoundError as error:
+            raise RecordNotFound(f"{kind} {key} not found") from error
+
+    def exists(self, kind, key):
+        """Returns whether the file of a record exists."""
+        return os.path.exists(self.path(kind, key))
+
+    def keys(self, kind):
+        """Returns the keys of every record of a kind found in the directory."""
+        prefix, suffix = FILENAME_PATTERNS[kind].split('{}')
+        pattern = os.path.join(glob.escape(self.directory or '.'), f"{prefix}*{suffix}")
+        return sorted(os.path.basename(path)[len(prefix):-len(suffix)]
+                      for path in glob.glob(pattern))
+
+    def append_journal(self, kind, key, entries):
+        """Appends entries to the record's journal file."""
+        path = self.journal_path(kind, key)
+        with self._journals_lock:
+            journal = self._journals.get(path)
+            if journal is not None and journal.replaced():
+                journal.close()
+                journal = None
+            if journal is None:
+                journal = self._journals[path] = JournalFile(path)
+        journal.append(entries)
+
+    def read_journal(self, kind, key):
+        """Reads the record's journal file."""
+        return read_journal_file(self.journal_path(kind, key))[0]
+
+    def read_journal_from(self, kind, key, position=None):
+        """Reads the record's journal file from a byte offset."""
+        return read_journal_file(self.journal_path(kind, key), position or 0)
+
+    def clear_journal(self, kind, key):
+        """Removes the record's journal file."""
+        path = self.journal_path(kind, key)
+        with self._journals_lock:
+            journal = self._journals.pop(path, None)
+        if journal is not None:
+            journal.close()
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+
+    @contextlib.contextmanager
+    def lock(self, name, shared=False):
+        """Holds a lock on the file {name}.lock in the storage directory."""
+        with file_lock(self.lock_path(name), shared):
+            yield self
+
+    def sync(self):
+        """Fsyncs every open journal."""
+        with self._journals_lock:
+            journals = list(self._journals.values())
+        for journal in journals:
+            journal.sync()
+
+    def close(self):
+        """Fsyncs and closes every open journal."""
+        with self._journals_lock:
+            journals, self._journals = list(self._journals.values()), {}
+        for journal in journals:
+            journal.close()
+
+
+def open_storage(spec):
+    """Creates a storage backend from a specification string.
+
+    Parameters:
+        spec (str): "json:DIRECTORY" or "sqlite:PATH".
+
+    Returns:
+        Storage: The backend.
+    """
+    scheme, _, location = spec.partition(':')
+    if scheme == 'json':
+        return JsonFileStorage(location or None)
+    if scheme == 'sqlite':
+        from bookinn.storage.sqlite_storage import SQLiteStorage  # pylint: disable=import-outside-toplevel
+        return SQLiteStorage(location or 'bookinn.db')
+    raise ValueError(f"Unknown storage backend: {spec}")
+
+
+class StoragePool:
+    """Set of open backends for one storage, each used by one thread at a time.
+
+    Backends are opened on demand, up to size, and then reused, most recently
+    returned first. The specification must name storage shared by every
+    backend, such as a directory or a database file (not sqlite::memory:).
+    """
+
+    def __init__(self, spec, size):
+        """Initializes an empty pool.
+
+        Parameters:
+            spec (str): Storage specification, as taken by open_storage.
+            size (int): Maximum number of open backends.
+        """
+        self.spec = spec
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._opened = []
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def handle(self):
+        """Lends a backend for the duration of the block, waiting if all are in use."""
+        try:
+            storage = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                storage = None
+                if len(self._opened) < self.size:
+                    storage = open_storage(self.spec)
+                    self._opened.append(storage)
+            if storage is None:
+                storage = self._idle.get()
+        try:
+            yield storage
+        finally:
+            self._idle.put(storage)
+
+    def close(self):
+        """Closes every backend the pool opened."""
+        with self._lock:
+            opened, self._opened = self._opened, []
+        for storage in opened:
+            storage.close()
+
+
+_state = {'storage': None}
+_local = threading.local()
+
+
+def get_storage():
+    """Returns the current thread's backend (see use_storage), or the active one.
+
+    The active backend is created on first use if none has been set.
+    """
+    storage = getattr(_local, 'storage', None)
+    if storage is not None:
+        return storage
+    if _state['storage'] is None:
+        _state['storage'] = open_storage(os.environ.get(STORAGE_ENV_VAR, 'json:'))
+    return _state['storage']
+
+
+def set_storage(storage):
+    """Sets the active storage backend and returns the previous one.
+
+    Passing None restores the default backend on the next get_storage call.
+    """
+    previous = _state['storage']
+    _state['storage'] = storage
+    return previous
+
+
+@contextlib.contextmanager
+def use_storage(storage):
+    """Makes get_storage return a backend in the current thread for the duration of the block."""
+    previous = getattr(_local, 'storage', None)
+    _local.storage = storage
+    try:
+        yield storage
+    finally:
+        _local.storage = previous
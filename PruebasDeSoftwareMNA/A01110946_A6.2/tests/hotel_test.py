@@ -7,8 +7,51 @@ ensuring that all methods behave as expected under various conditions.
 
 import unittest
 import os
+import random
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from bookinn.hotel.hotel import Hotel
 from bookinn.hotel.room import Room
+from bookinn.storage.sqlite_storage import SQLiteStorage
+from bookinn.storage.storage import JsonFileStorage, open_storage, set_storage
+
+CONTENDED_ROOMS = 4
+CONTENDED_NIGHTS = 6
+
+
+def contended_bookings():
+    """Returns every (room, night) one-night booking of the contended hotel."""
+    return [(room, f"2023-02-{night:02d}", f"2023-02-{night + 1:02d}")
+            for room in range(1, CONTENDED_ROOMS + 1) for night in range(1, CONTENDED_NIGHTS + 1)]
+
+
+def reserve_contended(hotel, worker):
+    """Tries every contended booking in a random order.
+
+    Returns:
+        list: The (room, start_date) of each booking this worker made.
+    """
+    bookings = contended_bookings()
+    random.Random(worker).shuffle(bookings)
+    made = []
+    for room, start_date, end_date in bookings:
+        if hotel.reserve_room(f"w{worker}-{room}-{start_date}", "cust", room, start_date, end_date):
+            made.append((room, start_date))
+    return made
+
+
+def reserve_in_process(spec, worker):
+    """Process pool task: reserves the contended bookings on a shared hotel."""
+    storage = open_storage(spec)
+    set_storage(storage)
+    try:
+        hotel = Hotel("Contended Hotel", "", shared=True)
+        hotel.load_from_file()
+        hotel.compact_every = 5
+        return reserve_contended(hotel, worker)
+    finally:
+        storage.close()
 
 
 class TestHotel(unittest.TestCase):
@@ -69,6 +112,8 @@ class TestHotel(unittest.TestCase):
         reserved_room = next((r for r in self.hotel.rooms if r.room_number == room_number), None)
         self.assertIsNotNone(reserved_room, "Reserved room should exist in hotel")
         self.assertFalse(reserved_room.is_available, "Room should be marked as not available after reservation")
+        # Cleanup the reservation record so the id can be reserved again
+        self.hotel.cancel_reservation("reservation_id")
 
     def test_cancel_reservation(self):
         """Test canceling a reservation marks the room as available again."""
@@ -87,6 +132,305 @@ class TestHotel(unittest.TestCase):
         self.assertIsNotNone(room, "The room should exist.")
         self.assertTrue(room.is_available, "The room should be available after canceling the reservation.")
 
+    def test_free_room_index(self):
+        """Test free room counts follow reservations and direct room changes."""
+        hotel = Hotel("Index Hotel", "Index Location")
+        hotel.rooms.extend([Room(201, "double", 150), Room(202, "double", 150)])
+        self.assertEqual(hotel.count_free("double"), 2)
+        self.assertEqual(hotel.count_free(), 2)
+
+        hotel.get_room(201).make_reservation()
+        self.assertEqual([room.room_number for room in hotel.free_rooms("double")], [202])
+        hotel.get_room(201).cancel_reservation()
+        self.assertEqual(hotel.count_free("double"), 2)
+
+        hotel.rooms.remove(hotel.get_room(202))
+        self.assertIsNone(hotel.get_room(202))
+        self.assertEqual(hotel.count_free("double"), 1)
+
+    def test_reserve_any(self):
+        """Test reserving any free room of a type until none is left."""
+        self.hotel.rooms.append(Room(102, "single", 100.00))
+        first = self.hotel.reserve_any("res_any_1", "cust1", "single", "2023-01-01", "2023-01-05")
+        second = self.hotel.reserve_any("res_any_2", "cust2", "single", "2023-01-01", "2023-01-05")
+        third = self.hotel.reserve_any("res_any_3", "cust3", "single", "2023-01-01", "2023-01-05")
+        self.assertEqual({first, second}, {101, 102})
+        self.assertIsNone(third, "No single room should be left.")
+        self.assertEqual(self.hotel.count_free("single"), 0)
+        self.assertIsNone(self.hotel.reserve_any("res_any_4", "cust4", "suite", "2023-01-01", "2023-01-05"))
+        for reservation_id in ("res_any_1", "res_any_2"):
+            self.hotel.cancel_reservation(reservation_id)
+        self.assertEqual(self.hotel.count_free("single"), 2)
+
+    def test_date_range_availability(self):
+        """Test rooms can be booked again for dates that do not overlap."""
+        hotel = Hotel("Dated Hotel", "Dated Location")
+        hotel.rooms.extend([Room(301, "double", 150), Room(302, "double", 150)])
+        self.assertTrue(hotel.reserve_room("res301", "cust1", 301, "2023-03-01", "2023-03-02"))
+        self.assertFalse(hotel.reserve_room("res301b", "cust2", 301, "2023-03-01", "2023-03-03"))
+        self.assertTrue(hotel.reserve_room("res301c", "cust2", 301, "2023-04-01", "2023-04-03"))
+
+        self.assertTrue(hotel.is_room_free(301, "2023-03-02", "2023-04-01"))
+        free = hotel.free_rooms_between("2023-03-01", "2023-03-05", "double")
+        self.assertEqual([room.room_number for room in free], [302])
+        self.assertEqual(hotel.reserve_any("res_any", "cust3", "double", "2023-03-10", "2023-03-12"), 302)
+        self.assertEqual(hotel.reserve_any("res_any2", "cust4", "double", "2023-05-01", "2023-05-02"), 301)
+
+        for reservation_id in ("res301", "res301c", "res_any", "res_any2"):
+            self.assertTrue(hotel.cancel_reservation(reservation_id))
+        self.assertEqual(hotel.count_free("double"), 2)
+        Hotel.delete_hotel(hotel)
+
+
+class TestHotelJournal(unittest.TestCase):
+    """Test cases for the hotel journal and snapshot compaction."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.storage = JsonFileStorage(self.directory.name)
+        self.previous = set_storage(self.storage)
+        self.hotel = Hotel.create_hotel("Journal Hotel", "Journal Location")
+        self.hotel.rooms.extend([Room(number, "double", 150) for number in range(1, 11)])
+        self.hotel.save_to_file()
+
+    def tearDown(self):
+        set_storage(self.previous)
+        self.storage.close()
+        self.directory.cleanup()
+
+    def load(self):
+        """Loads a fresh copy of the hotel from storage."""
+        hotel = Hotel("Journal Hotel", "")
+        hotel.load_from_file()
+        return hotel
+
+    def test_bookings_append_to_journal(self):
+        """Test bookings are journaled instead of rewriting the snapshot."""
+        snapshot = self.storage.load('hotel', "Journal Hotel")
+        self.hotel.reserve_room("j1", "cust1", 3, "2023-01-01", "2023-01-05")
+        self.hotel.reserve_room("j2", "cust2", 4, "2023-01-01", "2023-01-05")
+        self.hotel.cancel_reservation("j1")
+
+        self.assertEqual(self.storage.load('hotel', "Journal Hotel"), snapshot, "Snapshot should be untouched.")
+        self.assertEqual([entry['seq'] for entry in self.storage.read_journal('hotel', "Journal Hotel")], [1, 2, 3])
+        loaded = self.load()
+        self.assertTrue(loaded.get_room(3).is_available)
+        self.assertFalse(loaded.get_room(4).is_available)
+        self.assertEqual(loaded.journal_seq, 3)
+
+    def test_compaction(self):
+        """Test the journal is folded into the snapshot every compact_every entries."""
+        self.hotel.compact_every = 3
+        for number in range(1, 6):
+            self.hotel.reserve_room(f"c{number}", "cust", number, "2023-01-01", "2023-01-05")
+        self.assertEqual(len(self.storage.read_journal('hotel', "Journal Hotel")), 1)
+        self.assertEqual(self.load().count_free("double"), 5)
+
+    def test_stale_and_torn_entries_are_ignored(self):
+        """Test replay skips entries of older snapshots and a torn last line."""
+        self.hotel.reserve_room("s1", "cust1", 1, "2023-01-01", "2023-01-05")
+        stale = self.storage.read_journal('hotel', "Journal Hotel")
+        self.hotel.save_to_file()
+        self.storage.append_journal('hotel', "Journal Hotel", stale)
+        self.storage.close()
+        with open(self.storage.journal_path('hotel', "Journal Hotel"), 'a', encoding='utf-8') as f:
+            f.write('{"generation": "torn')
+        loaded = self.load()
+        self.assertEqual(loaded.count_free("double"), 9)
+        self.assertEqual(loaded.journal_seq, 0)
+
+    def test_journal_on_sqlite(self):
+        """Test journal replay with the SQLite backend."""
+        storage = SQLiteStorage(':memory:')
+        set_storage(storage)
+        try:
+            hotel = Hotel.create_hotel("Journal Hotel", "Journal Location")
+            hotel.rooms.append(Room(1, "single", 90))
+            hotel.save_to_file()
+            hotel.reserve_room("q1", "cust1", 1, "2023-01-01", "2023-01-05")
+            self.assertEqual(len(storage.read_journal('hotel', "Journal Hotel")), 1)
+            self.assertFalse(self.load().get_room(1).is_free("2023-01-02", "2023-01-03"))
+            Hotel.delete_hotel(hotel)
+            self.assertEqual(storage.read_journal('hotel', "Journal Hotel"), [])
+        finally:
+            storage.close()
+
+
+class TestHotelBatch(unittest.TestCase):
+    """Test cases for bulk reservations and cancellations."""
+
+    def setUp(self):
+        self.storage = SQLiteStorage(':memory:')
+        self.previous = set_storage(self.storage)
+        self.hotel = Hotel.create_hotel("Batch Hotel", "Batch Location")
+        self.hotel.rooms.extend([Room(number, "double", 150) for number in range(1, 4)])
+        self.hotel.save_to_file()
+
+    def tearDown(self):
+        set_storage(self.previous)
+        self.storage.close()
+
+    @staticmethod
+    def booking(reservation_id, room_number, start_date="2023-01-01", end_date="2023-01-05"):
+        """Builds a batch item."""
+        return {'reservation_id': reservation_id, 'customer_id': "cust", 'room_number': room_number,
+                'start_date': start_date, 'end_date': end_date}
+
+    def test_reserve_rooms(self):
+        """Test a valid batch is reserved and persisted with one journal append."""
+        batch = [self.booking("b1", 1), self.booking("b2", 2), self.booking("b3", 1, "2023-01-05", "2023-01-07")]
+        self.assertEqual(self.hotel.reserve_rooms(batch), [])
+        self.assertEqual(self.storage.keys('reservation'), ["b1", "b2", "b3"])
+        self.assertEqual(len(self.storage.read_journal('hotel', "Batch Hotel")), 2, "One entry per changed room.")
+        loaded = Hotel("Batch Hotel", "")
+        loaded.load_from_file()
+        self.assertEqual(len(loaded.get_room(1).bookings), 2)
+
+    def test_atomic_batch_rejects_everything(self):
+        """Test one conflicting item rejects an atomic batch without side effects."""
+        batch = [self.booking("b1", 1), self.booking("b2", 1, "2023-01-03", "2023-01-04"),
+                 self.booking("b3", 9), self.booking("b4", 2, "2023-01-05", "2023-01-01")]
+        failures = self.hotel.reserve_rooms(batch)
+        self.assertEqual([reservation_id for reservation_id, _ in failures], ["b2", "b3", "b4"])
+        self.assertEqual(self.hotel.count_free("double"), 3)
+        self.assertEqual(self.storage.keys('reservation'), [])
+        self.assertEqual(self.storage.read_journal('hotel', "Batch Hotel"), [])
+
+    def test_partial_batch(self):
+        """Test a non-atomic batch reserves the valid items and reports the rest."""
+        batch = [self.booking("b1", 1), self.booking("b1", 2), self.booking("b2", 1)]
+        failures = self.hotel.reserve_rooms(batch, atomic=False)
+        self.assertEqual([reservation_id for reservation_id, _ in failures], ["b1", "b2"])
+        self.assertEqual(self.storage.keys('reservation'), ["b1"])
+        self.assertEqual(self.hotel.count_free("double"), 2)
+
+    def test_duplicate_reservation_id(self):
+        """Test a reservation id already in storage is rejected without touching the rooms."""
+        self.assertTrue(self.hotel.reserve_room("r1", "cust", 1, "2023-01-01", "2023-01-05"))
+        self.assertFalse(self.hotel.reserve_room("r1", "other", 2, "2023-01-01", "2023-01-05"))
+        self.assertFalse(self.hotel.reserve_room("r1", "other", 1, "2023-02-01", "2023-02-05"))
+        self.assertIsNone(self.hotel.reserve_any("r1", "other", "double", "2023-01-01", "2023-01-05"))
+        self.assertEqual(self.storage.load('reservation', "r1")['customer_id'], "cust")
+        self.assertEqual(self.hotel.count_free("double"), 2)
+        self.assertTrue(self.hotel.cancel_reservation("r1"))
+        self.assertEqual(self.hotel.count_free("double"), 3)
+
+    def test_reserve_any_with_orphan_booking(self):
+        """Test reserve_any gives up on a room that keeps a booking whose record was deleted."""
+        self.hotel.add_room(Room(9, "suite", 300))
+        self.assertEqual(self.hotel.reserve_any("r1", "cust", "suite", "2023-01-01", "2023-01-05"), 9)
+        self.storage.delete('reservation', "r1")  # As Reservation.cancel_reservation does
+        self.assertIsNone(self.hotel.reserve_any("r1", "cust", "suite", "2023-02-01", "2023-02-05"))
+        self.assertEqual(len(self.hotel.get_room(9).bookings), 1)
+
+    def test_batch_rejects_existing_ids(self):
+        """Test batch items reusing a stored reservation id never replace or roll back that reservation."""
+        self.assertTrue(self.hotel.reserve_room("r1", "cust", 1, "2023-01-01", "2023-01-05"))
+        batch = [self.booking("b1", 2), self.booking("r1", 3), self.booking("r1", 1, "2023-02-01", "2023-02-02")]
+        self.assertEqual(self.hotel.reserve_rooms(batch), [("r1", "reservation id already exists")] * 2)
+        self.assertEqual(self.storage.keys('reservation'), ["r1"])
+        self.assertEqual(self.hotel.reserve_rooms(batch, atomic=False), [("r1", "reservation id already exists")] * 2)
+        self.assertEqual(self.storage.load('reservation', "r1")['room_number'], 1)
+        self.assertTrue(self.hotel.cancel_reservation("r1"))
+        self.assertEqual(sorted(room.room_number for room in self.hotel.free_rooms("double")), [1, 3])
+
+    def test_add_room(self):
+        """Test adding a room saves a snapshot and a taken room number is refused."""
+        self.assertTrue(self.hotel.add_room(Room(4, "suite", 300)))
+        self.assertFalse(self.hotel.add_room(Room(4, "double", 150)))
+        loaded = Hotel("Batch Hotel", "")
+        loaded.load_from_file()
+        self.assertEqual([room.room_number for room in loaded.rooms], [1, 2, 3, 4])
+        self.assertEqual(loaded.get_room(4).room_type, "suite")
+
+    def test_cancel_reservations(self):
+        """Test bulk cancellation, atomic and not."""
+        self.hotel.reserve_rooms([self.booking("b1", 1), self.booking("b2", 2)])
+        self.assertEqual(len(self.hotel.cancel_reservations(["b1", "missing"])), 1)
+        self.assertEqual(self.storage.keys('reservation'), ["b1", "b2"])
+        self.assertEqual(self.hotel.cancel_reservations(["b1", "missing"], atomic=False),
+                         [("missing", "reservation not found")])
+        self.assertEqual(self.hotel.cancel_reservations(["b2"]), [])
+        self.assertEqual(self.storage.keys('reservation'), [])
+        self.assertEqual(self.hotel.count_free("double"), 3)
+
+
+class TestHotelConcurrency(unittest.TestCase):
+    """Stress tests for concurrent reservations of the same rooms."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def create(self, spec):
+        """Creates the contended hotel in a fresh storage and returns the storage."""
+        storage = open_storage(spec)
+        previous = set_storage(storage)
+        self.addCleanup(set_storage, previous)
+        self.addCleanup(storage.close)
+        hotel = Hotel.create_hotel("Contended Hotel", "")
+        hotel.rooms.extend([Room(number, "double", 150) for number in range(1, CONTENDED_ROOMS + 1)])
+        hotel.save_to_file()
+        return storage
+
+    def assert_booked_once(self, storage, made):
+        """Checks every booking was made exactly once and was persisted."""
+        self.assertEqual(sorted(made), sorted((room, start) for room, start, _ in contended_bookings()))
+        self.assertEqual(len(storage.keys('reservation')), len(made))
+        hotel = Hotel("Contended Hotel", "")
+        hotel.load_from_file()
+        for room in hotel.rooms:
+            self.assertEqual(len(room.bookings), CONTENDED_NIGHTS)
+
+    def test_threads(self):
+        """Test threads racing for the same rooms never double book."""
+        storage = self.create(f"json:{self.directory.name}")
+        hotel = Hotel("Contended Hotel", "")
+        hotel.load_from_file()
+        hotel.compact_every = 5
+        results = [[] for _ in range(8)]
+
+        def worker(index):
+            results[index] = reserve_contended(hotel, index)
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(len(results))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assert_booked_once(storage, [booking for made in results for booking in made])
+
+    def test_locks_rooms_added_elsewhere(self):
+        """Test a shared hotel locks a room another writer added since its last refresh."""
+        self.create(f"json:{self.directory.name}")
+        hotel, other = Hotel("Contended Hotel", "", shared=True), Hotel("Contended Hotel", "", shared=True)
+        hotel.load_from_file()
+        other.load_from_file()
+        other.rooms.append(Room(9, "suite", 300))
+        other.save_to_file()
+        self.assertIsNone(hotel.get_room(9))
+        with hotel.locked([9]):
+            room = hotel.get_room(9)
+            self.assertIsNotNone(room)
+            acquired = []
+            thread = threading.Thread(target=lambda: acquired.append(room.lock.acquire(blocking=False)))
+            thread.start()
+            thread.join()
+            self.assertEqual(acquired, [False], "The new room's lock should be held.")
+        self.assertTrue(hotel.reserve_room("r9", "cust", 9, "2023-02-01", "2023-02-02"))
+
+    def test_processes(self):
+        """Test processes sharing a hotel never double book, on both backends."""
+        for spec in (f"json:{self.directory.name}", f"sqlite:{os.path.join(self.directory.name, 'bookinn.db')}"):
+            with self.subTest(spec=spec):
+                storage = self.create(spec)
+                with ProcessPoolExecutor(max_workers=4) as executor:
+                    results = list(executor.map(reserve_in_process, [spec] * 4, range(4)))
+                self.assert_booked_once(storage, [booking for made in results for booking in made])
+                for key in storage.keys('reservation'):
+                    storage.delete('reservation', key)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -39,7 +39,52 @@ class TestRoom(unittest.TestCase):
         self.room.update_price(new_price)
         self.assertEqual(self.room.price, new_price)
 
-    # Add more tests as necessary for other methods and edge cases.
+    def test_dated_bookings(self):
+        """Test dated bookings only block their own nights."""
+        self.assertTrue(self.room.make_reservation("2023-03-01", "2023-03-02", "r1"))
+        self.assertTrue(self.room.make_reservation("2023-03-05", "2023-03-08", "r2"))
+        self.assertFalse(self.room.is_available)
+        self.assertTrue(self.room.is_free("2023-03-02", "2023-03-05"), "Check-out day is free again.")
+        self.assertFalse(self.room.is_free("2023-03-04", "2023-03-06"))
+        self.assertFalse(self.room.is_free("2023-02-01", "2023-04-01"))
+        self.assertFalse(self.room.make_reservation("2023-03-07", "2023-03-09", "r3"))
+        with self.assertRaises(ValueError):
+            self.room.is_free("2023-03-05", "2023-03-05")
+
+        self.assertTrue(self.room.cancel_reservation("r2"))
+        self.assertTrue(self.room.is_free("2023-03-04", "2023-03-06"))
+        self.room.cancel_reservation("r1")
+        self.assertTrue(self.room.is_available)
+
+    def test_duplicate_reservation_id(self):
+        """Test a reservation id already booked on the room is rejected."""
+        self.assertTrue(self.room.make_reservation("2023-03-01", "2023-03-02", "r1"))
+        self.assertFalse(self.room.make_reservation("2023-04-01", "2023-04-02", "r1"))
+        self.assertEqual(len(self.room.bookings), 1)
+        self.assertTrue(self.room.cancel_reservation("r1"))
+        self.assertTrue(self.room.is_available)
+
+    def test_blocked_room_is_never_free(self):
+        """Test an undated reservation blocks every date range."""
+        self.room.make_reservation()
+        self.assertFalse(self.room.is_free("2030-01-01", "2030-01-02"))
+
+    def test_bookings_round_trip(self):
+        """Test bookings survive to_dict/from_dict."""
+        self.room.make_reservation("2023-03-05", "2023-03-08", "r2")
+        self.room.make_reservation("2023-03-01", "2023-03-02", "r1")
+        restored = Room.from_dict(self.room.to_dict())
+        self.assertEqual(restored.bookings, self.room.bookings)
+        self.assertEqual([booking[2] for booking in restored.bookings], ["r1", "r2"])
+        self.assertFalse(restored.is_free("2023-03-01", "2023-03-02"))
+        self.assertTrue(restored.cancel_reservation("r1"))
+
+    def test_legacy_unavailable_room(self):
+        """Test rooms saved before dated bookings keep their availability flag."""
+        legacy = Room.from_dict({'room_number': 1, 'room_type': 'single', 'price': 1.0, 'is_available': False})
+        self.assertFalse(legacy.is_available)
+        legacy.cancel_reservation("old reservation")
+        self.assertTrue(legacy.is_available)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,210 @@
+"""
+Unit tests for the HTTP/JSON service.
+
+This module contains tests that run the service on a local port against a
+temporary storage and drive it with the service client.
+"""
+
+import asyncio
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from bookinn.service.client import ServiceClient, quote
+from bookinn.service.server import Service
+
+
+class TestService(unittest.IsolatedAsyncioTestCase):
+    """Tests for the routes, errors and concurrency of the service."""
+
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.service = Service(f"sqlite:{os.path.join(self.directory.name, 'bookinn.db')}",
+                               read_workers=2, write_workers=2)
+        self.server = await self.service.start('127.0.0.1', 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.client = ServiceClient('127.0.0.1', self.port)
+        status, _ = await self.client.request('POST', '/hotels', {
+            'name': "Service Hotel", 'location': "Here",
+            'rooms': [{'room_number': 1, 'room_type': "single", 'price': 90},
+                      {'room_number': 2, 'room_type': "double", 'price': 150}]})
+        self.assertEqual(status, 201)
+        self.hotel = f"/hotels/{quote('Service Hotel')}"
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        self.server.close()
+        await self.server.wait_closed()
+        self.service.close()
+        self.directory.cleanup()
+
+    async def test_hotel_routes(self):
+        """Test reading, modifying and deleting a hotel and adding rooms."""
+        status, hotel = await self.client.request('GET', self.hotel)
+        self.assertEqual((status, hotel['location'], hotel['free_rooms']), (200, "Here", 2))
+        self.assertEqual((await self.client.request('POST', '/hotels', {'name': "Service Hotel",
+                                                                        'location': "X"}))[0], 409)
+        status, _ = await self.client.request('POST', f"{self.hotel}/rooms",
+                                              {'room_number': 3, 'room_type': "double", 'price': 150})
+        self.assertEqual(status, 201)
+        status, rooms = await self.client.request('GET', f"{self.hotel}/rooms?type=double")
+        self.assertEqual([room['room_number'] for room in rooms], [2, 3])
+        status, hotel = await self.client.request('PATCH', self.hotel, {'location': "There"})
+        self.assertEqual((status, hotel['location']), (200, "There"))
+        self.assertEqual((await self.client.request('DELETE', self.hotel))[0], 204)
+        self.assertEqual((await self.client.request('GET', self.hotel))[0], 404)
+
+    async def test_reservation_routes(self):
+        """Test reserving by number and by type, conflicts and cancelling."""
+        booking = {'reservation_id': "r1", 'customer_id': "c1", 'room_number': 1,
+                   'start_date': "2024-03-01", 'end_date': "2024-03-04"}
+        status, body = await self.client.request('POST', f"{self.hotel}/reservations", booking)
+        self.assertEqual((status, body['room_number']), (201, 1))
+        status, _ = await self.client.request('POST', f"{self.hotel}/reservations", dict(booking, reservation_id="r2"))
+        self.assertEqual(status, 409)
+        status, body = await self.client.request('POST', f"{self.hotel}/reservations", {
+            'reservation_id': "r3", 'customer_id': "c1", 'room_type': "double",
+            'start_date': "2024-03-01", 'end_date': "2024-03-04"})
+        self.assertEqual((status, body['room_number']), (201, 2))
+        status, rooms = await self.client.request('GET', f"{self.hotel}/rooms?start=2024-03-02&end=2024-03-03")
+        self.assertEqual((status, rooms), (200, []))
+        status, reservation = await self.client.request('GET', "/reservations/r1")
+        self.assertEqual((status, reservation['room_number']), (200, 1))
+
+        status, body = await self.client.request('POST', f"{self.hotel}/reservations/batch", {'reservations': [
+            dict(booking, reservation_id="b1", start_date="2024-04-01", end_date="2024-04-02"),
+            dict(booking, reservation_id="b2", room_number=9)], 'atomic': False})
+        self.assertEqual((status, body['failures']), (200, [{'reservation_id': "b2", 'reason': "room not found"}]))
+
+        self.assertEqual((await self.client.request('DELETE', f"{self.hotel}/reservations/r1"))[0], 204)
+        self.assertEqual((await self.client.request('DELETE', f"{self.hotel}/reservations/r1"))[0], 404)
+
+    async def test_customer_routes(self):
+        """Test creating, reading, updating and deleting a customer."""
+        customer = {'customer_id': "c7", 'name': "Ana", 'email': "ana@example.com"}
+        self.assertEqual((await self.client.request('POST', '/customers', customer))[0], 201)
+        self.assertEqual(await self.client.request('GET', '/customers/c7'), (200, customer))
+        status, body = await self.client.request('PATCH', '/customers/c7', {'email': "ana@example.org"})
+        self.assertEqual((status, body['email']), (200, "ana@example.org"))
+        self.assertEqual((await self.client.request('DELETE', '/customers/c7'))[0], 204)
+        self.assertEqual((await self.client.request('GET', '/customers/c7'))[0], 404)
+
+    async def test_errors(self):
+        """Test unknown routes, wrong methods and invalid requests."""
+        self.assertEqual((await self.client.request('GET', '/nowhere'))[0], 404)
+        self.assertEqual((await self.client.request('PUT', '/customers/c1'))[0], 405)
+        self.assertEqual((await self.client.request('POST', '/customers', {'name': "No id"}))[0], 400)
+        status, _ = await self.client.request('POST', f"{self.hotel}/reservations", {
+            'reservation_id': "r1", 'customer_id': "c1", 'room_number': 1,
+            'start_date': "2024-03-04", 'end_date': "2024-03-01"})
+        self.assertEqual(status, 400)
+        reader, writer = await asyncio.open_connection('127.0.0.1', self.port)
+        writer.write(b"POST /customers HTTP/1.1\r\nContent-Length: 5\r\n\r\n{nope")
+        self.assertIn(b" 400 ", await reader.readline())
+        writer.close()
+        await writer.wait_closed()
+
+    async def test_unsafe_names(self):
+        """Test names and ids that could escape the storage directory are rejected."""
+        self.assertEqual((await self.client.request('POST', '/hotels', {'name': "../x", 'location': "X"}))[0], 400)
+        self.assertEqual((await self.client.request('GET', f"/hotels/{quote('../x')}"))[0], 400)
+        self.assertEqual((await self.client.request('GET', f"/reservations/{quote('a/b')}"))[0], 400)
+        self.assertEqual((await self.client.request('POST', f"{self.hotel}/rooms", {
+            'room_number': "../9", 'room_type': "single", 'price': 90}))[0], 400)
+        status, _ = await self.client.request('POST', f"{self.hotel}/reservations", {
+            'reservation_id': "../r", 'customer_id': "c1", 'room_number': 1,
+            'start_date': "2024-03-01", 'end_date': "2024-03-04"})
+        self.assertEqual(status, 400)
+
+    async def test_malformed_lists(self):
+        """Test batches and room lists that are not lists of complete objects are rejected."""
+        for body in ({'reservations': [1]}, {'reservations': {}}, {'reservations': [{'reservation_id': "b1"}]}):
+            with self.subTest(body=body):
+                status, _ = await self.client.request('POST', f"{self.hotel}/reservations/batch", body)
+                self.assertEqual(status, 400)
+        for rooms in (["single"], [{'room_number': 1}], "rooms"):
+            with self.subTest(rooms=rooms):
+                status, _ = await self.client.request('POST', '/hotels',
+                                                      {'name': "Bad", 'location': "X", 'rooms': rooms})
+                self.assertEqual(status, 400)
+
+    async def test_concurrent_reservations(self):
+        """Test many clients racing for one room get exactly one booking."""
+        clients = [ServiceClient('127.0.0.1', self.port) for _ in range(10)]
+        try:
+            results = await asyncio.gather(*(client.request('POST', f"{self.hotel}/reservations", {
+                'reservation_id': f"race{index}", 'customer_id': "c", 'room_number': 2,
+                'start_date': "2024-05-01", 'end_date': "2024-05-03"})
+                for index, client in enumerate(clients)))
+        finally:
+            for client in clients:
+                await client.close()
+        self.assertEqual(sorted(status for status, _ in results), [201] + [409] * 9)
+
+    async def test_concurrent_creation(self):
+        """Test concurrent requests creating one hotel or one room number succeed once."""
+        clients = [ServiceClient('127.0.0.1', self.port) for _ in range(6)]
+        try:
+            hotels = await asyncio.gather(*(client.request('POST', '/hotels', {'name': "Race Hotel", 'location': "X"})
+                                            for client in clients))
+            rooms = await asyncio.gather(*(client.request('POST', f"{self.hotel}/rooms", {
+                'room_number': 7, 'room_type': "suite", 'price': 300}) for client in clients))
+        finally:
+            for client in clients:
+                await client.close()
+        self.assertEqual(sorted(status for status, _ in hotels), [201] + [409] * 5)
+        self.assertEqual(sorted(status for status, _ in rooms), [201] + [409] * 5)
+        status, found = await self.client.request('GET', f"{self.hotel}/rooms?type=suite")
+        self.assertEqual((status, [room['room_number'] for room in found]), (200, [7]))
+
+    async def test_shared_reads_are_current(self):
+        """Test a shared service reads the changes another service process persisted."""
+        path = os.path.join(self.directory.name, 'shared.db')
+        services = [Service(f"sqlite:{path}", read_workers=1, write_workers=1, shared=True) for _ in range(2)]
+        servers = [await service.start('127.0.0.1', 0) for service in services]
+        clients = [ServiceClient('127.0.0.1', server.sockets[0].getsockname()[1]) for server in servers]
+        try:
+            await clients[0].request('POST', '/hotels', {'name': "Shared", 'location': "Here", 'rooms': [
+                {'room_number': 1, 'room_type': "single", 'price': 90}]})
+            status, rooms = await clients[1].request('GET', "/hotels/Shared/rooms?start=2024-06-01&end=2024-06-02")
+            self.assertEqual((status, len(rooms)), (200, 1))
+            status, _ = await clients[0].request('POST', "/hotels/Shared/reservations", {
+                'reservation_id': "s1", 'customer_id': "c1", 'room_number': 1,
+                'start_date': "2024-06-01", 'end_date': "2024-06-02"})
+            self.assertEqual(status, 201)
+            status, rooms = await clients[1].request('GET', "/hotels/Shared/rooms?start=2024-06-01&end=2024-06-02")
+            self.assertEqual((status, rooms), (200, []))
+            status, hotel = await clients[1].request('GET', "/hotels/Shared")
+            self.assertEqual((status, hotel['free_rooms']), (200, 0))
+            # Reads refresh without the write lock, so another process's write transaction does not block them
+            blocker = sqlite3.connect(path, isolation_level=None)
+            blocker.execute("BEGIN IMMEDIATE")
+            try:
+                status, _ = await asyncio.wait_for(clients[1].request('GET', "/hotels/Shared/rooms"), timeout=5)
+                self.assertEqual(status, 200)
+            finally:
+                blocker.execute("ROLLBACK")
+                blocker.close()
+        finally:
+            for client, server, service in zip(clients, servers, services):
+                await client.close()
+                server.close()
+                await server.wait_closed()
+                service.close()
+
+    async def test_reads_do_not_wait_for_writes(self):
+        """Test reads are served while every write thread is busy."""
+        release = threading.Event()
+        blocked = [asyncio.ensure_future(self.service.write(release.wait)) for _ in range(3)]
+        try:
+            status, _ = await asyncio.wait_for(self.client.request('GET', self.hotel), timeout=5)
+            self.assertEqual(status, 200)
+            self.assertFalse(any(future.done() for future in blocked))
+        finally:
+            release.set()
+            await asyncio.gather(*blocked)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,204 @@
+"""
+Unit tests for the storage backends.
+
+This module contains tests that verify the JSON file and SQLite backends,
+the entities running on top of SQLite, and the migration tool.
+"""
+
+import os
+import tempfile
+import time
+import unittest
+from bookinn.customer.customer import Customer
+from bookinn.hotel.hotel import Hotel
+from bookinn.hotel.room import Room
+from bookinn.reservation.reservation import Reservation
+from bookinn.storage.migrate import migrate
+from bookinn.storage.sqlite_storage import SQLiteStorage
+from bookinn.storage.storage import JournalFile, JsonFileStorage, RecordNotFound, open_storage, set_storage
+
+
+class StorageContract(unittest.TestCase):
+    """Checks shared by every backend, run by subclasses whose setUp opens a `storage`.
+
+    Removed from the module once the subclasses are defined, so it is not run itself.
+    """
+
+    storage = None
+
+    def test_save_and_load(self):
+        """Test a saved record is loaded back unchanged."""
+        self.storage.save('customer', 1, {'customer_id': 1, 'name': 'John Doe'})
+        self.assertEqual(self.storage.load('customer', 1), {'customer_id': 1, 'name': 'John Doe'})
+        self.assertTrue(self.storage.exists('customer', 1))
+
+    def test_save_replaces(self):
+        """Test saving an existing key replaces the record."""
+        self.storage.save('hotel', 'Inn', {'name': 'Inn', 'location': 'A'})
+        self.storage.save('hotel', 'Inn', {'name': 'Inn', 'location': 'B'})
+        self.assertEqual(self.storage.load('hotel', 'Inn')['location'], 'B')
+        self.assertEqual(self.storage.keys('hotel'), ['Inn'])
+
+    def test_missing_record(self):
+        """Test loading or deleting a missing record raises RecordNotFound."""
+        self.assertFalse(self.storage.exists('reservation', 'missing'))
+        with self.assertRaises(RecordNotFound):
+            self.storage.load('reservation', 'missing')
+        with self.assertRaises(FileNotFoundError):
+            self.storage.delete('reservation', 'missing')
+
+    def test_keys_by_kind(self):
+        """Test keys only lists records of the requested kind."""
+        self.storage.save('customer', 'a', {})
+        self.storage.save('customer', 'b', {})
+        self.storage.save('reservation', 'c', {})
+        self.storage.delete('customer', 'a')
+        self.assertEqual(self.storage.keys('customer'), ['b'])
+        self.assertEqual(self.storage.keys('reservation'), ['c'])
+
+    def test_read_journal_from(self):
+        """Test journal entries are read incrementally from a returned position."""
+        self.storage.append_journal('hotel', 'Inn', [{'seq': 1}, {'seq': 2}])
+        entries, position = self.storage.read_journal_from('hotel', 'Inn')
+        self.assertEqual(entries, [{'seq': 1}, {'seq': 2}])
+        self.storage.append_journal('hotel', 'Inn', [{'seq': 3}])
+        with self.storage.lock('Inn_hotel'):
+            entries, position = self.storage.read_journal_from('hotel', 'Inn', position)
+        self.assertEqual(entries, [{'seq': 3}])
+        self.assertEqual(self.storage.read_journal_from('hotel', 'Inn', position), ([], position))
+        with self.storage.read_lock('Inn_hotel'):
+            self.assertEqual(self.storage.read_journal_from('hotel', 'Inn', position), ([], position))
+
+
+class TestJsonFileStorage(StorageContract):
+    """Tests for the one-file-per-record backend."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.storage = JsonFileStorage(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_original_filenames(self):
+        """Test records use the filenames of the original layout."""
+        self.storage.save('hotel', 'Test Hotel', {})
+        self.storage.save('reservation', 7, {})
+        self.assertTrue(os.path.exists(os.path.join(self.directory.name, 'Test Hotel_data.json')))
+        self.assertTrue(os.path.exists(os.path.join(self.directory.name, 'reservation_7.json')))
+
+    def test_lone_journal_append_is_synced(self):
+        """Test an append with no later appends is fsynced within the sync interval."""
+        journal = JournalFile(os.path.join(self.directory.name, 'Inn_journal.jsonl'), sync_interval=0.2)
+        try:
+            journal.append([{'seq': 1}])
+            journal.append([{'seq': 2}])
+            self.assertEqual(journal.pending, 2, "The batch is not due yet.")
+            deadline = time.monotonic() + 5
+            while journal.pending and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(journal.pending, 0)
+        finally:
+            journal.close()
+
+
+class TestSQLiteStorage(StorageContract):
+    """Tests for the single-file SQLite backend."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.storage = open_storage(f"sqlite:{os.path.join(self.directory.name, 'bookinn.db')}")
+
+    def tearDown(self):
+        self.storage.close()
+        self.directory.cleanup()
+
+    def test_transaction_rolls_back(self):
+        """Test a failing transaction leaves no partial writes."""
+        with self.assertRaises(RuntimeError):
+            with self.storage.transaction():
+                self.storage.save('customer', 1, {})
+                with self.storage.transaction():
+                    self.storage.save('customer', 2, {})
+                raise RuntimeError("abort")
+        self.assertEqual(self.storage.keys('customer'), [])
+
+    def test_transaction_commits(self):
+        """Test the writes of a transaction are visible after it ends."""
+        with self.storage.transaction():
+            self.storage.save('customer', 1, {'name': 'A'})
+            self.storage.save('customer', 2, {'name': 'B'})
+        self.assertEqual(self.storage.keys('customer'), ['1', '2'])
+
+
+del StorageContract
+
+
+class TestEntitiesOnSQLite(unittest.TestCase):
+    """Tests that the entity APIs work unchanged on the SQLite backend."""
+
+    def setUp(self):
+        self.storage = SQLiteStorage(':memory:')
+        self.previous = set_storage(self.storage)
+
+    def tearDown(self):
+        set_storage(self.previous)
+        self.storage.close()
+
+    def test_customer_round_trip(self):
+        """Test creating, loading and deleting a customer."""
+        Customer.create_customer("cust1", "John Doe", "john@example.com")
+        self.assertFalse(os.path.exists("customer_cust1.json"), "No JSON file should be written.")
+        self.assertEqual(Customer.load_customer("cust1").email, "john@example.com")
+        Customer.delete_customer("cust1")
+        with self.assertRaises(FileNotFoundError):
+            Customer.load_customer("cust1")
+
+    def test_reserve_and_cancel(self):
+        """Test a reservation and its cancellation are persisted."""
+        hotel = Hotel.create_hotel("SQL Hotel", "Somewhere")
+        hotel.rooms.append(Room(101, "double", 150))
+        self.assertTrue(hotel.reserve_room("res1", "cust1", 101, "2023-01-01", "2023-01-05"))
+        self.assertTrue(self.storage.exists('reservation', 'res1'))
+
+        loaded = Hotel("SQL Hotel", "")
+        loaded.load_from_file()
+        self.assertFalse(loaded.rooms[0].is_available)
+
+        self.assertTrue(hotel.cancel_reservation("res1"))
+        self.assertFalse(self.storage.exists('reservation', 'res1'))
+        self.assertFalse(hotel.cancel_reservation("res1"))
+        Reservation.create_reservation(reservation_id="res2", room_number=101)
+        Reservation.cancel_reservation("res2")
+        Hotel.delete_hotel(hotel)
+        self.assertEqual(self.storage.keys('hotel'), [])
+
+
+class TestMigrate(unittest.TestCase):
+    """Tests for importing JSON record files into SQLite."""
+
+    def test_migrate_json_to_sqlite(self):
+        """Test every JSON record is imported with the same content."""
+        with tempfile.TemporaryDirectory() as directory:
+            source = JsonFileStorage(directory)
+            source.save('customer', 1, {'customer_id': 1, 'name': 'Jane Doe', 'email': 'jane@example.com'})
+            source.save('reservation', 'r1', {'reservation_id': 'r1', 'room_number': 101})
+            source.save('hotel', 'Test Hotel', {'name': 'Test Hotel', 'location': 'X', 'rooms': []})
+            destination = SQLiteStorage(':memory:')
+
+            counts = migrate(source, destination)
+
+            self.assertEqual(counts, {'customer': 1, 'reservation': 1, 'hotel': 1, 'hotel_head': 0})
+            for kind in ('customer', 'reservation', 'hotel'):
+                for key in source.keys(kind):
+                    self.assertEqual(destination.load(kind, key), source.load(kind, key))
+            previous = set_storage(destination)
+            try:
+                self.assertEqual(Customer.load_customer(1).name, 'Jane Doe')
+            finally:
+                set_storage(previous)
+                destination.close()
+
+
+if __name__ == '__main__':
+    unittest.main()